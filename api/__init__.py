@@ -19,6 +19,12 @@ from .admin.dashboard_routes import init_dashboard_routes
 from .admin.analytics_routes import init_analytics_routes
 from .admin.user_management import init_user_management_routes
 from .stretchnote.settings import init_note_settings_routes
+from .utils.principal import init_principal
+from .database.repository import Repository
+from .utils.payload_audit import init_payload_audit
+from .utils.transport import init_transport
+from .database.roster import init_roster
+from .ai.prompts import init_prompts
 
 
 def create_app():
@@ -36,7 +42,16 @@ def create_app():
     )
 
     try:
-        app.config["SQLALCHEMY_ENGINE"] = create_engine(os.environ.get("DATABASE_URL"))
+        # Each gunicorn worker builds its own engine and pool in create_app
+        app.config["SQLALCHEMY_ENGINE"] = create_engine(
+            os.environ.get("DATABASE_URL"),
+            pool_size=app.config["DB_POOL_SIZE"],
+            max_overflow=app.config["DB_MAX_OVERFLOW"],
+            pool_timeout=app.config["DB_POOL_TIMEOUT"],
+            pool_recycle=app.config["DB_POOL_RECYCLE"],
+            pool_pre_ping=True,
+        )
+        app.config["REPOSITORY"] = Repository(app.config["SQLALCHEMY_ENGINE"])
     except Exception as e:
         raise RuntimeError(f"Database connection failed: {str(e)}")
 
@@ -45,6 +60,7 @@ def create_app():
             app.config["SUPABASE_URL"], app.config["SUPABASE_KEY"]
         )
         app.config["SUPABASE"] = supabase
+        init_transport(app)
     except Exception as e:
         raise RuntimeError(f"Supabase client initialization failed: {str(e)}")
 
@@ -58,6 +74,9 @@ def create_app():
     def root():
         return {"status": "health check"}, 200
 
+    init_prompts()
+    init_principal(app)
+    init_payload_audit(app)
     init_routes(app)
     init_stretchnote_auth_routes(app)
     init_admin_auth_routes(app)
@@ -71,5 +90,6 @@ def create_app():
     init_analytics_routes(app)
     init_note_settings_routes(app)
     init_user_management_routes(app)
+    init_roster()
 
     return app
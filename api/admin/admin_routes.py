@@ -8,11 +8,20 @@ from ..utils.utils import (
 )
 from ..utils.mail import send_email
 from ..database.database import (
-    get_employee_ownwer,
     get_owner_robot_automation_notes,
     get_owner_robot_automation_unlogged,
 )
 from ..utils.dashboard import get_start_and_end_date
+from ..utils.opportunities import FIRST_VISIT_OPPORTUNITIES
+from ..utils.principal import invalidate_principal
+from ..database.columns import RPA_NOTES_HISTORY, RPA_UNLOGGED_HISTORY
+from ..database.roster import employee_roster
+from ..utils.transport import transport_stats
+from ..utils.booking_html import extraction_stats
+from ..ai.aianalysis import gateway, llm_cache
+from ..ai.routing import ROUTES
+from ..ai.structured import output_stats
+from ..database.accounts import get_users_accounts, record_primary_account
 import logging
 from ..payment.stripe_utils import retrieve_payment_method, create_subscription
 from datetime import datetime, timedelta
@@ -700,6 +709,7 @@ def update_user_status(token):
         )
 
         user_id = updated_user.data[0]["id"]
+        invalidate_principal(user_id)
         flexologist_name_data = (
             supabase.table("clubready_bookings")
             .select("flexologist_name")
@@ -754,7 +764,7 @@ def get_users(token):
         query = (
             supabase.table("users")
             .select(
-                "id, email, full_name, status, role_id, invited_at, other_clubready_accounts, clubready_user_id"
+                "id, email, full_name, status, role_id, invited_at, clubready_user_id"
             )
             .in_("role_id", [3, 8])
             .eq("username", user_data["username"])
@@ -764,7 +774,7 @@ def get_users(token):
 
         # For admins, merge with Airtable data
         if is_admin:
-            employees_from_airtable = get_employee_ownwer()
+            employees_from_airtable = employee_roster.employees()
             existing_emails = {e["email"] for e in employees_from_supabase}
 
             for employee in employees_from_airtable:
@@ -773,60 +783,38 @@ def get_users(token):
                     employee["invited_at"] = None
                     employees_from_supabase.append(employee)
 
-        account_ids = set()
-        for employee in employees_from_supabase:
-            if employee.get("status") == 1:
-                if employee.get("clubready_user_id"):
-                    account_ids.add(employee["clubready_user_id"])
-
-                if employee.get("other_clubready_accounts"):
-                    other_accounts = json.loads(employee["other_clubready_accounts"])
-                    for account in other_accounts:
-                        if account.get("id"):
-                            account_ids.add(account["id"])
-
-        location_map = {}
-        if account_ids:
-            locations_result = (
-                supabase.table("clubready_bookings")
-                .select("account_id, location")
-                .in_("account_id", list(account_ids))
-                .execute()
-            )
-
-            for loc in locations_result.data:
-                location_map[loc["account_id"]] = loc["location"]
+        active_ids = [
+            employee["id"]
+            for employee in employees_from_supabase
+            if employee.get("status") == 1
+        ]
+        accounts_by_user = {}
+        for account in get_users_accounts(
+            supabase,
+            active_ids,
+            "user_id, location, is_primary, is_active",
+        ):
+            accounts_by_user.setdefault(account["user_id"], []).append(account)
 
         for employee in employees_from_supabase:
             if employee.get("status") == 1:
                 employee["locations"] = {"total": 0, "list": []}
 
-                # Add primary location
-                primary_id = employee.get("clubready_user_id")
-                if primary_id and primary_id in location_map:
-                    employee["locations"]["list"].append(
-                        {
-                            "name": location_map[primary_id],
-                            "active": True,
-                            "primary": True,
-                        }
-                    )
-                    employee["locations"]["total"] = 1
-
-                # Add other locations
-                if employee.get("other_clubready_accounts"):
-                    other_accounts = json.loads(employee["other_clubready_accounts"])
-                    for account in other_accounts:
-                        account_id = account.get("id")
-                        if account_id and account_id in location_map:
-                            employee["locations"]["list"].append(
-                                {
-                                    "name": location_map[account_id],
-                                    "active": account.get("active", False),
-                                    "primary": False,
-                                }
-                            )
-                            employee["locations"]["total"] += 1
+                # Primary location first, then the other accounts
+                accounts = sorted(
+                    accounts_by_user.get(employee["id"], []),
+                    key=lambda account: not account["is_primary"],
+                )
+                for account in accounts:
+                    if account["location"]:
+                        employee["locations"]["list"].append(
+                            {
+                                "name": account["location"],
+                                "active": account["is_primary"] or account["is_active"],
+                                "primary": account["is_primary"],
+                            }
+                        )
+                        employee["locations"]["total"] += 1
 
         return jsonify({"users": employees_from_supabase, "status": "success"}), 200
 
@@ -835,6 +823,107 @@ def get_users(token):
         return jsonify({"error": str(e), "status": "error"}), 500
 
 
+@routes.route("/refresh-employee-roster", methods=["POST"])
+@require_bearer_token
+def refresh_employee_roster(token):
+    try:
+        user_data = decode_jwt_token(token)
+        if user_data["role_id"] != 1:
+            return jsonify({"error": "Unauthorized", "status": "error"}), 401
+
+        full = request.args.get("full", "false").lower() == "true"
+        employee_roster.refresh(full=full, wait=True)
+        return (
+            jsonify(
+                {
+                    "message": "Employee roster refreshed",
+                    "total": len(employee_roster.employees()),
+                    "status": "success",
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        logging.error(f"Error in POST /admin/refresh-employee-roster: {str(e)}")
+        return jsonify({"error": str(e), "status": "error"}), 500
+
+
+@routes.route("/transport-stats", methods=["GET"])
+@require_bearer_token
+def get_transport_stats(token):
+    try:
+        user_data = decode_jwt_token(token)
+        if user_data["role_id"] != 1:
+            return jsonify({"error": "Unauthorized", "status": "error"}), 401
+
+        # Counters of the worker that served this request
+        return (
+            jsonify({"data": transport_stats.snapshot(), "status": "success"}),
+            200,
+        )
+
+    except Exception as e:
+        logging.error(f"Error in GET /admin/transport-stats: {str(e)}")
+        return jsonify({"error": str(e), "status": "error"}), 500
+
+
+@routes.route("/llm-cache-stats", methods=["GET"])
+@require_bearer_token
+def get_llm_cache_stats(token):
+    try:
+        user_data = decode_jwt_token(token)
+        if user_data["role_id"] != 1:
+            return jsonify({"error": "Unauthorized", "status": "error"}), 401
+
+        # Hits and misses of the worker that served this request
+        return jsonify({"data": llm_cache.stats(), "status": "success"}), 200
+
+    except Exception as e:
+        logging.error(f"Error in GET /admin/llm-cache-stats: {str(e)}")
+        return jsonify({"error": str(e), "status": "error"}), 500
+
+
+@routes.route("/llm-gateway-stats", methods=["GET"])
+@require_bearer_token
+def get_llm_gateway_stats(token):
+    try:
+        user_data = decode_jwt_token(token)
+        if user_data["role_id"] != 1:
+            return jsonify({"error": "Unauthorized", "status": "error"}), 401
+
+        # Queue depth, throttling, invalid outputs and booking extraction
+        # fallbacks of the worker that served this request
+        data = {
+            **gateway.stats(),
+            "outputs": output_stats.snapshot(),
+            "booking_extraction": extraction_stats.snapshot(),
+        }
+        return jsonify({"data": data, "status": "success"}), 200
+
+    except Exception as e:
+        logging.error(f"Error in GET /admin/llm-gateway-stats: {str(e)}")
+        return jsonify({"error": str(e), "status": "error"}), 500
+
+
+@routes.route("/llm-model-stats", methods=["GET"])
+@require_bearer_token
+def get_llm_model_stats(token):
+    try:
+        user_data = decode_jwt_token(token)
+        if user_data["role_id"] != 1:
+            return jsonify({"error": "Unauthorized", "status": "error"}), 401
+
+        # Latency percentiles, hedges and cost per model of the worker that
+        # served this request
+        data = {"routes": ROUTES, "models": gateway.models.snapshot()}
+        return jsonify({"data": data, "status": "success"}), 200
+
+    except Exception as e:
+        logging.error(f"Error in GET /admin/llm-model-stats: {str(e)}")
+        return jsonify({"error": str(e), "status": "error"}), 500
+
+
 @routes.route("/validate-login", methods=["POST"])
 @require_bearer_token
 def validate_login(token):
@@ -854,6 +943,24 @@ def validate_login(token):
 
         validate_login = clubready_admin_login(data)
         if validate_login["status"]:
+            # The admin login has no ClubReady user id, an account already
+            # recorded under one keeps it
+            user = (
+                supabase.table("users")
+                .select("clubready_user_id")
+                .eq("id", user_data["user_id"])
+                .execute()
+            )
+            account_id = (
+                user.data[0]["clubready_user_id"] if user.data else None
+            ) or data["username"].lower()
+            record_primary_account(
+                supabase,
+                account_id,
+                user_data["user_id"],
+                username=data["username"],
+                password=validate_login["hashed_password"],
+            )
             supabase.table("users").update(
                 {
                     "clubready_username": data["username"],
@@ -1212,7 +1319,7 @@ def get_rpa_history(token, config_id):
 
         rpa_history = (
             supabase.table("robot_process_automation_notes_records")
-            .select("*")
+            .select(RPA_NOTES_HISTORY)
             .eq("config_id", config_id)
             .gte("appointment_date", start_date)
             .lt("appointment_date", end_date)
@@ -1220,7 +1327,7 @@ def get_rpa_history(token, config_id):
         )
         rpa_unlogged_history = (
             supabase.table("robot_process_automation_unlogged_booking_records")
-            .select("*")
+            .select(RPA_UNLOGGED_HISTORY)
             .eq("config_id", config_id)
             .gte("appointment_date", start_date)
             .lt("appointment_date", end_date)
@@ -1398,24 +1505,7 @@ def get_opportunites(token):
                 jsonify({"message": "User is not an admin", "status": "error"}),
                 401,
             )
-        opportunities = [
-            "Confirmation Call",
-            "Grip Sock Notice",
-            "Arrive Early",
-            "Location",
-            "Prepaid",
-            "Keynote",
-            "Stated Goal",
-            "Emotional Why",
-            "Prior Solutions",
-            "Routine Captured",
-            "Physical/Medical Issue",
-            "Plan Recommendation",
-            "Problem Presented",
-            "Current Session Activity",
-            "Next Session Focus",
-            "Homework",
-        ]
+        opportunities = FIRST_VISIT_OPPORTUNITIES
         return (
             jsonify(
                 {
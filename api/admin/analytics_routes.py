@@ -2,32 +2,97 @@ from flask import Blueprint, jsonify, request
 from ..utils.middleware import require_bearer_token
 from datetime import datetime, timedelta
 import logging
-from ..utils.utils import decode_jwt_token
-from ..utils.analytics import get_start_and_end_date
+from ..utils.analytics import (
+    get_start_and_end_date,
+    aggregate,
+    GroupTotalsAggregator,
+    RpaAuditAggregator,
+    OpportunityBreakdownAggregator,
+)
+from ..utils.opportunities import (
+    FIRST_VISIT_OPPORTUNITIES,
+    SUBSEQUENT_VISIT_OPPORTUNITIES,
+)
+from ..utils.note_records import NoteRecords
+from ..utils.principal import current_principal
+from ..database.repository import get_repository, use_direct_db
+from ..utils.queries import fetch_all_rows, iter_rows, run_queries
 import json
 
 routes = Blueprint("analytics_routes", __name__)
 
 
+def rpa_notes_filters(
+    config_id,
+    start_date,
+    end_date,
+    excluded_flexologists=None,
+    first_timer=None,
+    location=None,
+    flexologist_name=None,
+):
+    """Build the filter callback shared by the RPA notes analytics queries."""
+
+    def apply_filters(query):
+        query = (
+            query.eq("config_id", config_id)
+            .neq("status", "No Show")
+            .gte("appointment_date", start_date)
+            .lt("appointment_date", end_date)
+        )
+        if location:
+            query = query.eq("location", location)
+        if flexologist_name:
+            query = query.eq("flexologist_name", flexologist_name)
+
+        # Apply exclusion filter only when we have a valid list
+        if excluded_flexologists:
+            query = query.not_.in_("flexologist_name", excluded_flexologists)
+
+        if first_timer:
+            query = query.eq("first_timer", first_timer)
+        return query
+
+    return apply_filters
+
+
+def iter_rpa_notes(
+    columns, config_id, start_date, end_date, excluded_flexologists=None, **filters
+):
+    """Stream RPA notes from Postgres or PostgREST, per DIRECT_DB_ROUTES."""
+    if use_direct_db():
+        return get_repository().iter_notes_records(
+            columns,
+            config_id,
+            start_date,
+            end_date,
+            excluded_flexologists,
+            **filters,
+        )
+    return iter_rows(
+        supabase,
+        "robot_process_automation_notes_records",
+        columns,
+        rpa_notes_filters(
+            config_id, start_date, end_date, excluded_flexologists, **filters
+        ),
+    )
+
+
 @routes.route("/rpa_audit", methods=["GET"])
 @require_bearer_token
 def rpa_audit(token):
     try:
-        user_data = decode_jwt_token(token)
         duration = request.args.get("duration")
         location = request.args.get("location")
         filter_metric = request.args.get("filter_metric")
         flexologist_name = request.args.get("flexologist_name")
 
         # Get user's admin_id
-        user_info = (
-            supabase.table("users")
-            .select("admin_id")
-            .eq("id", user_data["user_id"])
-            .single()
-            .execute()
-        )
-        user_id = user_info.data["admin_id"]
+        principal = current_principal()
+        if not principal:
+            return jsonify({"error": "User not found", "status": "error"}), 404
+        user_id = principal["admin_id"]
 
         if not duration:
             return jsonify({"error": "Duration is required", "status": "error"}), 400
@@ -80,47 +145,31 @@ def rpa_audit(token):
         elif filter_metric == "subsequent":
             filter_bookings = "NO"
 
-        # Build query dynamically - NO CODE DUPLICATION
-        rpa_notes = []
-        offset = 0
-        limit = 1000
-
-        while True:
-            # Start building the query
-            query = (
-                supabase.table("robot_process_automation_notes_records")
-                .select(
-                    "flexologist_name, location, first_timer, note_score, "
-                    "appointment_date, note_oppurtunities"
-                )
-                .eq("config_id", config_id)
-                .neq("status", "No Show")
-                .gte("appointment_date", start_date)
-                .lt("appointment_date", end_date)
+        # Define opportunities based on filter_metric
+        if filter_metric in ["first", "all"]:
+            opportunities = FIRST_VISIT_OPPORTUNITIES
+        else:
+            opportunities = SUBSEQUENT_VISIT_OPPORTUNITIES
+
+        # Aggregate the notes one column store batch at a time
+        rpa_notes = NoteRecords.batches(
+            iter_rpa_notes(
+                "flexologist_name, location, first_timer, note_score, "
+                "appointment_date, note_oppurtunities",
+                config_id,
+                start_date,
+                end_date,
+                excluded_flexologists,
+                first_timer=filter_bookings,
+                location=location,
+                flexologist_name=flexologist_name,
             )
+        )
 
-            # Apply exclusion filter only when we have a valid list
-            if excluded_flexologists:
-                query = query.not_.in_("flexologist_name", excluded_flexologists)
-
-            # Add optional filters
-            if filter_bookings:
-                query = query.eq("first_timer", filter_bookings)
-            if location:
-                query = query.eq("location", location)
-            if flexologist_name:
-                query = query.eq("flexologist_name", flexologist_name)
-
-            # Execute with pagination
-            data = query.range(offset, offset + limit - 1).execute().data
-            rpa_notes.extend(data)
-
-            if len(data) < limit:
-                break
-            offset += limit
+        (audit,) = aggregate(rpa_notes, RpaAuditAggregator(opportunities))
 
         # Early return if no notes
-        if not rpa_notes:
+        if not audit.total_notes:
             return (
                 jsonify(
                     {
@@ -137,233 +186,7 @@ def rpa_audit(token):
                 200,
             )
 
-        # Use defaultdict for cleaner counting
-        from collections import defaultdict
-
-        locations_with_notes_count = defaultdict(int)
-        flexologist_with_notes_count = defaultdict(int)
-        locations_with_opportunity_count = defaultdict(int)
-        flexologist_with_opportunity_count = defaultdict(int)
-        flexologist_notes_percentage_obj = defaultdict(
-            lambda: {"percentage": 0, "total": 0}
-        )
-        location_notes_percentage_obj = defaultdict(
-            lambda: {"percentage": 0, "total": 0}
-        )
-
-        # Opportunity mapping for backward compatibility
-        opportunity_mapping = {
-            "Session Note: Problem Presented": "Problem Presented",
-            "Session Note: What was worked On": "Current Session Activity",
-            "Session Note: Tension Level & Frequency": "Current Session Activity",
-            "Session Note: Prescribed Action": "Next Session Focus",
-            "Session Note: Homework": "Homework",
-        }
-
-        # Define opportunities based on filter_metric
-        if filter_metric in ["first", "all"]:
-            opportunities = [
-                "Confirmation Call",
-                "Grip Sock Notice",
-                "Arrive Early",
-                "Location",
-                "Prepaid",
-                "Keynote",
-                "Stated Goal",
-                "Emotional Why",
-                "Prior Solutions",
-                "Routine Captured",
-                "Physical/Medical Issue",
-                "Plan Recommendation",
-                "Problem Presented",
-                "Current Session Activity",
-                "Next Session Focus",
-                "Homework",
-            ]
-        else:
-            opportunities = [
-                "Problem Presented",
-                "Current Session Activity",
-                "Next Session Focus",
-                "Homework",
-            ]
-
-        opportunities_count = {opp: 0 for opp in opportunities}
-        notes_with_opportunities = []
-        total_quality_notes_percentage_array = []
-
-        # Single pass through all notes
-        for note in rpa_notes:
-            location_key = note["location"]
-            flexologist_key = note["flexologist_name"].lower()
-
-            # Count by location and flexologist
-            locations_with_notes_count[location_key] += 1
-            flexologist_with_notes_count[flexologist_key] += 1
-
-            # Calculate quality percentage
-            if note["first_timer"] == "YES":
-                max_score = 18
-            else:
-                max_score = 4
-
-            if note["note_score"] == "N/A":
-                percentage = 0
-            else:
-                percentage = (int(note["note_score"]) * 100) / max_score
-
-            total_quality_notes_percentage_array.append(percentage)
-            flexologist_notes_percentage_obj[note["flexologist_name"]][
-                "percentage"
-            ] += percentage
-            flexologist_notes_percentage_obj[note["flexologist_name"]]["total"] += 1
-            location_notes_percentage_obj[location_key]["percentage"] += percentage
-            location_notes_percentage_obj[location_key]["total"] += 1
-
-            # Process opportunities
-            note_opps = note["note_oppurtunities"]
-            has_opportunities = note_opps and note_opps not in ["N/A", "[]", "", []]
-
-            if has_opportunities:
-                notes_with_opportunities.append(note)
-                locations_with_opportunity_count[location_key] += 1
-                flexologist_with_opportunity_count[flexologist_key] += 1
-
-                # Parse and count opportunities
-                try:
-                    lowered_opps = [
-                        item.lower()
-                        for item in json.loads(note_opps)
-                        if isinstance(item, str)
-                    ]
-
-                    for opportunity in opportunities:
-                        opp_lower = opportunity.lower()
-                        # Check new opportunity name
-                        if opp_lower in lowered_opps:
-                            opportunities_count[opportunity] += 1
-                        else:
-                            # Check old opportunity names
-                            old_names = [
-                                old.lower()
-                                for old, new in opportunity_mapping.items()
-                                if new.lower() == opp_lower
-                            ]
-                            if any(old_name in lowered_opps for old_name in old_names):
-                                opportunities_count[opportunity] += 1
-                except (json.JSONDecodeError, TypeError):
-                    continue
-
-        # Calculate percentages
-        total_notes = len(rpa_notes)
-
-        # Opportunity percentages
-        for opportunity in opportunities:
-            opportunities_count[opportunity] = round(
-                (opportunities_count[opportunity] / total_notes) * 100, 2
-            )
-
-        # Location opportunity percentages
-        opportunities_count_with_location = {}
-        for location_key in locations_with_notes_count:
-            if location_key in locations_with_opportunity_count:
-                opportunities_count_with_location[location_key] = round(
-                    (
-                        locations_with_opportunity_count[location_key]
-                        / locations_with_notes_count[location_key]
-                    )
-                    * 100,
-                    2,
-                )
-            else:
-                opportunities_count_with_location[location_key] = 0
-
-        # Flexologist opportunity percentages
-        for flexologist_key in flexologist_with_notes_count:
-            if flexologist_key in flexologist_with_opportunity_count:
-                flexologist_with_opportunity_count[flexologist_key] = round(
-                    (
-                        flexologist_with_opportunity_count[flexologist_key]
-                        / flexologist_with_notes_count[flexologist_key]
-                    )
-                    * 100,
-                    2,
-                )
-            else:
-                flexologist_with_opportunity_count[flexologist_key] = 0
-
-        # Sort results
-        sorted_opportunities = sorted(
-            opportunities_count.items(), key=lambda item: item[1], reverse=True
-        )
-
-        sorted_location_notes = sorted(
-            location_notes_percentage_obj.items(),
-            key=lambda item: (
-                item[1]["percentage"] / item[1]["total"] if item[1]["total"] > 0 else 0
-            ),
-            reverse=True,
-        )
-
-        sorted_flexologist_notes = sorted(
-            flexologist_notes_percentage_obj.items(),
-            key=lambda item: (
-                item[1]["percentage"] / item[1]["total"] if item[1]["total"] > 0 else 0
-            ),
-            reverse=True,
-        )
-
-        # Calculate total quality percentage
-        total_quality_notes_percentage = (
-            sum(total_quality_notes_percentage_array)
-            / len(total_quality_notes_percentage_array)
-            if total_quality_notes_percentage_array
-            else 0
-        )
-
-        return (
-            jsonify(
-                {
-                    "status": "success",
-                    "note_opportunities": [
-                        {"opportunity": opp, "percentage": pct}
-                        for opp, pct in sorted_opportunities
-                    ],
-                    "total_quality_notes": total_notes,
-                    "total_quality_notes_percentage": round(
-                        total_quality_notes_percentage
-                    ),
-                    "total_notes": total_notes,
-                    "total_notes_with_opportunities": len(notes_with_opportunities),
-                    "total_notes_with_opportunities_percentage": round(
-                        (len(notes_with_opportunities) / total_notes) * 100, 2
-                    ),
-                    "location": [
-                        {
-                            "location": loc,
-                            "percentage": (
-                                round(data["percentage"] / data["total"], 2)
-                                if data["total"] > 0
-                                else 0
-                            ),
-                        }
-                        for loc, data in sorted_location_notes
-                    ],
-                    "flexologist": [
-                        {
-                            "flexologist": flex,
-                            "percentage": (
-                                round(data["percentage"] / data["total"], 2)
-                                if data["total"] > 0
-                                else 0
-                            ),
-                        }
-                        for flex, data in sorted_flexologist_notes
-                    ],
-                }
-            ),
-            200,
-        )
+        return jsonify({"status": "success", **audit.summary()}), 200
 
     except Exception as e:
         logging.error(f"Error in POST api/admin/analytics/rpa_audit: {str(e)}")
@@ -374,17 +197,11 @@ def rpa_audit(token):
 @require_bearer_token
 def get_rpa_audit_details(token):
     try:
-        user_data = decode_jwt_token(token)
-
         # Get user's admin_id
-        user_info = (
-            supabase.table("users")
-            .select("admin_id")
-            .eq("id", user_data["user_id"])
-            .single()
-            .execute()
-        )
-        user_id = user_info.data["admin_id"]
+        principal = current_principal()
+        if not principal:
+            return jsonify({"error": "User not found", "status": "error"}), 404
+        user_id = principal["admin_id"]
 
         data = request.json
         opportunity = data["opportunity"]
@@ -427,45 +244,24 @@ def get_rpa_audit_details(token):
             except Exception:
                 excluded_flexologists = None
 
-        # Build query dynamically
-        rpa_notes = []
-        offset = 0
-        limit = 1000
-
-        while True:
-            # Build query with optional filters
-            query = (
-                supabase.table("robot_process_automation_notes_records")
-                .select(
-                    "flexologist_name, location, first_timer, note_score, "
-                    "appointment_date, note_oppurtunities"
-                )
-                .eq("config_id", config_id)
-                .neq("status", "No Show")
-                .gte("appointment_date", start_date)
-                .lt("appointment_date", end_date)
+        # Aggregate the notes one column store batch at a time
+        rpa_notes = NoteRecords.batches(
+            iter_rpa_notes(
+                "flexologist_name, location, first_timer, note_score, "
+                "appointment_date, note_oppurtunities",
+                config_id,
+                start_date,
+                end_date,
+                excluded_flexologists,
+                location=location,
+                flexologist_name=flexologist_name,
             )
+        )
 
-            # Apply exclusion filter only when we have a valid list
-            if excluded_flexologists:
-                query = query.not_.in_("flexologist_name", excluded_flexologists)
-
-            # Add optional filters
-            if location:
-                query = query.eq("location", location)
-            if flexologist_name:
-                query = query.eq("flexologist_name", flexologist_name)
-
-            # Execute with pagination
-            data_batch = query.range(offset, offset + limit - 1).execute().data
-            rpa_notes.extend(data_batch)
-
-            if len(data_batch) < limit:
-                break
-            offset += limit
+        (breakdown,) = aggregate(rpa_notes, OpportunityBreakdownAggregator(opportunity))
 
         # Early return if no notes
-        if not rpa_notes:
+        if not breakdown.total_notes:
             return (
                 jsonify(
                     {
@@ -478,168 +274,12 @@ def get_rpa_audit_details(token):
                 200,
             )
 
-        # Opportunity mapping for backward compatibility
-        opportunity_mapping = {
-            "Session Note: Problem Presented": "Problem Presented",
-            "Session Note: What was worked On": "Current Session Activity",
-            "Session Note: Tension Level & Frequency": "Current Session Activity",
-            "Session Note: Prescribed Action": "Next Session Focus",
-            "Session Note: Homework": "Homework",
-        }
-
-        # Pre-compute old names for the requested opportunity
-        opportunity_lower = opportunity.lower()
-        old_names = [
-            old.lower()
-            for old, new in opportunity_mapping.items()
-            if new.lower() == opportunity_lower
-        ]
-
-        # Use defaultdict for cleaner counting
-        from collections import defaultdict
-
-        locations_with_opportunity_count = defaultdict(int)
-        flexologist_with_opportunity_count = defaultdict(int)
-        total_location_notes = defaultdict(int)
-        total_flexologist_notes = defaultdict(int)
-
-        locations_with_particular_opportunity_count = defaultdict(int)
-        flexologist_with_particular_opportunity_count = defaultdict(int)
-
-        # Quality score tracking
-        location_quality_scores = defaultdict(list)
-        flexologist_quality_scores = defaultdict(list)
-
-        # Single pass through all notes
-        for note in rpa_notes:
-            location_key = note["location"]
-            flexologist_key = note["flexologist_name"].lower()
-            flexologist_display_key = note["flexologist_name"]
-
-            # Count all notes by location and flexologist
-            total_location_notes[location_key] += 1
-            total_flexologist_notes[flexologist_display_key] += 1
-
-            # Calculate quality score
-            max_score = 18 if note["first_timer"] == "YES" else 4
-            if note["note_score"] == "N/A":
-                percentage = 0
-            else:
-                percentage = (int(note["note_score"]) * 100) / max_score
-
-            location_quality_scores[location_key].append(percentage)
-            flexologist_quality_scores[flexologist_display_key].append(percentage)
-
-            # Check if note has opportunities
-            note_opps = note["note_oppurtunities"]
-            has_opportunities = note_opps and note_opps not in ["N/A", "[]", "", []]
-
-            if has_opportunities:
-                locations_with_opportunity_count[location_key] += 1
-                flexologist_with_opportunity_count[flexologist_key] += 1
-
-                # Parse opportunities and check for the specific one
-                try:
-                    lowered_opps = [
-                        item.lower()
-                        for item in json.loads(note_opps)
-                        if isinstance(item, str)
-                    ]
-
-                    # Check if requested opportunity is present (new name or old names)
-                    opportunity_found = opportunity_lower in lowered_opps or any(
-                        old_name in lowered_opps for old_name in old_names
-                    )
-
-                    if opportunity_found:
-                        locations_with_particular_opportunity_count[location_key] += 1
-                        flexologist_with_particular_opportunity_count[
-                            flexologist_key
-                        ] += 1
-
-                except (json.JSONDecodeError, TypeError):
-                    continue
-
-        # Calculate percentages for locations
-        location_results = []
-        for location_key in locations_with_opportunity_count:
-            particular_count = locations_with_particular_opportunity_count.get(
-                location_key, 0
-            )
-            opportunity_count = locations_with_opportunity_count[location_key]
-            total_count = total_location_notes[location_key]
-
-            if opportunity_count > 0:
-                percentage = round((particular_count / opportunity_count) * 100, 2)
-            else:
-                percentage = 0
-
-            percentage_note_quality = (
-                round((particular_count / total_count) * 100, 2)
-                if total_count > 0
-                else 0
-            )
-
-            location_results.append(
-                {
-                    "location": location_key,
-                    "percentage": percentage,
-                    "particular_count": particular_count,
-                    "total_count": total_count,
-                    "percentage_note_quality": percentage_note_quality,
-                }
-            )
-
-        # Sort locations by percentage
-        location_results.sort(key=lambda x: x["percentage"], reverse=True)
-
-        # Calculate percentages for flexologists
-        flexologist_results = []
-        for flexologist_key in flexologist_with_opportunity_count:
-            particular_count = flexologist_with_particular_opportunity_count.get(
-                flexologist_key, 0
-            )
-            opportunity_count = flexologist_with_opportunity_count[flexologist_key]
-
-            # Find the display name (with proper casing)
-            flexologist_display_name = None
-            for note in rpa_notes:
-                if note["flexologist_name"].lower() == flexologist_key:
-                    flexologist_display_name = note["flexologist_name"]
-                    break
-
-            total_count = total_flexologist_notes.get(flexologist_display_name, 0)
-
-            if opportunity_count > 0:
-                percentage = round((particular_count / opportunity_count) * 100, 2)
-            else:
-                percentage = 0
-
-            percentage_note_quality = (
-                round((particular_count / total_count) * 100, 2)
-                if total_count > 0
-                else 0
-            )
-
-            flexologist_results.append(
-                {
-                    "flexologist": flexologist_key,
-                    "percentage": percentage,
-                    "particular_count": particular_count,
-                    "total_count": total_count,
-                    "percentage_note_quality": percentage_note_quality,
-                }
-            )
-
-        # Sort flexologists by percentage
-        flexologist_results.sort(key=lambda x: x["percentage"], reverse=True)
-
         return (
             jsonify(
                 {
                     "status": "success",
-                    "location": location_results,
-                    "flexologist": flexologist_results,
+                    "location": breakdown.location_results(),
+                    "flexologist": breakdown.flexologist_results(),
                 }
             ),
             200,
@@ -656,17 +296,11 @@ def get_rpa_audit_details(token):
 @require_bearer_token
 def get_ranking_analytics(token):
     try:
-        user_data = decode_jwt_token(token)
-
         # Get user's admin_id
-        user_info = (
-            supabase.table("users")
-            .select("admin_id")
-            .eq("id", user_data["user_id"])
-            .single()
-            .execute()
-        )
-        user_id = user_info.data["admin_id"]
+        principal = current_principal()
+        if not principal:
+            return jsonify({"error": "User not found", "status": "error"}), 404
+        user_id = principal["admin_id"]
 
         data = request.json
         metric = data.get("metric", "total_visits")
@@ -716,36 +350,23 @@ def get_ranking_analytics(token):
             elif filter_metric == "subsequent":
                 first_timer_filter = "NO"
 
-            # Fetch notes with dynamic query
-            rpa_notes = []
-            offset = 0
-            limit = 1000
-
-            while True:
-                query = (
-                    supabase.table("robot_process_automation_notes_records")
-                    .select("flexologist_name, location")
-                    .eq("config_id", config_id)
-                    .neq("status", "No Show")
-                    .gte("appointment_date", start_date)
-                    .lt("appointment_date", end_date)
-                )
-
-                # Apply exclusion filter only when we have a valid list
-                if excluded_flexologists:
-                    query = query.not_.in_("flexologist_name", excluded_flexologists)
-
-                if first_timer_filter:
-                    query = query.eq("first_timer", first_timer_filter)
-
-                data_batch = query.range(offset, offset + limit - 1).execute().data
-                rpa_notes.extend(data_batch)
-
-                if len(data_batch) < limit:
-                    break
-                offset += limit
+            # Count by location and flexologist with dynamic query
+            count_location, count_flex = aggregate(
+                NoteRecords.batches(
+                    iter_rpa_notes(
+                        "flexologist_name, location",
+                        config_id,
+                        start_date,
+                        end_date,
+                        excluded_flexologists,
+                        first_timer=first_timer_filter,
+                    )
+                ),
+                GroupTotalsAggregator("location"),
+                GroupTotalsAggregator("flexologist_name"),
+            )
 
-            if not rpa_notes:
+            if not count_location.total_notes:
                 return (
                     jsonify(
                         {
@@ -759,29 +380,19 @@ def get_ranking_analytics(token):
                     200,
                 )
 
-            # Count by location and flexologist
-            from collections import defaultdict
-
-            count_location = defaultdict(int)
-            count_flex = defaultdict(int)
-
-            for note in rpa_notes:
-                count_location[note["location"]] += 1
-                count_flex[note["flexologist_name"]] += 1
-
             # Sort and format
             sorted_locations = sorted(
-                count_location.items(),
+                ((name, count) for name, (count, _) in count_location.totals.items()),
                 key=lambda item: item[1],
                 reverse=True,
             )
             sorted_flex = sorted(
-                count_flex.items(),
+                ((name, count) for name, (count, _) in count_flex.totals.items()),
                 key=lambda item: item[1],
                 reverse=True,
             )
 
-            total_notes = len(rpa_notes)
+            total_notes = count_flex.total_notes
 
             return (
                 jsonify(
@@ -803,33 +414,29 @@ def get_ranking_analytics(token):
 
         # ===== METRIC: percentage_app_submission =====
         if metric == "percentage_app_submission":
-            # Fetch all RPA notes
-            all_notes = []
-            offset = 0
-            limit = 1000
-
-            while True:
-                # Build the base query
-                query = (
-                    supabase.table("robot_process_automation_notes_records")
-                    .select("location, flexologist_name")
-                    .eq("config_id", config_id)
-                    .gte("appointment_date", start_date)
-                    .lt("appointment_date", end_date)
-                    .neq("status", "No Show")
-                )
-
-                # Apply exclusion filter only when we have a valid list
-                if excluded_flexologists:
-                    query = query.not_.in_("flexologist_name", excluded_flexologists)
-
-                data_batch = query.range(offset, offset + limit - 1).execute().data
-
-                all_notes.extend(data_batch)
-
-                if len(data_batch) < limit:
-                    break
-                offset += limit
+            # Notes and flexologists are independent, fetch them together
+            results = run_queries(
+                {
+                    "notes": lambda: fetch_all_rows(
+                        supabase,
+                        "robot_process_automation_notes_records",
+                        "location, flexologist_name",
+                        rpa_notes_filters(
+                            config_id, start_date, end_date, excluded_flexologists
+                        ),
+                    ),
+                    "flexologists": lambda: (
+                        supabase.table("users")
+                        .select("id")
+                        .eq("admin_id", user_id)
+                        .eq("role_id", 3)
+                        .or_(f"disabled_at.is.null,disabled_at.gte.{start_date}")
+                        .execute()
+                    ).data,
+                }
+            )
+            all_notes = results["notes"]
+            flexologists = results["flexologists"]
 
             if not all_notes:
                 return (
@@ -845,16 +452,6 @@ def get_ranking_analytics(token):
                     200,
                 )
 
-            # Get all flexologists
-            flexologists = (
-                supabase.table("users")
-                .select("id")
-                .eq("admin_id", user_id)
-                .eq("role_id", 3)
-                .or_(f"disabled_at.is.null,disabled_at.gte.{start_date}")
-                .execute()
-            ).data
-
             if not flexologists:
                 return (
                     jsonify(
@@ -871,26 +468,15 @@ def get_ranking_analytics(token):
 
             # Fetch ALL app submissions in ONE query (instead of N queries)
             flexologist_ids = [f["id"] for f in flexologists]
-            app_submitted = []
-            offset = 0
-            limit = 1000
-
-            while True:
-                submitted_batch = (
-                    supabase.table("clubready_bookings")
-                    .select("location, flexologist_name")
-                    .in_("user_id", flexologist_ids)
-                    .eq("submitted", True)
-                    .gte("created_at", start_date)
-                    .lt("created_at", end_date)
-                    .range(offset, offset + limit - 1)
-                    .execute()
-                ).data
-                app_submitted.extend(submitted_batch)
-
-                if len(submitted_batch) < limit:
-                    break
-                offset += limit
+            app_submitted = fetch_all_rows(
+                supabase,
+                "clubready_bookings",
+                "location, flexologist_name",
+                lambda query: query.in_("user_id", flexologist_ids)
+                .eq("submitted", True)
+                .gte("created_at", start_date)
+                .lt("created_at", end_date),
+            )
 
             # Count visits and submissions
             from collections import defaultdict
@@ -995,36 +581,23 @@ def get_ranking_analytics(token):
             elif filter_metric == "subsequent":
                 first_timer_filter = "NO"
 
-            # Fetch notes
-            all_notes = []
-            offset = 0
-            limit = 1000
-
-            while True:
-                query = (
-                    supabase.table("robot_process_automation_notes_records")
-                    .select("location, flexologist_name, note_score, first_timer")
-                    .eq("config_id", config_id)
-                    .neq("status", "No Show")
-                    .gte("appointment_date", start_date)
-                    .lt("appointment_date", end_date)
-                )
-
-                # Apply exclusion filter only when we have a valid list
-                if excluded_flexologists:
-                    query = query.not_.in_("flexologist_name", excluded_flexologists)
-
-                if first_timer_filter:
-                    query = query.eq("first_timer", first_timer_filter)
-
-                data_batch = query.range(offset, offset + limit - 1).execute().data
-                all_notes.extend(data_batch)
-
-                if len(data_batch) < limit:
-                    break
-                offset += limit
+            # Average the note quality by location and flexologist
+            group_location, group_flex = aggregate(
+                NoteRecords.batches(
+                    iter_rpa_notes(
+                        "location, flexologist_name, note_score, first_timer",
+                        config_id,
+                        start_date,
+                        end_date,
+                        excluded_flexologists,
+                        first_timer=first_timer_filter,
+                    )
+                ),
+                GroupTotalsAggregator("location", 16, str.lower),
+                GroupTotalsAggregator("flexologist_name", 16, str.lower),
+            )
 
-            if not all_notes:
+            if not group_location.total_notes:
                 return (
                     jsonify(
                         {
@@ -1037,46 +610,15 @@ def get_ranking_analytics(token):
                     200,
                 )
 
-            # Calculate averages
-            from collections import defaultdict
-
-            group_sums_location = defaultdict(float)
-            group_counts_location = defaultdict(int)
-            group_sums_flex = defaultdict(float)
-            group_counts_flex = defaultdict(int)
-
-            for booking in all_notes:
-                score = (
-                    int(booking["note_score"]) if booking["note_score"] != "N/A" else 0
-                )
-                max_score = 16.0 if booking["first_timer"] == "YES" else 4.0
-                percentage = (score / max_score) * 100
-
-                loc = booking["location"].lower()
-                flex = booking["flexologist_name"].lower()
-
-                group_sums_location[loc] += percentage
-                group_counts_location[loc] += 1
-                group_sums_flex[flex] += percentage
-                group_counts_flex[flex] += 1
-
             # Calculate and sort averages
             averages_location = {
-                key: {
-                    "avg": round(
-                        group_sums_location[key] / group_counts_location[key], 2
-                    ),
-                    "total": group_counts_location[key],
-                }
-                for key in group_sums_location
+                key: {"avg": round(total / count, 2), "total": count}
+                for key, (total, count) in group_location.totals.items()
             }
 
             averages_flex = {
-                key: {
-                    "avg": round(group_sums_flex[key] / group_counts_flex[key], 2),
-                    "total": group_counts_flex[key],
-                }
-                for key in group_sums_flex
+                key: {"avg": round(total / count, 2), "total": count}
+                for key, (total, count) in group_flex.totals.items()
             }
 
             sorted_locations = sorted(
@@ -1127,17 +669,11 @@ def get_ranking_analytics(token):
 @require_bearer_token
 def get_location_analytics(token):
     try:
-        user_data = decode_jwt_token(token)
-
         # Get user's admin_id
-        user_info = (
-            supabase.table("users")
-            .select("admin_id")
-            .eq("id", user_data["user_id"])
-            .single()
-            .execute()
-        )
-        user_id = user_info.data["admin_id"]
+        principal = current_principal()
+        if not principal:
+            return jsonify({"error": "User not found", "status": "error"}), 404
+        user_id = principal["admin_id"]
 
         data = request.json
         location = data.get("location")
@@ -1192,35 +728,23 @@ def get_location_analytics(token):
             elif filter_metric == "subsequent":
                 first_timer_filter = "NO"
 
-            # Fetch notes with dynamic query - only select needed fields
-            rpa_notes = []
-            offset = 0
-            limit = 1000
-
-            while True:
-                query = (
-                    supabase.table("robot_process_automation_notes_records")
-                    .select("flexologist_name")
-                    .eq("config_id", config_id)
-                    .eq("location", location)
-                    .neq("status", "No Show")
-                    .gte("appointment_date", start_date)
-                    .lt("appointment_date", end_date)
-                )
-                if excluded_flexologists:
-                    query = query.not_.in_("flexologist_name", excluded_flexologists)
-
-                if first_timer_filter:
-                    query = query.eq("first_timer", first_timer_filter)
-
-                data_batch = query.range(offset, offset + limit - 1).execute().data
-                rpa_notes.extend(data_batch)
-
-                if len(data_batch) < limit:
-                    break
-                offset += limit
+            # Count by flexologist with dynamic query - only select needed fields
+            (count_flex,) = aggregate(
+                NoteRecords.batches(
+                    iter_rpa_notes(
+                        "flexologist_name",
+                        config_id,
+                        start_date,
+                        end_date,
+                        excluded_flexologists,
+                        first_timer=first_timer_filter,
+                        location=location,
+                    )
+                ),
+                GroupTotalsAggregator("flexologist_name"),
+            )
 
-            if not rpa_notes:
+            if not count_flex.total_notes:
                 return (
                     jsonify(
                         {
@@ -1233,22 +757,14 @@ def get_location_analytics(token):
                     200,
                 )
 
-            # Count by flexologist
-            from collections import defaultdict
-
-            count_flex = defaultdict(int)
-
-            for note in rpa_notes:
-                count_flex[note["flexologist_name"]] += 1
-
             # Sort and format
             sorted_flex = sorted(
-                count_flex.items(),
+                ((name, count) for name, (count, _) in count_flex.totals.items()),
                 key=lambda item: item[1],
                 reverse=True,
             )
 
-            total_notes = len(rpa_notes)
+            total_notes = count_flex.total_notes
 
             return (
                 jsonify(
@@ -1266,34 +782,33 @@ def get_location_analytics(token):
 
         # ===== METRIC: percentage_app_submission =====
         if metric == "percentage_app_submission":
-            # Fetch all RPA notes for this location
-            all_notes = []
-            offset = 0
-            limit = 1000
-
-            while True:
-                # Build the base query
-                query = (
-                    supabase.table("robot_process_automation_notes_records")
-                    .select("flexologist_name")
-                    .eq("config_id", config_id)
-                    .eq("location", location)
-                    .gte("appointment_date", start_date)
-                    .lt("appointment_date", end_date)
-                    .neq("status", "No Show")
-                )
-
-                # Apply exclusion filter only when we have a valid list
-                if excluded_flexologists:
-                    query = query.not_.in_("flexologist_name", excluded_flexologists)
-
-                data_batch = query.range(offset, offset + limit - 1).execute().data
-
-                all_notes.extend(data_batch)
-
-                if len(data_batch) < limit:
-                    break
-                offset += limit
+            # Notes and flexologists are independent, fetch them together
+            results = run_queries(
+                {
+                    "notes": lambda: fetch_all_rows(
+                        supabase,
+                        "robot_process_automation_notes_records",
+                        "flexologist_name",
+                        rpa_notes_filters(
+                            config_id,
+                            start_date,
+                            end_date,
+                            excluded_flexologists,
+                            location=location,
+                        ),
+                    ),
+                    "flexologists": lambda: (
+                        supabase.table("users")
+                        .select("id")
+                        .eq("admin_id", user_id)
+                        .eq("role_id", 3)
+                        .or_(f"disabled_at.is.null,disabled_at.gte.{start_date}")
+                        .execute()
+                    ).data,
+                }
+            )
+            all_notes = results["notes"]
+            flexologists = results["flexologists"]
 
             if not all_notes:
                 return (
@@ -1308,16 +823,6 @@ def get_location_analytics(token):
                     200,
                 )
 
-            # Get all flexologists
-            flexologists = (
-                supabase.table("users")
-                .select("id")
-                .eq("admin_id", user_id)
-                .eq("role_id", 3)
-                .or_(f"disabled_at.is.null,disabled_at.gte.{start_date}")
-                .execute()
-            ).data
-
             if not flexologists:
                 return (
                     jsonify(
@@ -1333,16 +838,10 @@ def get_location_analytics(token):
 
             # Fetch ALL app submissions in ONE query (instead of N queries)
             flexologist_ids = [f["id"] for f in flexologists]
-            app_submitted = []
-            offset = 0
-            limit = 1000
 
-            while True:
-                # Build the base query
+            def app_submission_filters(query):
                 query = (
-                    supabase.table("clubready_bookings")
-                    .select("flexologist_name")
-                    .in_("user_id", flexologist_ids)
+                    query.in_("user_id", flexologist_ids)
                     .eq("location", location)
                     .eq("submitted", True)
                     .gte("created_at", start_date)
@@ -1352,13 +851,14 @@ def get_location_analytics(token):
                 # Apply exclusion filter only when we have a valid list
                 if excluded_flexologists:
                     query = query.not_.in_("flexologist_name", excluded_flexologists)
+                return query
 
-                submitted_batch = query.range(offset, offset + limit - 1).execute().data
-                app_submitted.extend(submitted_batch)
-
-                if len(submitted_batch) < limit:
-                    break
-                offset += limit
+            app_submitted = fetch_all_rows(
+                supabase,
+                "clubready_bookings",
+                "flexologist_name",
+                app_submission_filters,
+            )
 
             # Count visits and submissions
             from collections import defaultdict
@@ -1437,35 +937,23 @@ def get_location_analytics(token):
             elif filter_metric == "subsequent":
                 first_timer_filter = "NO"
 
-            # Fetch notes
-            all_notes = []
-            offset = 0
-            limit = 1000
-
-            while True:
-                query = (
-                    supabase.table("robot_process_automation_notes_records")
-                    .select("flexologist_name, note_score, first_timer")
-                    .eq("config_id", config_id)
-                    .eq("location", location)
-                    .neq("status", "No Show")
-                    .gte("appointment_date", start_date)
-                    .lt("appointment_date", end_date)
-                )
-                if excluded_flexologists:
-                    query = query.not_.in_("flexologist_name", excluded_flexologists)
-
-                if first_timer_filter:
-                    query = query.eq("first_timer", first_timer_filter)
-
-                data_batch = query.range(offset, offset + limit - 1).execute().data
-                all_notes.extend(data_batch)
-
-                if len(data_batch) < limit:
-                    break
-                offset += limit
+            # Average the note quality by flexologist
+            (group_flex,) = aggregate(
+                NoteRecords.batches(
+                    iter_rpa_notes(
+                        "flexologist_name, note_score, first_timer",
+                        config_id,
+                        start_date,
+                        end_date,
+                        excluded_flexologists,
+                        first_timer=first_timer_filter,
+                        location=location,
+                    )
+                ),
+                GroupTotalsAggregator("flexologist_name", 16, str.lower),
+            )
 
-            if not all_notes:
+            if not group_flex.total_notes:
                 return (
                     jsonify(
                         {
@@ -1477,31 +965,10 @@ def get_location_analytics(token):
                     200,
                 )
 
-            # Calculate averages
-            from collections import defaultdict
-
-            group_sums_flex = defaultdict(float)
-            group_counts_flex = defaultdict(int)
-
-            for booking in all_notes:
-                score = (
-                    int(booking["note_score"]) if booking["note_score"] != "N/A" else 0
-                )
-                max_score = 16.0 if booking["first_timer"] == "YES" else 4.0
-                percentage = (score / max_score) * 100
-
-                flex = booking["flexologist_name"].lower()
-
-                group_sums_flex[flex] += percentage
-                group_counts_flex[flex] += 1
-
             # Calculate and sort averages
             averages_flex = {
-                key: {
-                    "avg": round(group_sums_flex[key] / group_counts_flex[key], 2),
-                    "total": group_counts_flex[key],
-                }
-                for key in group_sums_flex
+                key: {"avg": round(total / count, 2), "total": count}
+                for key, (total, count) in group_flex.totals.items()
             }
 
             sorted_flex = sorted(
@@ -1,3 +1,4 @@
+from collections import defaultdict
 from datetime import datetime, timedelta
 import json
 import logging
@@ -15,6 +16,9 @@ from ..utils.dashboard import (
     handle_avg_visit_quality_percentage,
     handle_avg_aggregate_note_quality_percentage,
 )
+from ..utils.principal import current_principal
+from ..database.columns import BUSINESS_SUMMARY
+from ..utils.queries import fetch_all_rows, iter_rows
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
@@ -22,48 +26,20 @@ from concurrent.futures import ThreadPoolExecutor
 routes = Blueprint("dashboard", __name__)
 
 
-def get_bookings_info(token):
+def get_bookings_info(principal):
     try:
-        user_data = decode_jwt_token(token)
-
-        # Get user's admin_id
-        user_info = (
-            supabase.table("users")
-            .select("admin_id")
-            .eq("id", user_data["user_id"])
-            .single()
-            .execute()
-        )
-        user_id = user_info.data["admin_id"]
+        # The principal carries the admin's business and RPA config
+        business = principal["business"]
 
-        # Get business info
-        business = (
-            supabase.table("businesses")
-            .select("admin_id, username")
-            .eq("admin_id", user_id)
-            .single()
-            .execute()
-        )
-
-        if not business.data:
+        if not business:
             return jsonify({"message": "Business not found", "status": "error"}), 404
 
-        business_admin_id = business.data["admin_id"]
-        business_name = business.data["username"]
+        business_name = business["username"]
 
-        # Get config_id
-        config = (
-            supabase.table("robot_process_automation_config")
-            .select("id")
-            .eq("admin_id", business_admin_id)
-            .single()
-            .execute()
-        )
-
-        if not config.data:
+        if not principal["rpa_config_id"]:
             return jsonify({"message": "No config id found", "status": "error"}), 404
 
-        config_id = config.data["id"]
+        config_id = principal["rpa_config_id"]
 
         # Calculate date ranges
         first_day_this_month = datetime.now().replace(
@@ -220,11 +196,14 @@ def get_first_row(token):
             )
 
         show_others = user_data["role_id"] == 1
+        principal = current_principal()
+        if not principal:
+            return jsonify({"error": "User not found", "status": "error"}), 404
 
         # Execute queries in parallel
         with ThreadPoolExecutor(max_workers=3) as executor:
             # Always fetch bookings_info
-            bookings_future = executor.submit(get_bookings_info, token)
+            bookings_future = executor.submit(get_bookings_info, principal)
 
             # Only fetch these if needed
             if show_others:
@@ -276,14 +255,10 @@ def get_activities(token):
             )
 
         # Get user's admin_id
-        user_info = (
-            supabase.table("users")
-            .select("admin_id")
-            .eq("id", user_data["user_id"])
-            .single()
-            .execute()
-        )
-        user_id = user_info.data["admin_id"]
+        principal = current_principal()
+        if not principal:
+            return jsonify({"error": "User not found", "status": "error"}), 404
+        user_id = principal["admin_id"]
 
         # Get config and analyzed bookings
         config_result = (
@@ -338,95 +313,64 @@ def get_activities(token):
         if flexologists_data:
             flexologist_ids = [f["id"] for f in flexologists_data]
 
-            # Fetch ALL records with pagination, but in ONE query per batch instead of per flexologist
-            all_notes_submitted = []
-            offset = 0
-            limit = 1000
-
-            while True:
-                notes_submitted = (
-                    supabase.table("clubready_bookings")
-                    .select("flexologist_name, location")
-                    .eq("submitted", True)
-                    .in_("user_id", flexologist_ids)
-                    .range(offset, offset + limit - 1)
-                    .execute()
-                )
-                all_notes_submitted.extend(notes_submitted.data)
-
-                if len(notes_submitted.data) < limit:
-                    break
-                offset += limit
-
-            if all_notes_submitted:
-                from collections import defaultdict
+            # Stream ALL records with pagination, but in ONE query per batch instead of per flexologist
+            notes_submitted = iter_rows(
+                supabase,
+                "clubready_bookings",
+                "flexologist_name, location",
+                lambda query: query.eq("submitted", True).in_(
+                    "user_id", flexologist_ids
+                ),
+            )
 
-                notes_submitted_per_flexologist = defaultdict(int)
-                notes_submitted_per_location = defaultdict(int)
+            notes_submitted_with_app = 0
+            notes_submitted_per_flexologist = defaultdict(int)
+            notes_submitted_per_location = defaultdict(int)
 
-                for booking in all_notes_submitted:
-                    flex_name = (booking.get("flexologist_name") or "").lower()
-                    if excluded_flexologists and flex_name in excluded_flexologists:
-                        continue
-                    notes_submitted_per_flexologist[flex_name] += 1
-                    notes_submitted_per_location[booking["location"].lower()] += 1
+            for booking in notes_submitted:
+                notes_submitted_with_app += 1
+                flex_name = (booking.get("flexologist_name") or "").lower()
+                if excluded_flexologists and flex_name in excluded_flexologists:
+                    continue
+                notes_submitted_per_flexologist[flex_name] += 1
+                notes_submitted_per_location[booking["location"].lower()] += 1
 
-                notes_submitted_per_flexologist = dict(notes_submitted_per_flexologist)
-                notes_submitted_per_location = dict(notes_submitted_per_location)
-                notes_submitted_with_app = len(all_notes_submitted)
-            else:
-                notes_submitted_with_app = 0
-                notes_submitted_per_flexologist = {}
-                notes_submitted_per_location = {}
+            notes_submitted_per_flexologist = dict(notes_submitted_per_flexologist)
+            notes_submitted_per_location = dict(notes_submitted_per_location)
 
         total_analysed_bookings = None
         notes_analysed_per_location = None
         notes_analysed_per_flexologist = None
 
         if config_data:
-            # Fetch ALL records with pagination
-            all_analysed_bookings = []
-            offset = 0
-            limit = 1000
-
-            while True:
-                analysed_query = (
-                    supabase.table("robot_process_automation_notes_records")
-                    .select("flexologist_name, location")
-                    .eq("config_id", config_data["id"])
-                )
 
+            def analysed_filters(query):
+                query = query.eq("config_id", config_data["id"])
                 if excluded_flexologists_list:
-                    analysed_query = analysed_query.not_.in_(
+                    query = query.not_.in_(
                         "flexologist_name", excluded_flexologists_list
                     )
+                return query
 
-                analysed_bookings = analysed_query.range(
-                    offset, offset + limit - 1
-                ).execute()
-                all_analysed_bookings.extend(analysed_bookings.data)
-
-                if len(analysed_bookings.data) < limit:
-                    break
-                offset += limit
-
-            if all_analysed_bookings:
-                from collections import defaultdict
+            # Stream ALL records with pagination
+            analysed_bookings = iter_rows(
+                supabase,
+                "robot_process_automation_notes_records",
+                "flexologist_name, location",
+                analysed_filters,
+            )
 
-                notes_analysed_per_location = defaultdict(int)
-                notes_analysed_per_flexologist = defaultdict(int)
+            total_analysed_bookings = 0
+            notes_analysed_per_location = defaultdict(int)
+            notes_analysed_per_flexologist = defaultdict(int)
 
-                for booking in all_analysed_bookings:
-                    notes_analysed_per_location[booking["location"]] += 1
-                    notes_analysed_per_flexologist[booking["flexologist_name"]] += 1
+            for booking in analysed_bookings:
+                total_analysed_bookings += 1
+                notes_analysed_per_location[booking["location"]] += 1
+                notes_analysed_per_flexologist[booking["flexologist_name"]] += 1
 
-                notes_analysed_per_location = dict(notes_analysed_per_location)
-                notes_analysed_per_flexologist = dict(notes_analysed_per_flexologist)
-                total_analysed_bookings = len(all_analysed_bookings)
-            else:
-                total_analysed_bookings = 0
-                notes_analysed_per_location = {}
-                notes_analysed_per_flexologist = {}
+            notes_analysed_per_location = dict(notes_analysed_per_location)
+            notes_analysed_per_flexologist = dict(notes_analysed_per_flexologist)
 
         return (
             jsonify(
@@ -602,12 +546,10 @@ def get_second_row(token):
                 ),
                 401,
             )
-        user_id = (
-            supabase.table("users")
-            .select("admin_id")
-            .eq("id", user_data["user_id"])
-            .execute()
-        ).data[0]["admin_id"]
+        principal = current_principal()
+        if not principal:
+            return jsonify({"error": "User not found", "status": "error"}), 404
+        user_id = principal["admin_id"]
         duration = request.args.get("duration", "this_year")
         location = request.args.get("location", None)
         flexologist = request.args.get("flexologist", None)
@@ -658,17 +600,14 @@ def get_second_row(token):
 
         print(start_date, end_date)
 
-        def fetch_total_visits(
-            supabase,
+        def notes_filters(
             get_config_id,
             start_date,
             end_date,
             location=None,
             flexologist=None,
-            limit=1000,
+            first_timer=None,
         ):
-            total_visits = []
-
             # Prepare excluded flexologists list (if any)
             excluded_flexologists_raw = get_config_id.data[0].get(
                 "excluded_flexologists"
@@ -680,190 +619,83 @@ def get_second_row(token):
                 except Exception:
                     excluded_flexologists = None
 
-            # Base query
-            base_query = (
-                supabase.table("robot_process_automation_notes_records")
-                .select("appointment_date")
-                .eq("config_id", get_config_id.data[0]["id"])
-                .neq("status", "No Show")
-                .gte("appointment_date", start_date)
-                .lt("appointment_date", end_date)
-            )
-
-            # Apply exclusion filter only when we have a valid list
-            if excluded_flexologists:
-                base_query = base_query.not_.in_(
-                    "flexologist_name", excluded_flexologists
+            def apply_filters(query):
+                query = (
+                    query.eq("config_id", get_config_id.data[0]["id"])
+                    .neq("status", "No Show")
+                    .gte("appointment_date", start_date)
+                    .lt("appointment_date", end_date)
                 )
+                if first_timer:
+                    query = query.eq("first_timer", first_timer)
 
-            # Apply filters conditionally
-            if location:
-                if location != "all":
-                    base_query = base_query.eq("location", location)
-            elif flexologist:
-                if flexologist != "all":
-                    base_query = base_query.eq("flexologist_name", flexologist)
-
-            # Paginate
-            offset = 0
-            while True:
-                result = base_query.range(offset, offset + limit - 1).execute()
-                data = result.data or []
-                total_visits.extend(data)
-                if len(data) < limit:
-                    break
-                offset += limit
-
-            return total_visits
-
-        def fetch_quality_bookings(
+                # Apply exclusion filter only when we have a valid list
+                if excluded_flexologists:
+                    query = query.not_.in_("flexologist_name", excluded_flexologists)
+
+                # Apply filters conditionally
+                if location:
+                    if location != "all":
+                        query = query.eq("location", location)
+                elif flexologist:
+                    if flexologist != "all":
+                        query = query.eq("flexologist_name", flexologist)
+                return query
+
+            return apply_filters
+
+        def fetch_total_visits(
             supabase,
             get_config_id,
             start_date,
             end_date,
-            first_timer,
             location=None,
             flexologist=None,
-            limit=1000,
         ):
-            all_bookings = []
-
-            # Prepare excluded flexologists list (if any)
-            excluded_flexologists_raw = get_config_id.data[0].get(
-                "excluded_flexologists"
-            )
-            excluded_flexologists = None
-            if excluded_flexologists_raw:
-                try:
-                    excluded_flexologists = json.loads(excluded_flexologists_raw)
-                except Exception:
-                    excluded_flexologists = None
-
-            # Base query
-            base_query = (
-                supabase.table("robot_process_automation_notes_records")
-                .select("first_timer, note_score, appointment_date")
-                .eq("config_id", get_config_id.data[0]["id"])
-                .eq("first_timer", first_timer)
-                .neq("status", "No Show")
-                .gte("appointment_date", start_date)
-                .lt("appointment_date", end_date)
+            return fetch_all_rows(
+                supabase,
+                "robot_process_automation_notes_records",
+                "appointment_date",
+                notes_filters(
+                    get_config_id, start_date, end_date, location, flexologist
+                ),
             )
 
-            # Apply exclusion filter only when we have a valid list
-            if excluded_flexologists:
-                base_query = base_query.not_.in_(
-                    "flexologist_name", excluded_flexologists
-                )
-
-            # Apply filters conditionally
-            if location:
-                if location != "all":
-                    base_query = base_query.eq("location", location)
-            elif flexologist:
-                if flexologist != "all":
-                    base_query = base_query.eq("flexologist_name", flexologist)
-
-            # Paginate and process
-            offset = 0
-            while True:
-                result = base_query.range(offset, offset + limit - 1).execute()
-                data = result.data or []
-
-                # Calculate percentage for each booking
-                for booking in data:
-                    score = (
-                        int(booking["note_score"])
-                        if booking["note_score"] != "N/A"
-                        else 0
-                    )
-
-                    percentage = round(
-                        (score / (16.0 if booking["first_timer"] == "YES" else 4.0))
-                        * 100,
-                        2,
-                    )
-                    booking["percentage"] = percentage
-                    all_bookings.append(booking)
-
-                if len(data) < limit:
-                    break
-                offset += limit
-
-            print(len(all_bookings))
-
-            return all_bookings
-
-        def fetch_aggregate_quality_bookings(
+        def fetch_scored_bookings(
             supabase,
             get_config_id,
             start_date,
             end_date,
+            first_timer=None,
             location=None,
             flexologist=None,
-            limit=1000,
         ):
             all_bookings = []
-            # Prepare excluded flexologists list (if any)
-            excluded_flexologists_raw = get_config_id.data[0].get(
-                "excluded_flexologists"
-            )
-            excluded_flexologists = None
-            if excluded_flexologists_raw:
-                try:
-                    excluded_flexologists = json.loads(excluded_flexologists_raw)
-                except Exception:
-                    excluded_flexologists = None
-
-            # Base query (no first_timer filter for aggregate)
-            base_query = (
-                supabase.table("robot_process_automation_notes_records")
-                .select("first_timer, note_score, appointment_date")
-                .eq("config_id", get_config_id.data[0]["id"])
-                .neq("status", "No Show")
-                .gte("appointment_date", start_date)
-                .lt("appointment_date", end_date)
-            )
 
-            # Apply exclusion filter only when we have a valid list
-            if excluded_flexologists:
-                base_query = base_query.not_.in_(
-                    "flexologist_name", excluded_flexologists
+            # Calculate percentage for each booking as the pages stream in
+            for booking in iter_rows(
+                supabase,
+                "robot_process_automation_notes_records",
+                "first_timer, note_score, appointment_date",
+                notes_filters(
+                    get_config_id,
+                    start_date,
+                    end_date,
+                    location,
+                    flexologist,
+                    first_timer,
+                ),
+            ):
+                score = (
+                    int(booking["note_score"]) if booking["note_score"] != "N/A" else 0
                 )
 
-            # Apply filters conditionally
-            if location:
-                if location != "all":
-                    base_query = base_query.eq("location", location)
-            elif flexologist:
-                if flexologist != "all":
-                    base_query = base_query.eq("flexologist_name", flexologist)
-
-            # Paginate and process
-            offset = 0
-            while True:
-                result = base_query.range(offset, offset + limit - 1).execute()
-                data = result.data or []
-
-                # Calculate percentage for each booking
-                for booking in data:
-                    score = (
-                        int(booking["note_score"])
-                        if booking["note_score"] != "N/A"
-                        else 0
-                    )
-
-                    percentage = round(
-                        (score / (16.0 if booking["first_timer"] == "YES" else 4.0))
-                        * 100,
-                        2,
-                    )
-                    booking["percentage"] = percentage
-                    all_bookings.append(booking)
-
-                if len(data) < limit:
-                    break
-                offset += limit
+                percentage = round(
+                    (score / (16.0 if booking["first_timer"] == "YES" else 4.0)) * 100,
+                    2,
+                )
+                booking["percentage"] = percentage
+                all_bookings.append(booking)
 
             return all_bookings
 
@@ -877,19 +709,6 @@ def get_second_row(token):
 
         if dataset == "percentage_app_submission":
 
-            def fetch_paginated_data(query, limit=1000):
-                """Fetch all data from a Supabase query using pagination."""
-                all_data = []
-                offset = 0
-                while True:
-                    result = query.range(offset, offset + limit - 1).execute()
-                    data = result.data or []
-                    all_data.extend(data)
-                    if len(data) < limit:
-                        break
-                    offset += limit
-                return all_data
-
             def fetch_bookings(
                 supabase,
                 user_id,
@@ -901,7 +720,6 @@ def get_second_row(token):
             ):
                 all_bookings = []
                 submitted_by_app = []
-                limit = 1000
 
                 # Prepare excluded flexologists list (if any)
                 excluded_flexologists_raw = get_config_id.data[0].get(
@@ -914,81 +732,87 @@ def get_second_row(token):
                     except Exception:
                         excluded_flexologists = None
 
-                # Common base for robot_process_automation_notes_records
-                base_notes_query = (
-                    supabase.table("robot_process_automation_notes_records")
-                    .select("appointment_date")
-                    .eq("config_id", get_config_id.data[0]["id"])
-                    .neq("status", "No Show")
-                    .gte("appointment_date", start_date)
-                    .lt("appointment_date", end_date)
-                )
+                def fetch_notes(**filters):
+                    def apply_filters(query):
+                        query = (
+                            query.eq("config_id", get_config_id.data[0]["id"])
+                            .neq("status", "No Show")
+                            .gte("appointment_date", start_date)
+                            .lt("appointment_date", end_date)
+                        )
+                        # Apply exclusion filter only when we have a valid list
+                        if excluded_flexologists:
+                            query = query.not_.in_(
+                                "flexologist_name", excluded_flexologists
+                            )
+                        for column, value in filters.items():
+                            query = query.eq(column, value)
+                        return query
+
+                    return fetch_all_rows(
+                        supabase,
+                        "robot_process_automation_notes_records",
+                        "appointment_date",
+                        apply_filters,
+                    )
 
-                # Common base for clubready_bookings
-                base_bookings_query = (
-                    supabase.table("clubready_bookings")
-                    .select("created_at, submitted, booking_time")
-                    .gte("created_at", start_date)
-                    .lt("created_at", end_date)
-                    .eq("submitted", True)  # Move filter into SQL instead of Python
-                )
+                def fetch_submitted(user_ids=None, **filters):
+                    def apply_filters(query):
+                        # Move filter into SQL instead of Python
+                        query = (
+                            query.gte("created_at", start_date)
+                            .lt("created_at", end_date)
+                            .eq("submitted", True)
+                        )
+                        if excluded_flexologists:
+                            query = query.not_.in_(
+                                "flexologist_name", excluded_flexologists
+                            )
+                        if user_ids is not None:
+                            query = query.in_("user_id", user_ids)
+                        for column, value in filters.items():
+                            query = query.eq(column, value)
+                        return query
+
+                    return fetch_all_rows(
+                        supabase,
+                        "clubready_bookings",
+                        "created_at, submitted, booking_time",
+                        apply_filters,
+                    )
+
+                def fetch_submitted_for_admin():
+                    # Only omit the user if disabled_at exists and start_date > disabled_at
+                    flexologists = (
+                        supabase.table("users")
+                        .select("id")
+                        .eq("admin_id", user_id)
+                        .eq("role_id", 3)
+                        .or_(f"disabled_at.is.null,disabled_at.gte.{start_date}")
+                        .execute()
+                    ).data
+
+                    if flexologists:
+                        flexologist_ids = [f["id"] for f in flexologists]
+
+                        # Batch IDs to respect Supabase filter size
+                        for i in range(0, len(flexologist_ids), 1000):
+                            submitted_by_app.extend(
+                                fetch_submitted(flexologist_ids[i : i + 1000])
+                            )
 
                 # ----------------------------
                 # Case 1: Location is provided
                 # ----------------------------
-                # Apply exclusion filter only when we have a valid list
-                if excluded_flexologists:
-                    base_notes_query = base_notes_query.not_.in_(
-                        "flexologist_name", excluded_flexologists
-                    )
-                    base_bookings_query = base_bookings_query.not_.in_(
-                        "flexologist_name", excluded_flexologists
-                    )
-
                 if location:
                     if location == "all":
                         # Fetch all locations' notes
-                        all_bookings.extend(
-                            fetch_paginated_data(base_notes_query, limit)
-                        )
-
-                        # Fetch all flexologists for this admin
-                        flexologists = (
-                            # Only omit the user if disabled_at exists and start_date > disabled_at
-                            supabase.table("users")
-                            .select("id")
-                            .eq("admin_id", user_id)
-                            .eq("role_id", 3)
-                            .or_(f"disabled_at.is.null,disabled_at.gte.{start_date}")
-                            .execute()
-                        ).data
-
-                        if flexologists:
-                            flexologist_ids = [f["id"] for f in flexologists]
-
-                            # Batch IDs to respect Supabase filter size
-                            for i in range(0, len(flexologist_ids), 1000):
-                                batch_ids = flexologist_ids[i : i + 1000]
-                                flexologist_query = base_bookings_query.in_(
-                                    "user_id", batch_ids
-                                )
-                                submitted_by_app.extend(
-                                    fetch_paginated_data(flexologist_query, limit)
-                                )
-
+                        all_bookings.extend(fetch_notes())
+                        fetch_submitted_for_admin()
                     else:
                         # Specific location
-                        location_notes_query = base_notes_query.eq("location", location)
-                        all_bookings.extend(
-                            fetch_paginated_data(location_notes_query, limit)
-                        )
-
-                        location_bookings_query = base_bookings_query.eq(
-                            "location", location
-                        )
-                        submitted_by_app.extend(
-                            fetch_paginated_data(location_bookings_query, limit)
-                        )
+                        all_bookings.extend(fetch_notes(location=location))
+                        submitted_by_app.extend(fetch_submitted(location=location))
 
                 # ----------------------------
                 # Case 2: Flexologist is provided
@@ -996,44 +820,13 @@ def get_second_row(token):
                 else:
                     if flexologist == "all":
                         # Fetch all notes (all flexologists)
-                        all_bookings.extend(
-                            fetch_paginated_data(base_notes_query, limit)
-                        )
-
-                        # Get all flexologists for this admin
-                        flexologists = (
-                            supabase.table("users")
-                            .select("id")
-                            .eq("admin_id", user_id)
-                            .eq("role_id", 3)
-                            .or_(f"disabled_at.is.null,disabled_at.gte.{start_date}")
-                            .execute()
-                        ).data
-
-                        if flexologists:
-                            flexologist_ids = [f["id"] for f in flexologists]
-                            for i in range(0, len(flexologist_ids), 1000):
-                                batch_ids = flexologist_ids[i : i + 1000]
-                                flexologist_query = base_bookings_query.in_(
-                                    "user_id", batch_ids
-                                )
-                                submitted_by_app.extend(
-                                    fetch_paginated_data(flexologist_query, limit)
-                                )
+                        all_bookings.extend(fetch_notes())
+                        fetch_submitted_for_admin()
                     else:
                         # Specific flexologist
-                        flexologist_notes_query = base_notes_query.eq(
-                            "flexologist_name", flexologist
-                        )
-                        all_bookings.extend(
-                            fetch_paginated_data(flexologist_notes_query, limit)
-                        )
-
-                        flexologist_bookings_query = base_bookings_query.eq(
-                            "flexologist_name", flexologist
-                        )
+                        all_bookings.extend(fetch_notes(flexologist_name=flexologist))
                         submitted_by_app.extend(
-                            fetch_paginated_data(flexologist_bookings_query, limit)
+                            fetch_submitted(flexologist_name=flexologist)
                         )
 
                 return all_bookings, submitted_by_app
@@ -1067,7 +860,7 @@ def get_second_row(token):
             if not get_config_id.data:
                 return jsonify({"error": "No config id found", "status": "error"}), 400
 
-            all_bookings = fetch_quality_bookings(
+            all_bookings = fetch_scored_bookings(
                 supabase,
                 get_config_id,
                 start_date,
@@ -1092,8 +885,13 @@ def get_second_row(token):
             if not get_config_id.data:
                 return jsonify({"error": "No config id found", "status": "error"}), 400
 
-            all_bookings = fetch_aggregate_quality_bookings(
-                supabase, get_config_id, start_date, end_date, location, flexologist
+            all_bookings = fetch_scored_bookings(
+                supabase,
+                get_config_id,
+                start_date,
+                end_date,
+                location=location,
+                flexologist=flexologist,
             )
 
             data = handle_avg_aggregate_note_quality_percentage(
@@ -1111,20 +909,15 @@ def get_second_row(token):
 @require_bearer_token
 def get_third_row(token):
     try:
-        user_data = decode_jwt_token(token)
         duration = request.args.get("duration", "this_year")
 
         # Get user's admin_id
-        user_info = (
-            supabase.table("users")
-            .select("admin_id")
-            .eq("id", user_data["user_id"])
-            .single()
-            .execute()
-        )
+        principal = current_principal()
+        if not principal:
+            return jsonify({"error": "User not found", "status": "error"}), 404
+        user_id = principal["admin_id"]
 
         # get config details
-        user_id = user_info.data["admin_id"]
 
         get_config_id = (
             supabase.table("robot_process_automation_config")
@@ -1256,7 +1049,9 @@ def get_fourth_row(token):
             return jsonify({"error": "Unauthorized", "status": "error"}), 401
 
         # Get all businesses
-        businesses_info = supabase.table("businesses").select("*").execute()
+        businesses_info = (
+            supabase.table("businesses").select(BUSINESS_SUMMARY).execute()
+        )
 
         if not businesses_info.data:
             return jsonify({"error": "Businesses not found", "status": "error"}), 404
@@ -8,6 +8,7 @@ import os
 import urllib.parse
 from ..utils.mail import send_email
 from ..notification import insert_notification
+from ..utils.principal import invalidate_principal
 
 
 routes = Blueprint("user_management", __name__)
@@ -309,6 +310,7 @@ def add_password():
             .eq("email", email)
             .execute()
         )
+        invalidate_principal(updated_user.data[0]["id"])
 
         insert_notification(
             updated_user.data[0]["id"],
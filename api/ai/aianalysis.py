@@ -1,13 +1,66 @@
-from openai import OpenAI, RateLimitError
+from ..utils.booking_html import (
+    BOOKING_FIELDS,
+    extraction_stats,
+    missing_fields,
+    parse_booking_html,
+)
+from ..utils.cache import SQLiteCache
+from ..utils.config import LLM_CACHE_PATH
+from .gateway import gateway
+from .prompts import format_messages, log_prompt_usage, scrutinize_messages
+from .routing import ROUTES, route
+from .streaming import NoteSections
+from .structured import (
+    BOOKING_SCHEMA,
+    FORMATTED_NOTES_SCHEMA,
+    QUESTIONS_SCHEMA,
+    complete_json,
+    output_stats,
+    validate_output,
+)
+import hashlib
 import json
+import logging
+import os
 import time
 
 
-# OpenAI configuration
-client = OpenAI()
+# Returned when a call fails, and by the orchestrator when one is too late
+SCRUTINIZE_FALLBACK = {"questions": ["No questions found error"]}
+FORMAT_FALLBACK = {"notes": ["No notes formatted error"]}
+
+# Parsed completions by prompt, so unchanged notes are not sent twice
+llm_cache = SQLiteCache(
+    LLM_CACHE_PATH,
+    ttl=float(os.getenv("LLM_CACHE_TTL", str(30 * 86400))),
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000")),
+)
+
+
+def completion_key(model, messages):
+    """Hash of everything that decides a completion at temperature 0.
+
+    The messages are the rendered prompts, so a change to the template, to
+    context.txt, to the notes or to the active flag is a different key.
+    """
+    payload = json.dumps({"model": model, "messages": messages}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
 
 
 def extract_booking_data_from_html(html):
+    """The booking fields of a ClubReady booking panel.
+
+    The panel markup is parsed directly; the LLM is only asked when a
+    required field is not where the parser looks for it, e.g. after a
+    ClubReady layout change.
+    """
+    parsed = parse_booking_html(html)
+    missing = missing_fields(parsed)
+    if not missing:
+        extraction_stats.count("parsed")
+        return parsed
+    extraction_stats.count("fallback")
+    logging.warning(f"Booking HTML is missing {', '.join(missing)}, asking the LLM")
 
     prompt = """
     Analyze the provided HTML concisely and extract these fields:
@@ -23,45 +76,30 @@ def extract_booking_data_from_html(html):
     {html}
     """
 
-    max_retries = 3
-    retry_delay = 8
-
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You’re a data extractor that always returns JSON.",
-                    },
-                    {"role": "user", "content": prompt.format(html=html)},
-                ],
-                temperature=0,
-            )
-            result = response.choices[0].message.content
-            if not isinstance(result, str):
-                raise ValueError("Response content is not a string")
-
-            cleaned_result = result.strip()
-            if cleaned_result.startswith("```json"):
-                cleaned_result = cleaned_result[7:-3].strip()
-
-            data = json.loads(cleaned_result)
-            return data
-
-        except RateLimitError as e:
-            print(f"Rate limit error: {e}")
-            if attempt < max_retries - 1:
-                wait_time = retry_delay * (2**attempt)
-                print(f"Retrying in {wait_time}s (attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
-            else:
-                print("Max retries reached")
-                break
-        except Exception as e:
-            print(f"OpenAI error: {e}")
-            break
+    try:
+        data = complete_json(
+            "extract_booking_data",
+            BOOKING_SCHEMA,
+            strict=True,
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You’re a data extractor that always returns JSON.",
+                },
+                {"role": "user", "content": prompt.format(html=html)},
+            ],
+            temperature=0,
+        )
+        # What the parser did find stands in for what the LLM did not
+        return {
+            field: value if value != "N/A" else parsed.get(field, value)
+            for field, value in data.items()
+            if field in BOOKING_FIELDS
+        }
+
+    except Exception as e:
+        print(f"OpenAI error: {e}")
     data = {
         "client_name": "Could not process",
         "member_rep_name": "Could not process",
@@ -74,181 +112,131 @@ def extract_booking_data_from_html(html):
 
 
 def scrutinize_notes(notes, active):
-    with open("api/ai/context.txt", "r") as file:
-        context = file.read()
-
-    if active == "YES":
-        extra = ""
-    else:
-        extra = "5. Membership Recommendation: Recommends whether the client should continue, upgrade, or adjust their membership based on their progress, needs, or goals."
-
-    prompt = """
-    - This is the context:
-    {context}
+    # model = "ft:gpt-4o-mini-2024-07-18:studio-hr::BmdJ6YQJ"
+    messages = scrutinize_messages(notes, active)
+    primary = ROUTES["scrutinize_notes"][0]
+    cache_key = completion_key(primary, messages)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        data, model = route(
+            "scrutinize_notes",
+            lambda model: complete_json(
+                "scrutinize_notes",
+                QUESTIONS_SCHEMA,
+                strict=True,
+                model=model,
+                messages=messages,
+                temperature=0,
+            ),
+        )
+        # Only the primary's answers are cached under its key
+        if model == primary:
+            llm_cache.set(cache_key, data)
+        return data
 
-    - Input Notes:
-    {notes}
+    except Exception as e:
+        print(f"OpenAI error: {e}")
+    return dict(SCRUTINIZE_FALLBACK)
 
-    Analyze the provided notes to determine if they meet the requirements for a high-quality note, as outlined below. Follow these steps for each requirement to ensure no details are missed:
+def format_notes(notes):
+    messages = format_messages(notes)
+    primary = ROUTES["format_notes"][0]
+    cache_key = completion_key(primary, messages)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        data, model = route(
+            "format_notes",
+            lambda model: complete_json(
+                "format_notes",
+                FORMATTED_NOTES_SCHEMA,
+                model=model,
+                messages=messages,
+                temperature=0,
+            ),
+        )
+        # Only the primary's answers are cached under its key
+        if model == primary:
+            llm_cache.set(cache_key, data)
 
-    1. **Verify Presence**: Check if the information is explicitly stated (e.g., "2-3 PNF on shoulders"), implicitly provided (e.g., 'knots' as tightness, 'stress' as a reason for tension), or completely absent. Use the provided context to interpret abbreviations (e.g., 'PNF' as Proprioceptive Neuromuscular Facilitation, 'HF' as hip flexors, 'hammies' as hamstrings, 'HW' as homework) and terms (e.g., 'tight spots' as imbalances).
-    2. **Assess Sufficiency**: Consider partial or implicit information sufficient unless the requirement explicitly demands a clear statement (e.g., a reason for no homework). For homework, if no tasks or reason for not assigning them is mentioned, treat it as missing.
-    3. **Generate Questions**: Create a concise, non-redundant question only for requirements that are completely missing or unclear. Avoid questions for requirements with partial or implicit information (e.g., a list of muscle groups for the next session). Do not ask any Question regarding MAPS
+        return data
 
-    Return a JSON object with a single field, "questions", containing a list of questions (strings). If all requirements are met, return an empty list ([]). Thoroughly review the context and notes before generating questions to ensure accurate interpretation of all details.
+    except Exception as e:
+        print(f"OpenAI error: {e}")
+    return dict(FORMAT_FALLBACK)
 
-    - Requirements for a Quality Note:
-    1. Actions Taken: Describes the stretching techniques (e.g., PNF, static, dynamic), muscle groups targeted, or exercises performed, including any details like duration, cycles, or range of motion (ROM).
-    2. Purpose: States or implies the goals or reasons for the actions, such as reducing tightness, improving flexibility, addressing imbalances, or managing pain/stress, as defined in the context.
-    3. Next Session Plan: Lists specific muscle groups, techniques, or periodization phase (e.g., Foundation, Active, Performance) planned for the next session.
-    4. Homework: Specifies any stretching or mobility tasks assigned to the client, or provides a clear reason why no homework was assigned (e.g., lack of time, client preference). If neither tasks nor a reason is mentioned, consider this requirement unmet.
-    {extra}
 
+def stream_format_notes(notes):
+    """format_notes, yielding each section as soon as the model has written it.
 
+    Yields `("section", key, value)` for every section, then
+    `("result", data, None)` with the same result format_notes returns.
+    A stream is not hedged, but the fallback model is streamed instead when
+    the primary fails before its first section. When it fails after, the
+    result is the sections already sent, so the stored notes match them.
     """
-    max_retries = 3
-    retry_delay = 8
-
-    for attempt in range(max_retries):
+    messages = format_messages(notes)
+    primary = ROUTES["format_notes"][0]
+    cache_key = completion_key(primary, messages)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        for note in cached.get("notes", []):
+            if isinstance(note, dict):
+                for key, value in note.items():
+                    yield "section", key, value
+        yield "result", cached, None
+        return
+
+    streamed = {}
+    for model in ROUTES["format_notes"]:
         try:
-            response = client.chat.completions.create(
-                # model="ft:gpt-4o-mini-2024-07-18:studio-hr::BmdJ6YQJ",
-                model="ft:gpt-4o-mini-2024-07-18:studio-hr::BmhbGA6R",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a note scrutinizer that analyzes fitness notes and always returns valid JSON output, formatted as specified, with no extra text, code blocks, or comments. Ensure the response is a valid JSON object with a single 'questions' field containing a list of strings.",
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt.format(
-                            context=context, notes=notes, extra=extra
-                        ),
-                    },
-                ],
+            started = time.monotonic()
+            stream = gateway.chat_completion(
+                model=model,
+                messages=messages,
                 temperature=0,
+                response_format={"type": "json_object"},
+                stream=True,
+                stream_options={"include_usage": True},
             )
-            result = response.choices[0].message.content
-            if not isinstance(result, str):
-                raise ValueError("Response content is not a string")
-
-            cleaned_result = result.strip()
-            if cleaned_result.startswith("```json"):
-                cleaned_result = cleaned_result[7:-3].strip()
-
-            data = json.loads(cleaned_result)
-            return data
-
-        except RateLimitError as e:
-            print(f"Rate limit error: {e}")
-            if attempt < max_retries - 1:
-                wait_time = retry_delay * (2**attempt)
-                print(f"Retrying in {wait_time}s (attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
-            else:
-                print("Max retries reached")
-                break
-        except Exception as e:
-            print(f"OpenAI error: {e}")
-            break
-    data = {"questions": ["No questions found error"]}
-
-    return data
-
-def format_notes(notes):
-    with open("api/ai/context.txt", "r") as file:
-        context = file.read()
-
-    prompt = """
-     - This is the context:
-    {context}
-
-    - The notes:
-    {notes}
-
-     Organize StretchLab Flexologist session notes into a structured and concise format following the SOAP note style commonly used in physical therapy. Focus on detailing what actions were taken during the session, why they were performed, and future plans. Ensure to exclude any 'Meeting Summary' details such as client name, Flexologist, or location. Highlight any missing information and provide suggestions for improvement in note-taking, if necessary.
-      # Steps:
-      1. What was done in the session:
-         - Identify the phase of periodization. Foundation phase is Foundation, Active phase is Active, Performance phase is Performance
-         - Describe the work being done within that phase, including variables and focus areas.
-         - Class is the session number or the class number or the logging number.
-      2. Why the actions were performed:
-         - Explain the reasoning behind the techniques used, such as addressing muscle guarding or enhancing tissue tolerance.
-      3. Future plans:
-         - Outline plans for the next session.
-         - Include homework assignments, such as specific exercise videos or in-person demonstrations.
-         - Suggest any relevant lifestyle changes or new activities.
-      4. Identify and Highlight Missing Information:
-         - Note any gaps in the provided session notes.
-      5. Suggestions for Improvement:
-         - Offer brief suggestions to enhance the quality of note-taking by the Flexologist.
-      # Output Format:
-        Return a JSON object with a single field, "notes", which is an array containing the formatted note objects i.e Class (if mentioned), Phase (if mentioned), Maps (if mentioned), Today, Next, PNF (if mentioned), Homework (if mentioned), Details, Recommendation (if mentioned), Considerations, Missing Information and Suggestions
-
-      # here is an example of a formatted note. Strictly adhere to the format provided:
-        **Class**: 23 or Session #26 [if class is not mentioned, do not include it in JSON output]
-        **Maps**: Maps score 38, or something like "Composite 48, Mobility 44, Activation  55, Posture 59, Symmetry 48"- this structure is also Maps. Check the context to get more information[if any information about maps is not mentioned, do not include it in JSON output]
-        **Phase**: Active [if phase is not mentioned, do not include it in JSON output]
-        **Today**: Full body flexibility and mobility improvement 
-        **Next**: Focus on shoulders, hip, and abductor regions to address tightness identified in this session.
-        **PNF**: 2-3 PNF or PNF 2-3
-        **Homework**: Assigned shoulder and doorway stretches. Recommend practicing these daily to enhance shoulder mobility and alleviate tightness. Consider suggesting specific resources or videos for guidance. [if homework is not mentioned, do not include it in JSON output]
-        **Details**: This is the details of the notes. Capturing all the intricacies of the note - the client's conversation, discussions during the session, reasons and other information stated, MAPS and other information, it should emcompass the inner detail of the session; keeping the tone
-        **Recommendation**: 4x50 or 4x25 minutes, or some sort of recommendation [if not provided, do not include it in JSON output]
-        **Considerations**: Ayesha's long hours at the computer may contribute to her shoulder tension; discussing ergonomic adjustments or breaks during work hours could be beneficial in future sessions.[if not provided, do not include it in JSON output]
-        **Missing Information**:The Class, Phase, what was done in the session and next plan were not mentioned
-        
-        **Suggested Improvement**:
-        Consider providing more detailed observations of each stretch's effectiveness and any specific feedback from the client regarding comfort or difficulty.
-    
-
-    """
-    max_retries = 3
-    retry_delay = 8
-
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a note formatter that formats notes into a structured and concise format following the format provided in the example. Focus on detailing what actions were taken during the session, why they were performed, and future plans. Ensure to exclude any 'Meeting Summary' details such as client name, Flexologist, or location. Highlight any missing information and provide suggestions for improvement in note-taking, if necessary.",
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt.format(context=context,notes=notes),
-                    },
-                ],
-                temperature=0,
+            sections = NoteSections()
+            usage = None
+            for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                    log_prompt_usage("format_notes", chunk)
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                for key, value in sections.feed(chunk.choices[0].delta.content):
+                    streamed[key] = value
+                    yield "section", key, value
+            gateway.models.record(model, time.monotonic() - started, usage)
+
+            output_stats.count("format_notes", "calls")
+            data = validate_output(
+                "format_notes", sections.text, FORMATTED_NOTES_SCHEMA
             )
-            result = response.choices[0].message.content
-            if not isinstance(result, str):
-                raise ValueError("Response content is not a string")
-
-            cleaned_result = result.strip()
-            if cleaned_result.startswith("```json"):
-                cleaned_result = cleaned_result[7:-3].strip()
-
-            data = json.loads(cleaned_result)
-
-            return data
-
-        except RateLimitError as e:
-            print(f"Rate limit error: {e}")
-            if attempt < max_retries - 1:
-                wait_time = retry_delay * (2**attempt)
-                print(f"Retrying in {wait_time}s (attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
-            else:
-                print("Max retries reached")
-                break
+            gateway.models.count(model, "wins")
+            if model == primary:
+                llm_cache.set(cache_key, data)
+            yield "result", data, None
+            return
+
         except Exception as e:
             print(f"OpenAI error: {e}")
-            break
-    data = {"notes": ["No notes formatted error"]}
-
-    return data
+        if streamed:
+            logging.warning(
+                f"format_notes stream failed after {len(streamed)} sections, "
+                "keeping them"
+            )
+            yield "result", {"notes": [streamed]}, None
+            return
+    yield "result", dict(FORMAT_FALLBACK), None
 
 
 # def format_notes(notes):
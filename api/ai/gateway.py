@@ -0,0 +1,344 @@
+from collections import deque
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+)
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from ..utils.config import OPENAI_GATEWAY_PATH
+
+# Limits of the OpenAI organisation, shared by every worker of the host
+OPENAI_REQUESTS_PER_MINUTE = float(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500"))
+OPENAI_TOKENS_PER_MINUTE = float(os.getenv("OPENAI_TOKENS_PER_MINUTE", "200000"))
+# Retries allowed per minute across the workers, so an outage is not
+# answered with a retry storm
+OPENAI_RETRIES_PER_MINUTE = float(os.getenv("OPENAI_RETRIES_PER_MINUTE", "30"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+# How long a call may wait for the limiter and its retries before giving up
+OPENAI_MAX_WAIT = float(os.getenv("OPENAI_MAX_WAIT", "20"))
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 20.0
+# Completion tokens counted against the bucket when max_tokens is not set
+DEFAULT_COMPLETION_TOKENS = 1000
+# Latencies kept per model for its percentiles
+LATENCY_WINDOW = 200
+
+# USD per million prompt, cached prompt and completion tokens. Fine-tunes
+# are priced by their base model under "ft:<base>"
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "ft:gpt-4o-mini-2024-07-18": (0.30, 0.15, 1.20),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+}
+
+RETRYABLE_ERRORS = (
+    RateLimitError,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+)
+
+
+class GatewayBusy(Exception):
+    """The call could not get a slot or a retry within its wait budget."""
+
+
+class TokenBuckets:
+    """Token buckets kept in an SQLite file, so every process draws from them.
+
+    Each bucket holds up to one minute of its rate and refills continuously.
+    A pause moves the refill start into the future, which empties the bucket
+    until then.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "name TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def take(self, amounts):
+        """Take from several buckets at once, all or nothing.
+
+        `amounts` maps a bucket name to `(amount, per_minute)`. Returns 0 if
+        the amounts were taken, otherwise the seconds until they will be.
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = {}
+            wait = 0.0
+            for name, (amount, per_minute) in amounts.items():
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE name = ?", (name,)
+                ).fetchone()
+                if row is None:
+                    tokens = per_minute
+                else:
+                    refill = (now - row[1]) * per_minute / 60
+                    tokens = min(per_minute, row[0] + refill)
+                # A call larger than the bucket waits for a full bucket
+                amount = min(amount, per_minute)
+                levels[name] = tokens - amount
+                if tokens < amount:
+                    wait = max(wait, (amount - tokens) * 60 / per_minute)
+
+            if not wait:
+                for name, tokens in levels.items():
+                    conn.execute(
+                        "INSERT OR REPLACE INTO buckets (name, tokens, updated_at) "
+                        "VALUES (?, ?, ?)",
+                        (name, tokens, now),
+                    )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def pause(self, name, seconds):
+        """Hold the bucket empty for `seconds`, e.g. for a Retry-After."""
+        until = time.time() + seconds
+        self._connection().execute(
+            "INSERT INTO buckets (name, tokens, updated_at) VALUES (?, 0, ?) "
+            "ON CONFLICT (name) DO UPDATE SET tokens = 0, "
+            "updated_at = max(updated_at, excluded.updated_at)",
+            (name, until),
+        )
+
+
+def estimate_tokens(request):
+    """Rough token count of a chat completion: 4 characters per token."""
+    characters = sum(len(str(message["content"])) for message in request["messages"])
+    completion = request.get("max_tokens") or DEFAULT_COMPLETION_TOKENS
+    return characters // 4 + completion
+
+
+def retry_after(error):
+    """Seconds asked for by the Retry-After headers of an error, if any."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        if response.headers.get("retry-after-ms"):
+            return float(response.headers["retry-after-ms"]) / 1000
+        if response.headers.get("retry-after"):
+            return float(response.headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+def completion_cost(model, usage):
+    """USD cost of a completion's usage, None for a model without a price."""
+    if model.startswith("ft:"):
+        model = "ft:" + model.split(":")[1]
+    prices = MODEL_PRICES.get(model)
+    if prices is None or usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    return (
+        (usage.prompt_tokens - cached) * prices[0]
+        + cached * prices[1]
+        + usage.completion_tokens * prices[2]
+    ) / 1_000_000
+
+
+class ModelStats:
+    """Latency, errors, tokens and cost of the completions, per model."""
+
+    def __init__(self):
+        self.models = {}
+        self._lock = threading.Lock()
+
+    def _model(self, model):
+        return self.models.setdefault(
+            model,
+            {
+                "latencies": deque(maxlen=LATENCY_WINDOW),
+                "calls": 0,
+                "errors": 0,
+                "hedged": 0,
+                "wins": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "cost": 0.0,
+            },
+        )
+
+    def record(self, model, seconds, usage=None):
+        cost = completion_cost(model, usage)
+        with self._lock:
+            stats = self._model(model)
+            stats["calls"] += 1
+            stats["latencies"].append(seconds)
+            if usage is not None:
+                stats["prompt_tokens"] += usage.prompt_tokens
+                stats["completion_tokens"] += usage.completion_tokens
+            if cost:
+                stats["cost"] += cost
+
+    def count(self, model, name):
+        with self._lock:
+            self._model(model)[name] += 1
+
+    def percentile(self, model, percent, min_samples=1):
+        """Latency percentile of the recent calls, None with too few calls."""
+        with self._lock:
+            latencies = sorted(self.models.get(model, {}).get("latencies", []))
+        if len(latencies) < min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100))]
+
+    def snapshot(self):
+        with self._lock:
+            models = {
+                model: {
+                    **{k: v for k, v in stats.items() if k != "latencies"},
+                    "cost": round(stats["cost"], 4),
+                }
+                for model, stats in self.models.items()
+            }
+        for model, stats in models.items():
+            for percent in (50, 95):
+                latency = self.percentile(model, percent)
+                stats[f"p{percent}"] = (
+                    round(latency, 2) if latency is not None else None
+                )
+        return models
+
+
+class OpenAIGateway:
+    """Every chat completion of the app goes through here.
+
+    Calls take a request slot and their estimated tokens from the shared
+    buckets before they are sent. A 429 with Retry-After pauses the request
+    bucket for every worker. Retryable errors are retried with full jitter
+    exponential backoff, as long as the shared retry budget allows. A call
+    that cannot be served within OPENAI_MAX_WAIT raises GatewayBusy, which
+    the callers answer with their fallback result.
+
+    The latency, tokens and cost of every answered call are kept per model
+    in `models`; streamed calls are recorded by their caller once read.
+    """
+
+    def __init__(self, client, buckets):
+        self.client = client
+        self.buckets = buckets
+        self.waiting = 0
+        self.max_waiting = 0
+        self.throttled = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.busy = 0
+        self.models = ModelStats()
+        self._lock = threading.Lock()
+
+    def _count(self, name, value=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+            if name == "waiting":
+                self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def _acquire(self, tokens, deadline):
+        self._count("waiting")
+        try:
+            while True:
+                wait = self.buckets.take(
+                    {
+                        "requests": (1, OPENAI_REQUESTS_PER_MINUTE),
+                        "tokens": (tokens, OPENAI_TOKENS_PER_MINUTE),
+                    }
+                )
+                if not wait:
+                    return
+                if time.monotonic() + wait > deadline:
+                    self._count("busy")
+                    raise GatewayBusy("OpenAI rate limit reached, try again later")
+                self._count("throttled")
+                # Jitter spreads the waiting callers over the refill
+                time.sleep(wait + random.uniform(0, 0.1))
+        finally:
+            self._count("waiting", -1)
+
+    def _backoff(self, attempt, error, deadline):
+        delay = retry_after(error)
+        if isinstance(error, RateLimitError):
+            self._count("rate_limited")
+            if delay:
+                self.buckets.pause("requests", delay)
+        if delay is None:
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+
+        if attempt + 1 >= OPENAI_MAX_RETRIES or time.monotonic() + delay > deadline:
+            raise error
+        if self.buckets.take({"retries": (1, OPENAI_RETRIES_PER_MINUTE)}):
+            logging.warning("OpenAI retry budget spent, not retrying")
+            raise error
+        self._count("retries")
+        logging.warning(
+            f"OpenAI error {type(error).__name__}, retrying in {delay:.1f}s"
+        )
+        time.sleep(delay)
+
+    def chat_completion(self, **request):
+        """`client.chat.completions.create(**request)`, rate limited."""
+        deadline = time.monotonic() + OPENAI_MAX_WAIT
+        tokens = estimate_tokens(request)
+        attempt = 0
+        while True:
+            self._acquire(tokens, deadline)
+            started = time.monotonic()
+            try:
+                response = self.client.chat.completions.create(**request)
+            except RETRYABLE_ERRORS as e:
+                self.models.count(request["model"], "errors")
+                self._backoff(attempt, e, deadline)
+                attempt += 1
+                continue
+            except Exception:
+                self.models.count(request["model"], "errors")
+                raise
+            if not request.get("stream"):
+                self.models.record(
+                    request["model"], time.monotonic() - started, response.usage
+                )
+            return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "throttled": self.throttled,
+                "rate_limited": self.rate_limited,
+                "retries": self.retries,
+                "busy": self.busy,
+            }
+
+
+# OpenAI configuration, retries are left to the gateway
+client = OpenAI(max_retries=0)
+gateway = OpenAIGateway(client, TokenBuckets(OPENAI_GATEWAY_PATH))
@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import logging
+import os
+import time
+
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "8"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "45"))
+
+# Shared by every request of the worker, so a burst of requests queues its
+# completions here instead of opening a thread per call
+executor = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="llm")
+# Background LLM jobs, which wait on `executor` and so cannot run in it
+LLM_JOB_WORKERS = int(os.getenv("LLM_JOB_WORKERS", str(LLM_WORKERS)))
+job_executor = ThreadPoolExecutor(
+    max_workers=LLM_JOB_WORKERS, thread_name_prefix="llm-job"
+)
+
+
+def run_llm_tasks(tasks):
+    """Run independent LLM calls concurrently and return their results by name.
+
+    `tasks` maps a name to `(call, fallback)` or `(call, fallback, deadline)`,
+    where `call` takes no arguments and `deadline` is in seconds from now,
+    LLM_DEADLINE by default. A call that raises or misses its deadline gets
+    its `fallback` as result, so the others are still returned. A late call
+    keeps its worker thread until the OpenAI client gives up on it.
+    """
+    started = time.monotonic()
+    futures = {name: executor.submit(task[0]) for name, task in tasks.items()}
+
+    results = {}
+    for name, future in futures.items():
+        fallback = tasks[name][1]
+        deadline = tasks[name][2] if len(tasks[name]) > 2 else LLM_DEADLINE
+        try:
+            remaining = max(0.0, deadline - (time.monotonic() - started))
+            results[name] = future.result(timeout=remaining)
+        except FutureTimeout:
+            future.cancel()
+            logging.warning(f"LLM task {name} missed its {deadline}s deadline")
+            results[name] = fallback
+        except Exception as e:
+            logging.error(f"LLM task {name} failed: {str(e)}")
+            results[name] = fallback
+    return results
@@ -0,0 +1,144 @@
+import logging
+import os
+import threading
+
+CONTEXT_PATH = os.path.join(os.path.dirname(__file__), "context.txt")
+
+# The prompts start with their static part: the context, then the
+# instructions. OpenAI caches a prompt prefix it has seen recently, so only
+# the notes at the end are new tokens on each call.
+
+SCRUTINIZE_SYSTEM = "You are a note scrutinizer that analyzes fitness notes and always returns valid JSON output, formatted as specified, with no extra text, code blocks, or comments. Ensure the response is a valid JSON object with a single 'questions' field containing a list of strings."
+
+SCRUTINIZE_INSTRUCTIONS = """
+Analyze the provided notes to determine if they meet the requirements for a high-quality note, as outlined below. Follow these steps for each requirement to ensure no details are missed:
+
+1. **Verify Presence**: Check if the information is explicitly stated (e.g., "2-3 PNF on shoulders"), implicitly provided (e.g., 'knots' as tightness, 'stress' as a reason for tension), or completely absent. Use the provided context to interpret abbreviations (e.g., 'PNF' as Proprioceptive Neuromuscular Facilitation, 'HF' as hip flexors, 'hammies' as hamstrings, 'HW' as homework) and terms (e.g., 'tight spots' as imbalances).
+2. **Assess Sufficiency**: Consider partial or implicit information sufficient unless the requirement explicitly demands a clear statement (e.g., a reason for no homework). For homework, if no tasks or reason for not assigning them is mentioned, treat it as missing.
+3. **Generate Questions**: Create a concise, non-redundant question only for requirements that are completely missing or unclear. Avoid questions for requirements with partial or implicit information (e.g., a list of muscle groups for the next session). Do not ask any Question regarding MAPS
+
+Return a JSON object with a single field, "questions", containing a list of questions (strings). If all requirements are met, return an empty list ([]). Thoroughly review the context and notes before generating questions to ensure accurate interpretation of all details.
+
+- Requirements for a Quality Note:
+1. Actions Taken: Describes the stretching techniques (e.g., PNF, static, dynamic), muscle groups targeted, or exercises performed, including any details like duration, cycles, or range of motion (ROM).
+2. Purpose: States or implies the goals or reasons for the actions, such as reducing tightness, improving flexibility, addressing imbalances, or managing pain/stress, as defined in the context.
+3. Next Session Plan: Lists specific muscle groups, techniques, or periodization phase (e.g., Foundation, Active, Performance) planned for the next session.
+4. Homework: Specifies any stretching or mobility tasks assigned to the client, or provides a clear reason why no homework was assigned (e.g., lack of time, client preference). If neither tasks nor a reason is mentioned, consider this requirement unmet.
+"""
+
+# Asked of clients who are not active members, appended after requirement 4
+MEMBERSHIP_REQUIREMENT = "5. Membership Recommendation: Recommends whether the client should continue, upgrade, or adjust their membership based on their progress, needs, or goals."
+
+FORMAT_SYSTEM = "You are a note formatter that formats notes into a structured and concise format following the format provided in the example. Focus on detailing what actions were taken during the session, why they were performed, and future plans. Ensure to exclude any 'Meeting Summary' details such as client name, Flexologist, or location. Highlight any missing information and provide suggestions for improvement in note-taking, if necessary."
+
+FORMAT_INSTRUCTIONS = """
+Organize StretchLab Flexologist session notes into a structured and concise format following the SOAP note style commonly used in physical therapy. Focus on detailing what actions were taken during the session, why they were performed, and future plans. Ensure to exclude any 'Meeting Summary' details such as client name, Flexologist, or location. Highlight any missing information and provide suggestions for improvement in note-taking, if necessary.
+# Steps:
+1. What was done in the session:
+   - Identify the phase of periodization. Foundation phase is Foundation, Active phase is Active, Performance phase is Performance
+   - Describe the work being done within that phase, including variables and focus areas.
+   - Class is the session number or the class number or the logging number.
+2. Why the actions were performed:
+   - Explain the reasoning behind the techniques used, such as addressing muscle guarding or enhancing tissue tolerance.
+3. Future plans:
+   - Outline plans for the next session.
+   - Include homework assignments, such as specific exercise videos or in-person demonstrations.
+   - Suggest any relevant lifestyle changes or new activities.
+4. Identify and Highlight Missing Information:
+   - Note any gaps in the provided session notes.
+5. Suggestions for Improvement:
+   - Offer brief suggestions to enhance the quality of note-taking by the Flexologist.
+# Output Format:
+  Return a JSON object with a single field, "notes", which is an array containing the formatted note objects i.e Class (if mentioned), Phase (if mentioned), Maps (if mentioned), Today, Next, PNF (if mentioned), Homework (if mentioned), Details, Recommendation (if mentioned), Considerations, Missing Information and Suggestions
+
+# here is an example of a formatted note. Strictly adhere to the format provided:
+  **Class**: 23 or Session #26 [if class is not mentioned, do not include it in JSON output]
+  **Maps**: Maps score 38, or something like "Composite 48, Mobility 44, Activation  55, Posture 59, Symmetry 48"- this structure is also Maps. Check the context to get more information[if any information about maps is not mentioned, do not include it in JSON output]
+  **Phase**: Active [if phase is not mentioned, do not include it in JSON output]
+  **Today**: Full body flexibility and mobility improvement 
+  **Next**: Focus on shoulders, hip, and abductor regions to address tightness identified in this session.
+  **PNF**: 2-3 PNF or PNF 2-3
+  **Homework**: Assigned shoulder and doorway stretches. Recommend practicing these daily to enhance shoulder mobility and alleviate tightness. Consider suggesting specific resources or videos for guidance. [if homework is not mentioned, do not include it in JSON output]
+  **Details**: This is the details of the notes. Capturing all the intricacies of the note - the client's conversation, discussions during the session, reasons and other information stated, MAPS and other information, it should emcompass the inner detail of the session; keeping the tone
+  **Recommendation**: 4x50 or 4x25 minutes, or some sort of recommendation [if not provided, do not include it in JSON output]
+  **Considerations**: Ayesha's long hours at the computer may contribute to her shoulder tension; discussing ergonomic adjustments or breaks during work hours could be beneficial in future sessions.[if not provided, do not include it in JSON output]
+  **Missing Information**:The Class, Phase, what was done in the session and next plan were not mentioned
+
+  **Suggested Improvement**:
+  Consider providing more detailed observations of each stretch's effectiveness and any specific feedback from the client regarding comfort or difficulty.
+"""
+
+
+class ContextFile:
+    """context.txt, read once and again only when its mtime changes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._text = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def text(self):
+        mtime = os.stat(self.path).st_mtime
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.path, "r") as context_file:
+                    text = context_file.read().strip()
+                if not text:
+                    raise ValueError(f"{self.path} is empty")
+                if self._mtime is not None:
+                    logging.info(f"Reloaded the prompt context from {self.path}")
+                self._text, self._mtime = text, mtime
+            return self._text
+
+
+context_file = ContextFile(CONTEXT_PATH)
+
+
+def init_prompts():
+    """Load and check the prompt context before the first request."""
+    try:
+        context_file.text()
+    except (OSError, ValueError) as e:
+        raise RuntimeError(f"Prompt context could not be loaded: {str(e)}")
+
+
+def static_prefix(instructions):
+    return f"- This is the context:\n{context_file.text()}\n\n{instructions}"
+
+
+def scrutinize_messages(notes, active):
+    extra = "" if active == "YES" else f"{MEMBERSHIP_REQUIREMENT}\n"
+    return [
+        {"role": "system", "content": SCRUTINIZE_SYSTEM},
+        {
+            "role": "user",
+            "content": (
+                f"{static_prefix(SCRUTINIZE_INSTRUCTIONS)}{extra}\n"
+                f"- Input Notes:\n{notes}\n"
+            ),
+        },
+    ]
+
+
+def format_messages(notes):
+    return [
+        {"role": "system", "content": FORMAT_SYSTEM},
+        {
+            "role": "user",
+            "content": f"{static_prefix(FORMAT_INSTRUCTIONS)}\n- The notes:\n{notes}\n",
+        },
+    ]
+
+
+def log_prompt_usage(name, response):
+    """Log the prompt tokens of a completion and how many hit the cache."""
+    usage = response.usage
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    logging.info(
+        f"LLM {name}: {usage.prompt_tokens} prompt tokens ({cached} cached), "
+        f"{usage.completion_tokens} completion tokens"
+    )
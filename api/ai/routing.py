@@ -0,0 +1,69 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from .gateway import gateway
+from .orchestrator import LLM_WORKERS
+import logging
+import os
+
+# Primary and fallback model of each AI note feature. The fallback answers
+# when the primary fails, or races it when the primary is slower than usual
+ROUTES = {
+    "scrutinize_notes": (
+        os.getenv("SCRUTINIZE_MODEL", "ft:gpt-4o-mini-2024-07-18:studio-hr::BmhbGA6R"),
+        os.getenv("SCRUTINIZE_FALLBACK_MODEL", "gpt-4o-mini"),
+    ),
+    "format_notes": (
+        os.getenv("FORMAT_MODEL", "gpt-4o-mini"),
+        os.getenv("FORMAT_FALLBACK_MODEL", "gpt-4.1-mini"),
+    ),
+}
+
+# The fallback is fired once the primary runs past its p95 latency, or
+# after LLM_HEDGE_DELAY seconds until the primary has enough calls for one
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "10"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "2"))
+HEDGE_MIN_SAMPLES = 20
+
+# Separate from the orchestrator's pool, whose threads wait on these calls
+hedge_executor = ThreadPoolExecutor(
+    max_workers=LLM_WORKERS * 2, thread_name_prefix="llm-route"
+)
+
+
+def hedge_delay(model):
+    latency = gateway.models.percentile(
+        model, LLM_HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES
+    )
+    if latency is None:
+        return LLM_HEDGE_DELAY
+    return max(LLM_HEDGE_MIN_DELAY, latency)
+
+
+def route(task, call):
+    """Run `call(model)` on the primary model of `task`, hedged by its fallback.
+
+    The fallback starts when the primary raises or runs past its hedge
+    delay, and the first of the two to answer wins. Returns its result and
+    the model that answered. The loser is left to finish in the background,
+    its answer discarded. Raises the last error when both models fail.
+    """
+    primary, fallback = ROUTES[task]
+    pending = {hedge_executor.submit(call, primary): primary}
+    done, _ = wait(pending, timeout=hedge_delay(primary))
+    if not done or next(iter(done)).exception() is not None:
+        logging.warning(f"LLM {task} hedged from {primary} to {fallback}")
+        gateway.models.count(fallback, "hedged")
+        pending[hedge_executor.submit(call, fallback)] = fallback
+
+    error = None
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            model = pending.pop(future)
+            if future.exception() is not None:
+                error = future.exception()
+                logging.warning(f"LLM {task} on {model} failed: {str(error)}")
+                continue
+            gateway.models.count(model, "wins")
+            return future.result(), model
+    raise error
@@ -0,0 +1,70 @@
+from ..utils.opportunities import (
+    FIRST_VISIT_OPPORTUNITIES,
+    SUBSEQUENT_VISIT_OPPORTUNITIES,
+)
+from .prompts import static_prefix
+import json
+
+SCORING_MODEL = "gpt-4o-mini"
+
+SCORING_SYSTEM = "You are a StretchLab note auditor that checks session notes against a rubric and always returns valid JSON output, with no extra text, code blocks, or comments."
+
+SCORING_INSTRUCTIONS = """
+Audit the Flexologist notes of one StretchLab visit against the rubric items listed after the notes. Use the context to interpret abbreviations and terms.
+
+An item is met when the notes or the key note state it explicitly or clearly imply it. An item that is absent or too vague to act on is missed.
+
+Return a JSON object with these fields:
+- "missed": the list of rubric items that are missed, spelled exactly as in the rubric.
+- "summary": two or three sentences summarizing the visit and the quality of its notes.
+"""
+
+
+def rubric(first_timer):
+    """The opportunities a visit is scored on, its max score is their count."""
+    if first_timer == "YES":
+        return FIRST_VISIT_OPPORTUNITIES
+    return SUBSEQUENT_VISIT_OPPORTUNITIES
+
+
+def scoring_messages(record):
+    """Prompt of one RPA record, with `notes` and `key_note` looked up for it."""
+    items = "\n".join(f"- {item}" for item in rubric(record["first_timer"]))
+    return [
+        {"role": "system", "content": SCORING_SYSTEM},
+        {
+            "role": "user",
+            "content": (
+                f"{static_prefix(SCORING_INSTRUCTIONS)}\n"
+                f"- Key note:\n{record.get('key_note') or 'N/A'}\n\n"
+                f"- Notes:\n{record['notes']}\n\n"
+                f"- Rubric:\n{items}\n"
+            ),
+        },
+    ]
+
+
+def scoring_request(record):
+    """Chat completion arguments scoring one record."""
+    return {
+        "model": SCORING_MODEL,
+        "messages": scoring_messages(record),
+        "temperature": 0,
+        "response_format": {"type": "json_object"},
+    }
+
+
+def scoring_result(first_timer, content):
+    """The note_* columns of a record from the model's answer.
+
+    Missed items outside the rubric are dropped, so the score always counts
+    the met items of the visit's rubric.
+    """
+    data = json.loads(content)
+    items = rubric(first_timer)
+    missed = [item for item in items if item in set(data.get("missed") or [])]
+    return {
+        "note_score": str(len(items) - len(missed)),
+        "note_oppurtunities": json.dumps(missed),
+        "note_summary": data.get("summary") or "N/A",
+    }
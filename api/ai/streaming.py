@@ -0,0 +1,62 @@
+import json
+
+# The formatted notes are {"notes": [{...}, ...]}, so their sections are the
+# members of the objects at this nesting
+SECTION_DEPTH = ["{", "[", "{"]
+
+
+class NoteSections:
+    """Picks the sections of the formatted notes out of a streamed completion.
+
+    Text is fed as it arrives. Each `"Key": value` member of a note object
+    is returned by `feed` as soon as the comma or brace after it arrives,
+    whether the model puts every section in one object or one per object.
+    Anything before the first brace, like a code fence, is skipped.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._member_start = None
+
+    def feed(self, chunk):
+        sections = []
+        start = len(self.text)
+        self.text += chunk
+        for index in range(start, len(self.text)):
+            char = self.text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._stack.append(char)
+                if self._stack == SECTION_DEPTH:
+                    self._member_start = index + 1
+            elif char in "}]":
+                if self._stack == SECTION_DEPTH:
+                    sections.extend(self._member(index))
+                if self._stack:
+                    self._stack.pop()
+            elif char == "," and self._stack == SECTION_DEPTH:
+                sections.extend(self._member(index))
+                self._member_start = index + 1
+        return sections
+
+    def _member(self, end):
+        member = self.text[self._member_start : end].strip()
+        if not member:
+            return []
+        try:
+            return list(json.loads(f"{{{member}}}").items())
+        except ValueError:
+            return []
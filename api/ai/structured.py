@@ -0,0 +1,195 @@
+from jsonschema import Draft202012Validator
+from .gateway import gateway
+from .prompts import log_prompt_usage
+import json
+import logging
+import threading
+
+REPAIR_MODEL = "gpt-4o-mini"
+REPAIR_MAX_TOKENS = 2000
+
+# The output formats the prompts ask for, as JSON schemas
+BOOKING_SCHEMA = {
+    "type": "object",
+    "properties": {
+        field: {"type": "string"}
+        for field in [
+            "client_name",
+            "booking_id",
+            "workout_type",
+            "flexologist_name",
+            "phone",
+            "booking_time",
+        ]
+    },
+    "required": [
+        "client_name",
+        "booking_id",
+        "workout_type",
+        "flexologist_name",
+        "phone",
+        "booking_time",
+    ],
+    "additionalProperties": False,
+}
+
+QUESTIONS_SCHEMA = {
+    "type": "object",
+    "properties": {"questions": {"type": "array", "items": {"type": "string"}}},
+    "required": ["questions"],
+    "additionalProperties": False,
+}
+
+# Sections are optional and named by the prompt, so this one is checked
+# after the call instead of being enforced by the API
+FORMATTED_NOTES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "notes": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "additionalProperties": {
+                    "type": ["string", "number", "array"],
+                    "items": {"type": "string"},
+                },
+            },
+        }
+    },
+    "required": ["notes"],
+}
+
+REPAIR_SYSTEM = "You fix JSON documents so they match a JSON schema. Return only the corrected JSON object, keeping every value of the original that fits the schema."
+
+
+class OutputStats:
+    """Per call name counts of the outputs that did not parse or validate."""
+
+    def __init__(self):
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, outcome):
+        with self._lock:
+            outcomes = self.counts.setdefault(
+                name, {"calls": 0, "invalid": 0, "repaired": 0, "failed": 0}
+            )
+            outcomes[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {
+                    **outcomes,
+                    "invalid_rate": (
+                        round(outcomes["invalid"] / outcomes["calls"], 3)
+                        if outcomes["calls"]
+                        else 0
+                    ),
+                }
+                for name, outcomes in self.counts.items()
+            }
+
+
+output_stats = OutputStats()
+
+
+class InvalidOutput(ValueError):
+    """A completion that stayed invalid after the repair pass."""
+
+
+def parse_json(content):
+    """Parse a completion, ignoring code fences and text around the object."""
+    if not isinstance(content, str):
+        raise ValueError("Response content is not a string")
+    start, end = content.find("{"), content.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError("Response content has no JSON object")
+    return json.loads(content[start : end + 1])
+
+
+def validation_error(data, schema):
+    error = next(Draft202012Validator(schema).iter_errors(data), None)
+    if error is None:
+        return None
+    path = "/".join(str(part) for part in error.absolute_path) or "root"
+    return f"{path}: {error.message}"
+
+
+def check_output(content, schema):
+    """The parsed content and None, or None and what is wrong with it."""
+    try:
+        data = parse_json(content)
+    except ValueError as e:
+        return None, f"not JSON: {str(e)}"
+    error = validation_error(data, schema)
+    return (None, error) if error else (data, None)
+
+
+def repair_output(name, content, error, schema):
+    """Ask for a fixed copy of an invalid output.
+
+    Only the broken output and the schema are sent, not the original prompt,
+    so this costs a fraction of a new attempt.
+    """
+    response = gateway.chat_completion(
+        model=REPAIR_MODEL,
+        messages=[
+            {"role": "system", "content": REPAIR_SYSTEM},
+            {
+                "role": "user",
+                "content": (
+                    f"Schema:\n{json.dumps(schema)}\n\n"
+                    f"Problem: {error}\n\nJSON:\n{content}"
+                ),
+            },
+        ],
+        temperature=0,
+        max_tokens=REPAIR_MAX_TOKENS,
+        response_format={"type": "json_object"},
+    )
+    log_prompt_usage(f"{name} repair", response)
+    return check_output(response.choices[0].message.content, schema)
+
+
+def response_format(name, schema, strict):
+    if not strict:
+        return {"type": "json_object"}
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "schema": schema, "strict": True},
+    }
+
+
+def complete_json(name, schema, strict=False, **request):
+    """A chat completion parsed and validated against `schema`.
+
+    With `strict` the API enforces the schema itself, which needs every
+    property to be required; otherwise JSON mode is used and the schema is
+    checked here. An invalid output gets one repair pass before
+    InvalidOutput is raised.
+    """
+    response = gateway.chat_completion(
+        response_format=response_format(name, schema, strict), **request
+    )
+    log_prompt_usage(name, response)
+    output_stats.count(name, "calls")
+    content = response.choices[0].message.content
+    return validate_output(name, content, schema)
+
+
+def validate_output(name, content, schema):
+    """Validate a completion of `name`, repairing it once if needed."""
+    data, error = check_output(content, schema)
+    if error is None:
+        return data
+
+    output_stats.count(name, "invalid")
+    logging.warning(f"LLM {name} returned invalid JSON ({error}), repairing it")
+    data, repair_error = repair_output(name, content, error, schema)
+    if repair_error is None:
+        output_stats.count(name, "repaired")
+        return data
+
+    output_stats.count(name, "failed")
+    raise InvalidOutput(f"{name} output is invalid: {repair_error}")
@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+
+CLUBREADY_ACCOUNTS = "clubready_accounts"
+
+# What the routes need to work in an account, credentials included
+ACCOUNT_COLUMNS = (
+    "account_id, user_id, username, password, location_id, clubready_user_id, "
+    "full_name, location, is_primary, is_active"
+)
+
+
+def record_clubready_account(supabase, account_id, user_id, **fields):
+    """Upsert a ClubReady account seen by a login, a settings change or a
+    booking sync.
+
+    Only the given `fields` are written, so a login does not clear the
+    location learned from the bookings. Errors are raised: the credentials
+    are read from this table only, so a route changing them must fail
+    rather than leave the account stale.
+    """
+    if not account_id:
+        return
+    supabase.table(CLUBREADY_ACCOUNTS).upsert(
+        {
+            "account_id": account_id,
+            "user_id": user_id,
+            "last_seen": datetime.now(timezone.utc).isoformat(),
+            **fields,
+        },
+        on_conflict="user_id,account_id",
+    ).execute()
+
+
+def record_primary_account(supabase, account_id, user_id, **fields):
+    """Record the account of the user's own ClubReady login.
+
+    A login with different credentials replaces the previous primary
+    account, which is deleted first so a user keeps a single primary and
+    the old login does not linger as one of their other accounts.
+    """
+    if not account_id:
+        return
+    supabase.table(CLUBREADY_ACCOUNTS).delete().eq("user_id", user_id).eq(
+        "is_primary", True
+    ).neq("account_id", account_id).execute()
+    record_clubready_account(supabase, account_id, user_id, is_primary=True, **fields)
+
+
+def get_active_account(supabase, user_id, columns=ACCOUNT_COLUMNS):
+    """The account the user works in: the active one, else the primary one.
+
+    Returns None if the user has no ClubReady account yet.
+    """
+    accounts = (
+        supabase.table(CLUBREADY_ACCOUNTS)
+        .select(columns)
+        .eq("user_id", user_id)
+        .or_("is_active.eq.true,is_primary.eq.true")
+        .order("is_active", desc=True)
+        .order("is_primary", desc=True)
+        .limit(1)
+        .execute()
+    )
+    return accounts.data[0] if accounts.data else None
+
+
+def get_account(supabase, user_id, account_id, columns=ACCOUNT_COLUMNS):
+    """One of the user's accounts, or None if the user has no such account."""
+    accounts = (
+        supabase.table(CLUBREADY_ACCOUNTS)
+        .select(columns)
+        .eq("user_id", user_id)
+        .eq("account_id", account_id)
+        .limit(1)
+        .execute()
+    )
+    return accounts.data[0] if accounts.data else None
+
+
+def get_users_accounts(supabase, user_ids, columns=ACCOUNT_COLUMNS):
+    """Every account of the given users, in one query."""
+    if not user_ids:
+        return []
+    return (
+        supabase.table(CLUBREADY_ACCOUNTS)
+        .select(columns)
+        .in_("user_id", list(user_ids))
+        .execute()
+        .data
+    )
+
+
+def switch_active_account(supabase, user_id, account_id=None):
+    """Make `account_id`, or the primary account if None, the active one.
+
+    Returns False if the user has no such account.
+    """
+    query = (
+        supabase.table(CLUBREADY_ACCOUNTS).select("account_id").eq("user_id", user_id)
+    )
+    if account_id:
+        query = query.eq("account_id", account_id)
+    else:
+        query = query.eq("is_primary", True)
+    target = query.limit(1).execute()
+    if not target.data:
+        return False
+
+    target_id = target.data[0]["account_id"]
+    # Deactivate first, meanwhile the lookup falls back to the primary
+    supabase.table(CLUBREADY_ACCOUNTS).update({"is_active": False}).eq(
+        "user_id", user_id
+    ).neq("account_id", target_id).execute()
+    supabase.table(CLUBREADY_ACCOUNTS).update({"is_active": True}).eq(
+        "user_id", user_id
+    ).eq("account_id", target_id).execute()
+    return True
+
+
+def remove_clubready_account(supabase, user_id, account_id):
+    supabase.table(CLUBREADY_ACCOUNTS).delete().eq("user_id", user_id).eq(
+        "account_id", account_id
+    ).eq("is_primary", False).execute()
+
+
+def get_other_accounts(supabase, user_id, columns=ACCOUNT_COLUMNS):
+    """The user's accounts besides the primary one.
+
+    The primary account is the active one when none of these is.
+    """
+    return (
+        supabase.table(CLUBREADY_ACCOUNTS)
+        .select(columns)
+        .eq("user_id", user_id)
+        .eq("is_primary", False)
+        .order("full_name")
+        .execute()
+        .data
+    )
+
+
+def get_flexologist_name(supabase, user_id):
+    """The user's name as it appears on the bookings and the RPA notes."""
+    account = get_active_account(supabase, user_id, "full_name")
+    if not account or not account["full_name"]:
+        return None
+    return account["full_name"].lower()
@@ -0,0 +1,125 @@
+from pyairtable.formulas import match
+import threading
+import time
+
+# Airtable allows 5 requests per second per base
+AIRTABLE_RATE_LIMIT = 5
+AIRTABLE_BATCH_SIZE = 10
+
+
+class RateLimiter:
+    """Spaces calls out to at most `rate` per second, across threads.
+
+    Each caller reserves the next free slot and sleeps until it, so bursts
+    are queued instead of being answered with 429s.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def base_limiter(base_id):
+    with _limiters_lock:
+        if base_id not in _limiters:
+            _limiters[base_id] = RateLimiter(AIRTABLE_RATE_LIMIT)
+        return _limiters[base_id]
+
+
+class AirtableTable:
+    """pyairtable table whose requests are scheduled through the base's limiter.
+
+    With a `key_field`, record ids are cached by the value of that field so
+    repeated lookups of the same key skip the formula query.
+    """
+
+    def __init__(self, api, base_id, table_name, key_field=None):
+        self.table = api.table(base_id, table_name)
+        self.limiter = base_limiter(base_id)
+        self.key_field = key_field
+        self.record_ids = {}
+
+    def get(self, record_id):
+        self.limiter.wait()
+        return self.table.get(record_id)
+
+    def all(self, fields=None, **options):
+        """Fetch every matching record, only the given `fields` if set."""
+        if fields:
+            options["fields"] = fields
+
+        records = []
+        pages = self.table.iterate(**options)
+        while True:
+            # Each page is a separate request
+            self.limiter.wait()
+            page = next(pages, None)
+            if page is None:
+                return records
+            records.extend(page)
+
+    def first(self, fields=None, **options):
+        records = self.all(fields=fields, max_records=1, **options)
+        return records[0] if records else None
+
+    def find_id(self, value):
+        """Record id of the row whose key field equals `value`, or None."""
+        record_id = self.record_ids.get(value)
+        if record_id is None:
+            record = self.first(
+                fields=[self.key_field], formula=match({self.key_field: value})
+            )
+            if record:
+                record_id = self.record_ids[value] = record["id"]
+        return record_id
+
+    def forget(self, value):
+        self.record_ids.pop(value, None)
+
+    def create(self, fields):
+        self.limiter.wait()
+        record = self.table.create(fields)
+        if self.key_field and fields.get(self.key_field) is not None:
+            self.record_ids[fields[self.key_field]] = record["id"]
+        return record
+
+    def update(self, record_id, fields):
+        self.limiter.wait()
+        return self.table.update(record_id, fields)
+
+    def batch_create(self, records):
+        """Create `records` (field dicts), 10 per request."""
+        created = []
+        for start in range(0, len(records), AIRTABLE_BATCH_SIZE):
+            self.limiter.wait()
+            created.extend(
+                self.table.batch_create(records[start : start + AIRTABLE_BATCH_SIZE])
+            )
+        if self.key_field:
+            for fields, record in zip(records, created):
+                if fields.get(self.key_field) is not None:
+                    self.record_ids[fields[self.key_field]] = record["id"]
+        return created
+
+    def batch_update(self, records):
+        """Update `records` ({"id": ..., "fields": ...}), 10 per request."""
+        updated = []
+        for start in range(0, len(records), AIRTABLE_BATCH_SIZE):
+            self.limiter.wait()
+            updated.extend(
+                self.table.batch_update(records[start : start + AIRTABLE_BATCH_SIZE])
+            )
+        return updated
@@ -0,0 +1,107 @@
+# Named column sets for the Supabase reads on hot paths. Select only what
+# the caller uses: the long text columns (submitted_notes, coaching_notes,
+# formatted_notes, note_summary, note analyses) are a large share of every
+# row and PostgREST serializes them whether or not they are read. The sets
+# returned to the apps keep the note bodies they display.
+
+
+def column_set(*columns):
+    """Join column names into a PostgREST select string."""
+    return ", ".join(columns)
+
+
+# clubready_bookings returned as a client's or flexologist's visit history
+BOOKING_HISTORY = column_set(
+    "id",
+    "client_name",
+    "booking_id",
+    "workout_type",
+    "first_timer",
+    "active_member",
+    "location",
+    "booking_time",
+    "period",
+    "flexologist_name",
+    "submitted",
+    "submitted_notes",
+    "coaching_notes",
+    "submitted_at",
+    "created_at",
+    "user_id",
+)
+
+# booking_notes of one booking, as returned by /get_notes
+BOOKING_NOTES = column_set(
+    "id",
+    "booking_id",
+    "note",
+    "flexologist_uid",
+    "time",
+    "voice",
+    "type",
+    "formatted_notes",
+    "task_status",
+    "created_at",
+)
+
+# robot_process_automation_notes_records shown in the RPA history table
+RPA_NOTES_HISTORY = column_set(
+    "id",
+    "config_id",
+    "client_name",
+    "first_timer",
+    "unpaid_booking",
+    "member_rep_name",
+    "flexologist_name",
+    "booking_id",
+    "workout_type",
+    "location",
+    "key_note",
+    "status",
+    "booked_on_date",
+    "run_date",
+    "appointment_date",
+    "note_oppurtunities",
+    "note_score",
+    "pre_visit_preparation_rubric",
+    "session_notes_rubric",
+    "missed_sale_follow_up_rubric",
+    "created_at",
+)
+
+RPA_UNLOGGED_HISTORY = column_set(
+    "id",
+    "config_id",
+    "full_name",
+    "booking_location",
+    "booking_id",
+    "booking_detail",
+    "appointment_date",
+    "session_mins",
+    "booking_with",
+    "booking_date",
+    "created_at",
+)
+
+# robot_process_automation_notes_records scored in the AI insights
+RPA_NOTES_SCORES = column_set("first_timer", "note_score", "note_oppurtunities")
+
+# businesses listed on the dashboard fourth row
+BUSINESS_SUMMARY = column_set(
+    "admin_id",
+    "username",
+    "note_taking_subscription_status",
+    "robot_process_automation_subscription_status",
+    "created_at",
+)
+
+NOTIFICATIONS = column_set("id", "user_id", "message", "is_read", "type", "created_at")
+
+# Tables whose rows carry long text columns, `select("*")` on them is flagged
+WIDE_TABLES = {
+    "users",
+    "clubready_bookings",
+    "booking_notes",
+    "robot_process_automation_notes_records",
+    "robot_process_automation_unlogged_booking_records",
+}
@@ -1,9 +1,12 @@
 import os
 from pyairtable import Api
+from pyairtable.formulas import match
+from requests.exceptions import HTTPError
 from dotenv import load_dotenv
 from datetime import datetime
 import json
 import logging
+from .airtable import AirtableTable
 
 # Loading env instance
 load_dotenv()
@@ -22,11 +25,21 @@ api = Api(ACCESS_TOKEN)
 
 
 # Initialize table, to check if connection works
-table = api.table(BASEID, TABLEID)
-table_notes = api.table(BASEID, TABLEID_NOTES)
-table_employee = api.table(BASEID, TABLEID_EMPLOYEE)
-table_robot_notes = api.table(BASEID, TABLEID_ROBOT_NOTES)
-table_robot_unlogged = api.table(BASEID, TABLEID_ROBOT_UNLOGGED)
+table = AirtableTable(api, BASEID, TABLEID, key_field="Username")
+table_notes = AirtableTable(api, BASEID, TABLEID_NOTES)
+table_employee = AirtableTable(api, BASEID, TABLEID_EMPLOYEE)
+table_robot_notes = AirtableTable(api, BASEID, TABLEID_ROBOT_NOTES)
+table_robot_unlogged = AirtableTable(api, BASEID, TABLEID_ROBOT_UNLOGGED)
+
+
+def update_user(user_id, fields):
+    """Update a user record, without reading it first."""
+    try:
+        return table.update(user_id, fields)
+    except HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            raise ValueError("User not found") from e
+        raise
 
 
 def save_flexology_data(data):
@@ -34,31 +47,32 @@ def save_flexology_data(data):
         hour=23, minute=59, second=59, microsecond=999999
     )
     username = data.get("username")
-    existing_records = table.all(formula=f"{{Username}} = '{username}'")
-
-    if existing_records:
-        record_id = existing_records[0]["id"]
-        table.update(record_id, {"expiresAt": expires_at.isoformat()})
-        return record_id
-    else:
-        fields = {
-            "Username": username,
-            "Password": data.get("password"),
-            "expiresAt": expires_at.isoformat(),
-        }
-        new_record = table.create(fields)
-        return new_record["id"]
+    record_id = table.find_id(username)
+
+    if record_id:
+        try:
+            table.update(record_id, {"expiresAt": expires_at.isoformat()})
+            return record_id
+        except HTTPError as e:
+            # The cached record was deleted on the Airtable side
+            if e.response is None or e.response.status_code != 404:
+                raise
+            table.forget(username)
+
+    fields = {
+        "Username": username,
+        "Password": data.get("password"),
+        "expiresAt": expires_at.isoformat(),
+    }
+    new_record = table.create(fields)
+    return new_record["id"]
 
 
 def update_user_bookings(user_id, bookings):
     try:
-        record = table.get(user_id)
-        if not record:
-            raise ValueError("User not found")
-
         bookings_json = json.dumps(bookings)
 
-        table.update(
+        update_user(
             user_id,
             {
                 "Bookings": bookings_json,
@@ -111,9 +125,10 @@ def get_user_details(user_id):
         raise
 
 
-def save_notes(data):
+def save_notes(*notes):
+    """Create a note record per field dict, 10 per request."""
     try:
-        table_notes.create(data)
+        table_notes.batch_create(list(notes))
     except Exception as e:
         logging.error(f"An error occurred during adding notes: {str(e)}")
         raise
@@ -121,11 +136,11 @@ def save_notes(data):
 
 def get_user_notes(user_id, booking_id):
     try:
-        get_user = table.get(user_id)
-        if not get_user:
-            raise ValueError("User not found")
+        # Both fields are text, as in the quoted comparison match() replaced
         records = table_notes.all(
-            formula=f"AND({{Flexologist UID}} = '{user_id}', {{Booking ID}} = '{booking_id}')"
+            formula=match(
+                {"Flexologist UID": str(user_id), "Booking ID": str(booking_id)}
+            )
         )
         return records if records else []
     except Exception as e:
@@ -133,10 +148,17 @@ def get_user_notes(user_id, booking_id):
         raise
 
 
-def get_employee_ownwer():
+def get_employee_ownwer(modified_since=None):
+    """Employees in the flexologist view, only those modified after
+    `modified_since` (an ISO timestamp) when given."""
     try:
+        options = {}
+        if modified_since:
+            options["formula"] = f"IS_AFTER(LAST_MODIFIED_TIME(), '{modified_since}')"
         all_employees = table_employee.all(
             view=VIEW_FLEX_EMPLOYEE,
+            fields=["Name", "Personal Email"],
+            **options,
         )
         return [
             {
@@ -202,22 +224,31 @@ def map_robot_unlogged_note(note):
     return {**mapped_note, "id": note.get("id")}
 
 
+def created_between(start_date, end_date):
+    """Formula matching records created between two ISO timestamps, inclusive.
+
+    Compares CREATED_TIME() as a date instead of formatting it with DATESTR
+    for every record.
+    """
+    start_date = datetime.strptime(start_date, "%Y-%m-%dT%H:%M:%S.%fZ")
+    end_date = datetime.strptime(end_date, "%Y-%m-%dT%H:%M:%S.%fZ")
+    return (
+        f"AND(NOT(IS_BEFORE(CREATED_TIME(), '{start_date.isoformat()}Z')), "
+        f"NOT(IS_AFTER(CREATED_TIME(), '{end_date.isoformat()}Z')))"
+    )
+
+
 def get_owner_robot_automation_notes(start_date, end_date):
     try:
         today_date = datetime.now().strftime("%Y-%m-%d")
 
         if start_date and end_date:
-            start_date = datetime.strptime(start_date, "%Y-%m-%dT%H:%M:%S.%fZ")
-            start_date = start_date.strftime("%Y-%m-%d %H:%M:%S.%f")
-            end_date = datetime.strptime(end_date, "%Y-%m-%dT%H:%M:%S.%fZ")
-            end_date = end_date.strftime("%Y-%m-%d %H:%M:%S.%f")
-            robot_notes = table_robot_notes.all(
-                formula=f"AND(DATESTR(CREATED_TIME()) >= '{start_date}', DATESTR(CREATED_TIME()) <= '{end_date}')"
-            )
+            formula = created_between(start_date, end_date)
         else:
-            robot_notes = table_robot_notes.all(
-                formula=f"DATESTR(CREATED_TIME()) = '{today_date}'"
-            )
+            formula = f"IS_SAME(CREATED_TIME(), '{today_date}', 'day')"
+        robot_notes = table_robot_notes.all(
+            formula=formula, fields=list(field_mapping.values())
+        )
         formatted_robot_notes = [map_robot_note(note) for note in robot_notes]
         return formatted_robot_notes
     except Exception as e:
@@ -229,17 +260,12 @@ def get_owner_robot_automation_unlogged(start_date, end_date):
     try:
         today_date = datetime.now().strftime("%Y-%m-%d")
         if start_date and end_date:
-            start_date = datetime.strptime(start_date, "%Y-%m-%dT%H:%M:%S.%fZ")
-            start_date = start_date.strftime("%Y-%m-%d %H:%M:%S.%f")
-            end_date = datetime.strptime(end_date, "%Y-%m-%dT%H:%M:%S.%fZ")
-            end_date = end_date.strftime("%Y-%m-%d %H:%M:%S.%f")
-            unlogged_bookings = table_robot_unlogged.all(
-                formula=f"AND(DATESTR(CREATED_TIME()) >= '{start_date}', DATESTR(CREATED_TIME()) <= '{end_date}')"
-            )
+            formula = created_between(start_date, end_date)
         else:
-            unlogged_bookings = table_robot_unlogged.all(
-                formula=f"DATESTR(CREATED_TIME()) = '{today_date}'"
-            )
+            formula = f"IS_SAME(CREATED_TIME(), '{today_date}', 'day')"
+        unlogged_bookings = table_robot_unlogged.all(
+            formula=formula, fields=list(unlogged_field_mapping.values())
+        )
         formatted_unlogged_bookings = [
             map_robot_unlogged_note(note) for note in unlogged_bookings
         ]
@@ -252,7 +278,8 @@ def get_owner_robot_automation_unlogged(start_date, end_date):
 def get_notes_by_id(booking_id):
     try:
         records = table_notes.all(
-            formula=f"AND({{Booking ID}} = '{booking_id}', {{type}} = 'user')"
+            formula=match({"Booking ID": str(booking_id), "type": "user"}),
+            fields=["Note"],
         )
         sorted_records = sorted(records, key=lambda record: record["createdTime"])
         notes = [record["fields"].get("Note", "") for record in sorted_records]
@@ -280,11 +307,7 @@ def get_active_by_id(user_id, booking_id):
 
 def remove_booking_created_at(user_id):
     try:
-        record = table.get(user_id)
-        if not record:
-            raise ValueError("User not found")
-
-        table.update(user_id, {"BookingsCreatedAt": ""})
+        update_user(user_id, {"BookingsCreatedAt": ""})
 
         return {"status": True, "message": "Logged out successfully"}
     except Exception as e:
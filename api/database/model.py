@@ -142,6 +142,9 @@ class BookingNotes(Base):
     voice = Column(String(64), nullable=True)
     type = Column(String(64), nullable=True)
     formatted_notes = Column(Text, nullable=True)
+    task_id = Column(String(64), nullable=True)
+    task_status = Column(String(64), nullable=True)
+    task_started_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime, default=datetime.now)
     users = relationship("User", backref="booking_note", lazy=True)
 
@@ -234,3 +237,20 @@ class BillingHistory(Base):
     invoice_pdf_url = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
     users = relationship("User", backref="billing_history", lazy=True)
+
+
+class ClubreadyAccount(Base):
+    __tablename__ = "clubready_accounts"
+    # Several users can sign in to the same ClubReady account
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    account_id = Column(String(64), primary_key=True)
+    location = Column(String(64), nullable=True)
+    full_name = Column(String(64), nullable=True)
+    last_seen = Column(DateTime, default=datetime.now)
+    username = Column(String(64), nullable=True)
+    password = Column(String(120), nullable=True)
+    location_id = Column(String(64), nullable=True)
+    clubready_user_id = Column(String(64), nullable=True)
+    is_primary = Column(Boolean, default=False)
+    is_active = Column(Boolean, default=False)
+    users = relationship("User", backref="clubready_account", lazy=True)
@@ -0,0 +1,211 @@
+from datetime import date, datetime
+from flask import current_app, request
+from sqlalchemy import column, delete, insert, select, table, update
+from .columns import NOTIFICATIONS as NOTIFICATION_COLUMNS
+
+# Tables are declared ad hoc rather than taken from model.py so columns
+# added on the database side can be selected without touching the models.
+USERS = "users"
+NOTIFICATIONS = "notifications"
+CLUBREADY_BOOKINGS = "clubready_bookings"
+BOOKING_NOTES = "booking_notes"
+RPA_NOTES_RECORDS = "robot_process_automation_notes_records"
+
+STREAM_BATCH_SIZE = 1000
+
+
+def _table(name, columns):
+    if isinstance(columns, str):
+        columns = [col.strip() for col in columns.split(",")]
+    return table(name, *(column(col) for col in columns))
+
+
+def _to_json(row):
+    """Match the PostgREST payloads, which return timestamps as ISO strings."""
+    return {
+        key: value.isoformat() if isinstance(value, (datetime, date)) else value
+        for key, value in row.items()
+    }
+
+
+class Repository:
+    """Direct Postgres access to the hot tables through the pooled engine.
+
+    Rows come back as plain dicts shaped like the PostgREST responses, so
+    a route can switch between the two with the `DIRECT_DB_ROUTES` flag.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def _fetch_all(self, statement):
+        with self.engine.connect() as conn:
+            return [_to_json(row) for row in conn.execute(statement).mappings()]
+
+    def _execute(self, statement, parameters=None):
+        with self.engine.begin() as conn:
+            result = conn.execute(statement, parameters)
+            return result.rowcount
+
+    # users
+
+    def get_user(self, user_id, columns="id, full_name, email, role_id, admin_id"):
+        users = _table(USERS, columns)
+        rows = self._fetch_all(select(*users.c).where(column("id") == user_id).limit(1))
+        return rows[0] if rows else None
+
+    def get_users(self, admin_id, role_id, columns="id, full_name"):
+        users = _table(USERS, columns)
+        return self._fetch_all(
+            select(*users.c).where(
+                column("admin_id") == admin_id, column("role_id") == role_id
+            )
+        )
+
+    # notifications
+
+    def get_notifications(self, user_id):
+        notifications = _table(NOTIFICATIONS, NOTIFICATION_COLUMNS)
+        return self._fetch_all(
+            select(*notifications.c).where(column("user_id") == user_id)
+        )
+
+    def update_notification(self, notification_id, is_read):
+        return self._execute(
+            update(table(NOTIFICATIONS, column("id"), column("is_read")))
+            .where(column("id") == notification_id)
+            .values(is_read=is_read)
+        )
+
+    def mark_all_notifications_read(self, user_id):
+        return self._execute(
+            update(table(NOTIFICATIONS, column("user_id"), column("is_read")))
+            .where(column("user_id") == user_id)
+            .values(is_read=True)
+        )
+
+    def delete_notification(self, notification_id):
+        return self._execute(
+            delete(table(NOTIFICATIONS, column("id"))).where(
+                column("id") == notification_id
+            )
+        )
+
+    def insert_notifications(self, rows):
+        return self._insert_many(NOTIFICATIONS, rows)
+
+    # clubready_bookings
+
+    def insert_bookings(self, rows):
+        return self._insert_many(CLUBREADY_BOOKINGS, rows)
+
+    def update_bookings(self, booking_ids, values, returning=None):
+        """Apply the same `values` to every booking in `booking_ids` at once.
+
+        Returns the `returning` columns of the updated rows when given,
+        otherwise the number of rows updated.
+        """
+        if isinstance(returning, str):
+            returning = [col.strip() for col in returning.split(",")]
+        if not booking_ids:
+            return [] if returning else 0
+        columns = dict.fromkeys(["id", *values, *(returning or [])])
+        bookings = _table(CLUBREADY_BOOKINGS, list(columns))
+        statement = (
+            update(bookings)
+            .where(bookings.c.id.in_(list(booking_ids)))
+            .values(**values)
+        )
+        if not returning:
+            return self._execute(statement)
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                statement.returning(*(bookings.c[col] for col in returning))
+            )
+            return [_to_json(row) for row in result.mappings()]
+
+    # booking_notes
+
+    def get_booking_notes(self, booking_id, columns="id, note, type, created_at"):
+        notes = _table(BOOKING_NOTES, columns)
+        return self._fetch_all(
+            select(*notes.c).where(column("booking_id") == booking_id)
+        )
+
+    def insert_booking_notes(self, rows):
+        return self._insert_many(BOOKING_NOTES, rows)
+
+    # robot_process_automation_notes_records
+
+    def iter_notes_records(
+        self,
+        columns,
+        config_id,
+        start_date,
+        end_date,
+        excluded_flexologists=None,
+        first_timer=None,
+        location=None,
+        flexologist_name=None,
+        batch_size=STREAM_BATCH_SIZE,
+    ):
+        """Stream the RPA notes of a config with the analytics filters applied.
+
+        Rows are read through a server-side cursor, `batch_size` at a time.
+        """
+        records = _table(RPA_NOTES_RECORDS, columns)
+        statement = select(*records.c).where(
+            column("config_id") == config_id,
+            column("status") != "No Show",
+            # Compare as text, the same way PostgREST sends the dates
+            column("appointment_date") >= str(start_date),
+            column("appointment_date") < str(end_date),
+        )
+        if location:
+            statement = statement.where(column("location") == location)
+        if flexologist_name:
+            statement = statement.where(column("flexologist_name") == flexologist_name)
+        if excluded_flexologists:
+            statement = statement.where(
+                column("flexologist_name").not_in(list(excluded_flexologists))
+            )
+        if first_timer:
+            statement = statement.where(column("first_timer") == first_timer)
+
+        with self.engine.connect() as conn:
+            result = conn.execution_options(
+                stream_results=True, yield_per=batch_size
+            ).execute(statement)
+            for row in result.mappings():
+                yield _to_json(row)
+
+    def _insert_many(self, table_name, rows):
+        """Insert `rows` with one executemany per distinct set of keys.
+
+        Rows are grouped by their keys so omitted columns keep their
+        database defaults instead of being inserted as NULL.
+        """
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        inserted = 0
+        with self.engine.begin() as conn:
+            for columns, group in groups.items():
+                target = _table(table_name, columns)
+                inserted += conn.execute(insert(target), group).rowcount
+        return inserted
+
+
+def get_repository():
+    return current_app.config["REPOSITORY"]
+
+
+def use_direct_db():
+    """Whether the current route is switched to the direct Postgres repository.
+
+    Set DIRECT_DB_ROUTES to a comma separated list of endpoints such as
+    `notification.get_notification`, or `*` for every route that supports it.
+    """
+    routes = current_app.config.get("DIRECT_DB_ROUTES") or set()
+    return "*" in routes or request.endpoint in routes
@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta, timezone
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from .database import get_employee_ownwer
+from ..utils.config import EMPLOYEE_ROSTER_PATH
+
+ROSTER_REFRESH_INTERVAL = float(os.getenv("EMPLOYEE_ROSTER_REFRESH_INTERVAL", "300"))
+# Deletions and employees leaving the view only show up in a full read
+ROSTER_FULL_REFRESH_INTERVAL = float(
+    os.getenv("EMPLOYEE_ROSTER_FULL_REFRESH_INTERVAL", "86400")
+)
+
+
+def _utc_now():
+    return datetime.now(timezone.utc)
+
+
+class EmployeeRoster:
+    """The Airtable flexologist employees, mirrored to a JSON file.
+
+    The file is shared by the gunicorn workers: the one holding the leader
+    lock refreshes it under a file lock, reading only the records modified
+    since the last refresh, and every worker reloads it when its mtime
+    changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.leader_path = f"{path}.leader"
+        self._data = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path) as roster_file:
+                return json.load(roster_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write(self, data):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as roster_file:
+            json.dump(data, roster_file)
+        os.replace(tmp_path, self.path)
+
+    def _full_refresh_due(self, data):
+        if not data:
+            return True
+        full_at = datetime.fromisoformat(data["full_refreshed_at"])
+        return _utc_now() - full_at > timedelta(seconds=ROSTER_FULL_REFRESH_INTERVAL)
+
+    def refresh(self, full=False, wait=False, if_missing=False):
+        """Bring the file up to date with Airtable.
+
+        Returns False without refreshing if another worker holds the lock
+        and `wait` is not set, or with `if_missing` if the file exists once
+        the lock is held.
+        """
+        with open(self.lock_path, "w") as lock_file:
+            flags = fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(lock_file, flags)
+            except BlockingIOError:
+                return False
+
+            data = self._read()
+            if if_missing and data:
+                return False
+            started_at = _utc_now().isoformat()
+            if full or self._full_refresh_due(data):
+                employees = {
+                    employee["id"]: employee for employee in get_employee_ownwer()
+                }
+                data = {"employees": employees, "full_refreshed_at": started_at}
+            else:
+                changed = get_employee_ownwer(modified_since=data["refreshed_at"])
+                data["employees"].update(
+                    (employee["id"], employee) for employee in changed
+                )
+
+            data["refreshed_at"] = started_at
+            self._write(data)
+            return True
+
+    def employees(self):
+        """Return copies of the cached employees, reading Airtable on first use."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            # Only the first worker to get the lock reads Airtable
+            self.refresh(full=True, wait=True, if_missing=True)
+            mtime = os.stat(self.path).st_mtime
+
+        with self._lock:
+            if mtime != self._mtime:
+                self._data = self._read()
+                self._mtime = mtime
+            employees = self._data["employees"].values()
+            # Callers add their own keys to the employees
+            return [dict(employee) for employee in employees]
+
+    def run(self, interval):
+        """Refresh the file every `interval` seconds once this process leads.
+
+        The leader lock is held for the life of the process, so a single
+        worker refreshes; the others wait for it and take over when the
+        leader exits.
+        """
+        with open(self.leader_path, "w") as leader_file:
+            while True:
+                try:
+                    fcntl.flock(leader_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    time.sleep(interval)
+
+            logging.info(f"Employee roster refreshed by worker {os.getpid()}")
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logging.error(f"Employee roster refresh failed: {str(e)}")
+
+
+employee_roster = EmployeeRoster(EMPLOYEE_ROSTER_PATH)
+
+
+def init_roster():
+    """Start this worker's roster thread, which refreshes if it becomes leader."""
+    thread = threading.Thread(
+        target=employee_roster.run, args=(ROSTER_REFRESH_INTERVAL,), daemon=True
+    )
+    thread.start()
@@ -3,6 +3,9 @@ from flask import jsonify
 import logging
 from ..utils.middleware import require_bearer_token
 from ..utils.utils import decode_jwt_token
+from ..utils.principal import current_principal
+from ..database.repository import get_repository, use_direct_db
+from ..database.columns import NOTIFICATIONS
 from datetime import datetime
 
 
@@ -32,22 +35,19 @@ def insert_notification(user_id, message, type):
 def get_notification(token):
     try:
         decoded_user = decode_jwt_token(token)
-        user = (
-            supabase.table("users")
-            .select("*")
-            .eq("id", decoded_user["user_id"])
-            .execute()
-            .data[0]
-        )
+        user = current_principal()
         if not user:
             return jsonify({"message": "User not found"}), 404
-        notifications = (
-            supabase.table("notifications")
-            .select("*")
-            .eq("user_id", decoded_user["user_id"])
-            .execute()
-            .data
-        )
+        if use_direct_db():
+            notifications = get_repository().get_notifications(decoded_user["user_id"])
+        else:
+            notifications = (
+                supabase.table("notifications")
+                .select(NOTIFICATIONS)
+                .eq("user_id", decoded_user["user_id"])
+                .execute()
+                .data
+            )
         return jsonify(
             {
                 "message": "Notifications fetched successfully",
@@ -66,21 +66,18 @@ def get_notification(token):
 def update_notification(token):
     try:
         decoded_user = decode_jwt_token(token)
-        user = (
-            supabase.table("users")
-            .select("*")
-            .eq("id", decoded_user["user_id"])
-            .execute()
-            .data[0]
-        )
+        user = current_principal()
         if not user:
             return jsonify({"message": "User not found"}), 404
         data = request.get_json()
         notification_id = data.get("notification_id")
         is_read = data.get("is_read")
-        supabase.table("notifications").update({"is_read": is_read}).eq(
-            "id", notification_id
-        ).execute()
+        if use_direct_db():
+            get_repository().update_notification(notification_id, is_read)
+        else:
+            supabase.table("notifications").update({"is_read": is_read}).eq(
+                "id", notification_id
+            ).execute()
         return (
             jsonify(
                 {"message": "Notification updated successfully", "status": "success"}
@@ -97,18 +94,15 @@ def update_notification(token):
 def mark_all_as_read(token):
     try:
         decoded_user = decode_jwt_token(token)
-        user = (
-            supabase.table("users")
-            .select("*")
-            .eq("id", decoded_user["user_id"])
-            .execute()
-            .data[0]
-        )
+        user = current_principal()
         if not user:
             return jsonify({"message": "User not found"}), 404
-        supabase.table("notifications").update({"is_read": True}).eq(
-            "user_id", decoded_user["user_id"]
-        ).execute()
+        if use_direct_db():
+            get_repository().mark_all_notifications_read(decoded_user["user_id"])
+        else:
+            supabase.table("notifications").update({"is_read": True}).eq(
+                "user_id", decoded_user["user_id"]
+            ).execute()
         return (
             jsonify(
                 {"message": "All notifications marked as read", "status": "success"}
@@ -125,16 +119,13 @@ def mark_all_as_read(token):
 def delete_notification(token, notification_id):
     try:
         decoded_user = decode_jwt_token(token)
-        user = (
-            supabase.table("users")
-            .select("*")
-            .eq("id", decoded_user["user_id"])
-            .execute()
-            .data[0]
-        )
+        user = current_principal()
         if not user:
             return jsonify({"message": "User not found"}), 404
-        supabase.table("notifications").delete().eq("id", notification_id).execute()
+        if use_direct_db():
+            get_repository().delete_notification(notification_id)
+        else:
+            supabase.table("notifications").delete().eq("id", notification_id).execute()
         return (
             jsonify(
                 {"message": "Notification deleted successfully", "status": "success"}
@@ -9,6 +9,7 @@ from ..utils.utils import (
 )
 from ..utils.mail import send_email
 from ..database.database import remove_booking_created_at
+from ..database.accounts import get_other_accounts, record_primary_account
 from ..utils.middleware import require_bearer_token
 import logging
 import jwt
@@ -62,6 +63,17 @@ def clubready_validate(token):
                 .execute()
             )
 
+            # The table first, the credentials are read from it
+            record_primary_account(
+                supabase,
+                result["user_id"],
+                user_data["user_id"],
+                username=data["username"],
+                password=result["hashed_password"],
+                location_id=result["location_id"],
+                clubready_user_id=result["user_id"],
+                full_name=result["full_name"],
+            )
             updated_user = (
                 supabase.table("users")
                 .update(
@@ -578,31 +590,23 @@ def login():
             )
 
         if verify_password(data["password"], user.data[0]["password"]):
-            other_accounts = (
-                json.loads(user.data[0]["other_clubready_accounts"])
-                if user.data[0]["other_clubready_accounts"]
-                else None
-            )
-            if other_accounts:
-                my_accounts = [
-                    {
-                        "id": account["id"],
-                        "name": account["full_name"],
-                        "active": account["active"],
-                    }
-                    for account in other_accounts
-                ]
-                my_accounts.append(
-                    {"id": None, "name": user.data[0]["full_name"], "active": True}
+            my_accounts = [
+                {
+                    "id": account["account_id"],
+                    "name": account["full_name"],
+                    "active": account["is_active"],
+                }
+                for account in get_other_accounts(
+                    supabase, user.data[0]["id"], "account_id, full_name, is_active"
                 )
-            else:
-                my_accounts = [
-                    {
-                        "id": None,
-                        "name": user.data[0]["full_name"],
-                        "active": True,
-                    }
-                ]
+            ]
+            my_accounts.append(
+                {
+                    "id": None,
+                    "name": user.data[0]["full_name"],
+                    "active": not any(account["active"] for account in my_accounts),
+                }
+            )
 
             print(my_accounts, "my_accounts")
 
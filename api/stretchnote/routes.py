@@ -1,4 +1,4 @@
-from flask import request, jsonify, Blueprint
+from flask import request, jsonify, Blueprint, Response, stream_with_context
 from ..utils.utils import (
     get_user_bookings_from_clubready,
     decode_jwt_token,
@@ -12,19 +12,59 @@ from ..database.database import (
     get_notes_by_id,
     get_active_by_id,
 )
-from ..ai.aianalysis import scrutinize_notes, format_notes
+from ..ai.aianalysis import (
+    scrutinize_notes,
+    format_notes,
+    stream_format_notes,
+    SCRUTINIZE_FALLBACK,
+    FORMAT_FALLBACK,
+)
+from ..ai.orchestrator import (
+    LLM_DEADLINE,
+    executor as llm_executor,
+    job_executor,
+    run_llm_tasks,
+)
 import logging
 from datetime import datetime, timezone
 import json
 from ..utils.middleware import require_bearer_token
+from ..utils.principal import current_principal
+from ..utils.queries import iter_rows
+from ..database.repository import get_repository, use_direct_db
+from ..database.accounts import (
+    get_active_account,
+    get_flexologist_name,
+    record_clubready_account,
+    switch_active_account,
+)
+from ..database.columns import (
+    BOOKING_HISTORY,
+    BOOKING_NOTES,
+    RPA_NOTES_SCORES,
+)
+from ..utils.analytics import aggregate, RpaAuditAggregator
+from ..utils.note_records import NoteRecords
+from ..utils.opportunities import (
+    FIRST_VISIT_OPPORTUNITIES,
+    LEGACY_NOTE_OPPORTUNITIES,
+)
 import asyncio
 import threading
+import time
 import uuid
 import pytz
 from datetime import timedelta
 
 routes = Blueprint("routes", __name__)
 
+# Polling interval and lifetime of a /get_questions events stream, in seconds
+QUESTIONS_EVENTS_INTERVAL = 1
+QUESTIONS_EVENTS_TIMEOUT = 90
+# A /get_questions job still generating after this many seconds has lost
+# its worker, its completions give up after LLM_DEADLINE
+QUESTIONS_TASK_TIMEOUT = LLM_DEADLINE + 30
+
 
 def get_client_timezone():
     """
@@ -59,6 +99,57 @@ def get_client_datetime():
     return datetime.now(tz)
 
 
+def update_booking_status(booking_ids, payload, repository=None):
+    """Write a task status transition to the given clubready_bookings rows.
+
+    The background tasks run outside the request, so the route passes its
+    direct Postgres `repository` in when `DIRECT_DB_ROUTES` switches it on.
+    Returns the updated rows' id and logged_off.
+    """
+    if repository is not None:
+        return repository.update_bookings(
+            booking_ids, payload, returning="id, logged_off"
+        )
+    return (
+        supabase.table("clubready_bookings")
+        .update(payload)
+        .in_("id", list(booking_ids))
+        .execute()
+        .data
+    )
+
+
+def task_booking_ids(booking_ids, period, same_client_period):
+    """Ids of the submitted booking and of its same client companion, if any.
+
+    `booking_ids` maps the period of each of the client's bookings that day
+    to its row id, as looked up by the route.
+    """
+    ids = [booking_ids[period]]
+    if same_client_period:
+        companion_id = booking_ids.get(same_client_period)
+        if companion_id is None:
+            logging.warning(
+                f"No booking row for the same client period {same_client_period}"
+            )
+        elif companion_id not in ids:
+            ids.append(companion_id)
+    return ids
+
+
+def get_client_bookings(user_id, client_name, client_date):
+    """The user's bookings of a client on `client_date`."""
+    return (
+        supabase.table("clubready_bookings")
+        .select("id, period, location, submitted, logged_off")
+        .eq("client_name", client_name)
+        .eq("user_id", user_id)
+        .eq("created_at", client_date)
+        .execute()
+        .data
+    )
+
+
 def background_submit_notes(
     task_id,
     clubready_username,
@@ -68,15 +159,17 @@ def background_submit_notes(
     location,
     client_name,
     coaching,
-    client_date,
+    booking_ids,
     client_tz,
     supplementary,
     group_booking,
+    repository=None,
 ):
     def local_get_client_datetime():
         tz = pytz.timezone(client_tz)
         return datetime.now(tz)
 
+    booking_id = booking_ids[period]
     try:
         pending_payload = {
             "task_status": "submitting",
@@ -98,16 +191,9 @@ def background_submit_notes(
             pending_payload.update(
                 {"submitted_notes": notes, "coaching_notes": coaching}
             )
-        updated_data = (
-            supabase.table("clubready_bookings")
-            .update(pending_payload)
-            .eq("client_name", client_name)
-            .eq("period", period)
-            .eq("created_at", client_date)
-            .execute()
-        )
+        updated_data = update_booking_status([booking_id], pending_payload, repository)
         result = None
-        check_logged_off = updated_data.data[0]["logged_off"]
+        check_logged_off = updated_data[0]["logged_off"]
         if check_logged_off:
             result = submit_after_log_off(
                 clubready_username,
@@ -145,40 +231,21 @@ def background_submit_notes(
                     }
                 )
             else:
-                success_payload.update({"submitted": True, "submitted_at": timestamp})
-            supabase.table("clubready_bookings").update(success_payload).eq(
-                "client_name", client_name
-            ).eq("period", period).eq("created_at", client_date).execute()
-            if result["same_client_period"]:
-                timestamp = local_get_client_datetime().strftime("%Y-%m-%d %H:%M:%S")
-                success_payload = {
-                    "task_status": "success",
-                    "task_message": result["message"],
-                    "task_id": task_id,
-                    "task_error": None,
-                }
-                if supplementary:
-                    success_payload.update(
-                        {
-                            "supplementary_submitted": True,
-                            "updated_at": timestamp,
-                            "supplementary_notes": notes,
-                        }
-                    )
-                else:
-                    success_payload.update(
-                        {
-                            "submitted_notes": notes,
-                            "coaching_notes": coaching,
-                            "submitted": True,
-                            "submitted_at": timestamp,
-                        }
-                    )
-                supabase.table("clubready_bookings").update(success_payload).eq(
-                    "client_name", client_name
-                ).eq("period", result["same_client_period"]).eq(
-                    "created_at", client_date
-                ).execute()
+                # The notes are repeated for the companion booking, which
+                # did not get them with the pending status
+                success_payload.update(
+                    {
+                        "submitted_notes": notes,
+                        "coaching_notes": coaching,
+                        "submitted": True,
+                        "submitted_at": timestamp,
+                    }
+                )
+            update_booking_status(
+                task_booking_ids(booking_ids, period, result["same_client_period"]),
+                success_payload,
+                repository,
+            )
         else:
             failed_payload = {
                 "task_status": "error",
@@ -198,9 +265,7 @@ def background_submit_notes(
                         "coaching_notes": coaching,
                     }
                 )
-            supabase.table("clubready_bookings").update(failed_payload).eq(
-                "client_name", client_name
-            ).eq("period", period).eq("created_at", client_date).execute()
+            update_booking_status([booking_id], failed_payload, repository)
     except Exception as e:
         logging.error(f"Background task {task_id} failed: {str(e)}")
         failed_payload = {
@@ -223,9 +288,7 @@ def background_submit_notes(
                     "submitted_at": None,
                 }
             )
-        supabase.table("clubready_bookings").update(failed_payload).eq(
-            "client_name", client_name
-        ).eq("period", period).eq("created_at", client_date).execute()
+        update_booking_status([booking_id], failed_payload, repository)
 
 
 def background_log_off_booking(
@@ -235,29 +298,32 @@ def background_log_off_booking(
     period,
     location,
     client_name,
-    client_date,
+    booking_ids,
     client_tz,
+    repository=None,
 ):
     def local_get_client_datetime():
         tz = pytz.timezone(client_tz)
         return datetime.now(tz)
 
+    booking_id = booking_ids[period]
     try:
-        supabase.table("clubready_bookings").update(
+        update_booking_status(
+            [booking_id],
             {
                 "log_off_task_status": "logging off",
                 "log_off_task_message": "Session logging off..",
                 "log_off_task_id": task_id,
-            }
-        ).eq("client_name", client_name).eq("period", period).eq(
-            "created_at", client_date
-        ).execute()
+            },
+            repository,
+        )
         result = log_off_booking(
             clubready_username, clubready_password, period, location, client_name
         )
 
         if result["status"]:
-            supabase.table("clubready_bookings").update(
+            update_booking_status(
+                task_booking_ids(booking_ids, period, result["same_client_period"]),
                 {
                     "logged_off": True,
                     "logged_off_at": local_get_client_datetime().strftime(
@@ -267,42 +333,25 @@ def background_log_off_booking(
                     "log_off_task_message": result["message"],
                     "log_off_task_id": task_id,
                     "log_off_task_error": None,
-                }
-            ).eq("client_name", client_name).eq("period", period).eq(
-                "created_at", client_date
-            ).execute()
-            if result["same_client_period"]:
-                supabase.table("clubready_bookings").update(
-                    {
-                        "logged_off": True,
-                        "logged_off_at": local_get_client_datetime().strftime(
-                            "%Y-%m-%d %H:%M:%S"
-                        ),
-                        "log_off_task_status": "success",
-                        "log_off_task_message": result["message"],
-                        "log_off_task_id": task_id,
-                        "log_off_task_error": None,
-                    }
-                ).eq("client_name", client_name).eq(
-                    "period", result["same_client_period"]
-                ).eq(
-                    "created_at", client_date
-                ).execute()
+                },
+                repository,
+            )
         else:
-            supabase.table("clubready_bookings").update(
+            update_booking_status(
+                [booking_id],
                 {
                     "log_off_task_status": "error",
                     "log_off_task_message": "log off failed",
                     "log_off_task_id": task_id,
                     "logged_off": False,
                     "log_off_task_error": "No matching booking found",
-                }
-            ).eq("client_name", client_name).eq("period", period).eq(
-                "created_at", client_date
-            ).execute()
+                },
+                repository,
+            )
     except Exception as e:
         logging.error(f"Background task {task_id} failed: {str(e)}")
-        supabase.table("clubready_bookings").update(
+        update_booking_status(
+            [booking_id],
             {
                 "logged_off": False,
                 "logged_off_at": None,
@@ -310,12 +359,143 @@ def background_log_off_booking(
                 "log_off_task_message": "log off failed",
                 "log_off_task_id": task_id,
                 "log_off_task_error": str(e),
+            },
+            repository,
+        )
+
+
+def get_questions_inputs(user_id, booking_id):
+    """The active flag and the user notes of a booking, or None if not found."""
+    booking_resp = (
+        supabase.table("clubready_bookings")
+        .select("*")
+        .eq("user_id", user_id)
+        .eq("booking_id", booking_id)
+        .execute()
+    )
+    if not booking_resp.data:
+        return None
+
+    active = booking_resp.data[0].get("active_member")
+
+    # Fetch notes only after booking validation
+    notes_resp = (
+        supabase.table("booking_notes")
+        .select("note")
+        .eq("booking_id", booking_id)
+        .eq("type", "user")
+        .execute()
+    )
+
+    notestr = (
+        ". ".join(note["note"] for note in notes_resp.data if note.get("note")) + "."
+    )
+    return active, notes_resp, notestr
+
+
+def clean_questions(questions):
+    qs = questions.get("questions", [])
+
+    if "no questions" in qs:
+        qs = []
+
+    return qs
+
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def generate_questions(notes_resp, notestr, active):
+    """Scrutinize and format the user notes of a booking.
+
+    The two completions are independent, so they run concurrently and the
+    caller waits for the slower one only.
+    """
+    results = run_llm_tasks(
+        {
+            "questions": (
+                lambda: scrutinize_notes(notes_resp, active),
+                dict(SCRUTINIZE_FALLBACK),
+            ),
+            "formatted_notes": (
+                lambda: format_notes(notestr),
+                dict(FORMAT_FALLBACK),
+            ),
+        }
+    )
+    return clean_questions(results["questions"]), results["formatted_notes"]
+
+
+def background_get_questions(task_id, note_id, notes_resp, notestr, active):
+    try:
+        # The job may have queued for a free worker, its timeout starts now
+        supabase.table("booking_notes").update(
+            {"task_started_at": datetime.now(timezone.utc).isoformat()}
+        ).eq("id", note_id).execute()
+        qs, formatted_notes = generate_questions(notes_resp, notestr, active)
+        supabase.table("booking_notes").update(
+            {
+                "note": json.dumps(qs),
+                "formatted_notes": json.dumps(formatted_notes),
+                "task_status": "success",
             }
-        ).eq("client_name", client_name).eq("period", period).eq(
-            "created_at", client_date
+        ).eq("id", note_id).execute()
+    except Exception as e:
+        logging.error(f"Background task {task_id} failed: {str(e)}")
+        supabase.table("booking_notes").update({"task_status": "error"}).eq(
+            "id", note_id
         ).execute()
 
 
+def get_questions_task(user_id, booking_id, task_id):
+    """The assistant note written by a /get_questions job, or None.
+
+    A job past QUESTIONS_TASK_TIMEOUT is marked as failed, since the worker
+    running it is gone.
+    """
+    notes = (
+        supabase.table("booking_notes")
+        .select("id, note, formatted_notes, task_status, task_started_at")
+        .eq("task_id", task_id)
+        .eq("booking_id", booking_id)
+        .eq("flexologist_uid", user_id)
+        .execute()
+    )
+    if not notes.data:
+        return None
+
+    note = notes.data[0]
+    if note["task_status"] == "generating" and note["task_started_at"]:
+        started = datetime.fromisoformat(note["task_started_at"])
+        age = (datetime.now(timezone.utc) - started).total_seconds()
+        if age > QUESTIONS_TASK_TIMEOUT:
+            logging.warning(f"Background task {task_id} expired after {age:.0f}s")
+            supabase.table("booking_notes").update({"task_status": "error"}).eq(
+                "id", note["id"]
+            ).eq("task_status", "generating").execute()
+            note["task_status"] = "error"
+    return note
+
+
+def questions_task_payload(note):
+    """Body of a job status, shaped like the /get_questions response once done."""
+    if note["task_status"] == "success":
+        return {
+            "task_status": "success",
+            "questions": {"questions": json.loads(note["note"])},
+            "formatted_notes": json.loads(note["formatted_notes"]),
+            "status": "success",
+        }
+    if note["task_status"] == "error":
+        return {
+            "task_status": "error",
+            "message": "Questions generation failed",
+            "status": "error",
+        }
+    return {"task_status": note["task_status"], "status": "success"}
+
+
 # @routes.route("/get_bookings", methods=["GET"])
 # @require_bearer_token
 # def get_bookings(token):
@@ -664,15 +844,8 @@ def get_bookings(token):
 
         client_datetime = get_client_datetime()
         client_date = client_datetime.strftime("%Y-%m-%d")
-        user = (
-            supabase.table("users").select("*").eq("id", user_data["user_id"]).execute()
-        )
-        if not user.data:
-            return jsonify({"message": "User not found", "status": "error"}), 404
-        if (
-            user.data[0]["clubready_username"] is None
-            or user.data[0]["clubready_password"] is None
-        ):
+        account = get_active_account(supabase, user_data["user_id"])
+        if not account or account["username"] is None or account["password"] is None:
             return (
                 jsonify(
                     {
@@ -682,18 +855,7 @@ def get_bookings(token):
                 ),
                 400,
             )
-        account_id = user.data[0]["clubready_user_id"]
-        other_accounts = (
-            json.loads(user.data[0]["other_clubready_accounts"])
-            if user.data[0]["other_clubready_accounts"]
-            else None
-        )
-
-        if other_accounts:
-            for account in other_accounts:
-                if account["active"] == True:
-                    account_id = account["id"]
-                    break
+        account_id = account["account_id"]
 
         print(account_id, "account_id")
 
@@ -708,26 +870,10 @@ def get_bookings(token):
         if len(check_today_booking.data) > 0 and reset != "true":
             bookings = check_today_booking.data
         else:
-            user_details = None
-            if other_accounts:
-                for account in other_accounts:
-                    if account["active"] == True:
-                        user_details = {
-                            "Username": account["username"],
-                            "Password": account["password"],
-                        }
-                        break
-
-                if not user_details:
-                    user_details = {
-                        "Username": user.data[0]["clubready_username"],
-                        "Password": user.data[0]["clubready_password"],
-                    }
-            else:
-                user_details = {
-                    "Username": user.data[0]["clubready_username"],
-                    "Password": user.data[0]["clubready_password"],
-                }
+            user_details = {
+                "Username": account["username"],
+                "Password": account["password"],
+            }
 
             print(user_details, "user_details")
 
@@ -764,30 +910,50 @@ def get_bookings(token):
 
                 bookings["bookings"].sort(key=lambda b: parse_time(b["booking_time"]))
 
-                for booking in bookings["bookings"]:
-                    if booking["booking_id"] not in existing_submitted_bookings:
-                        supabase.table("clubready_bookings").insert(
-                            {
-                                "user_id": user_data["user_id"],
-                                "client_name": booking["client_name"].lower(),
-                                "booking_id": booking["booking_id"],
-                                "workout_type": booking["workout_type"],
-                                "first_timer": booking["first_timer"],
-                                "active_member": booking["active"],
-                                "location": booking["location"].lower(),
-                                "phone_number": booking["phone"],
-                                "booking_time": booking["booking_time"],
-                                "period": booking["event_date"],
-                                "past_booking": booking["past"],
-                                "flexologist_name": booking["flexologist_name"].lower(),
-                                "submitted": False,
-                                "submitted_notes": None,
-                                "created_at": client_date,
-                                "profile_picture": booking["profile_image"],
-                                "group_booking": booking["group_booking"],
-                                "account_id": account_id,
-                            }
-                        ).execute()
+                new_bookings = [
+                    {
+                        "user_id": user_data["user_id"],
+                        "client_name": booking["client_name"].lower(),
+                        "booking_id": booking["booking_id"],
+                        "workout_type": booking["workout_type"],
+                        "first_timer": booking["first_timer"],
+                        "active_member": booking["active"],
+                        "location": booking["location"].lower(),
+                        "phone_number": booking["phone"],
+                        "booking_time": booking["booking_time"],
+                        "period": booking["event_date"],
+                        "past_booking": booking["past"],
+                        "flexologist_name": booking["flexologist_name"].lower(),
+                        "submitted": False,
+                        "submitted_notes": None,
+                        "created_at": client_date,
+                        "profile_picture": booking["profile_image"],
+                        "group_booking": booking["group_booking"],
+                        "account_id": account_id,
+                    }
+                    for booking in bookings["bookings"]
+                    if booking["booking_id"] not in existing_submitted_bookings
+                ]
+                # One bulk insert, in booking time order like the ids
+                if new_bookings and use_direct_db():
+                    get_repository().insert_bookings(new_bookings)
+                elif new_bookings:
+                    supabase.table("clubready_bookings").insert(new_bookings).execute()
+
+                if bookings["bookings"]:
+                    # Only the location is learned here, the bookings are
+                    # served without it
+                    try:
+                        record_clubready_account(
+                            supabase,
+                            account_id,
+                            user_data["user_id"],
+                            location=bookings["bookings"][0]["location"].lower(),
+                        )
+                    except Exception as e:
+                        logging.error(
+                            f"Failed to record the location of {account_id}: {str(e)}"
+                        )
 
                 check_bookings = (
                     supabase.table("clubready_bookings")
@@ -854,35 +1020,7 @@ def switch_account(token):
     try:
         account_id = request.args.get("account_id", None)
         user_data = decode_jwt_token(token)
-        check_user = (
-            supabase.table("users").select("*").eq("id", user_data["user_id"]).execute()
-        )
-        if not check_user.data:
-            return jsonify({"message": "User not found", "status": "error"}), 404
-        other_accounts = (
-            json.loads(check_user.data[0]["other_clubready_accounts"])
-            if check_user.data[0]["other_clubready_accounts"]
-            else None
-        )
-        if other_accounts:
-            if account_id:
-                for account in other_accounts:
-                    if account["id"] == account_id:
-                        account["active"] = True
-                    else:
-                        account["active"] = False
-                other_accounts = json.dumps(other_accounts)
-                supabase.table("users").update(
-                    {"other_clubready_accounts": other_accounts}
-                ).eq("id", user_data["user_id"]).execute()
-            else:
-                for account in other_accounts:
-                    account["active"] = False
-                other_accounts = json.dumps(other_accounts)
-                supabase.table("users").update(
-                    {"other_clubready_accounts": other_accounts}
-                ).eq("id", user_data["user_id"]).execute()
-        else:
+        if not switch_active_account(supabase, user_data["user_id"], account_id):
             return jsonify({"message": "No accounts found", "status": "error"}), 404
         return (
             jsonify({"message": "Account switched successfully", "status": "success"}),
@@ -946,7 +1084,7 @@ def get_client_history(token):
         client_name = data["client_name"].lower()
         client_history = (
             supabase.table("clubready_bookings")
-            .select("*")
+            .select(BOOKING_HISTORY)
             .eq("client_name", client_name)
             .eq("submitted", True)
             .execute()
@@ -972,7 +1110,7 @@ def get_flexologist_history(token):
             )
         flexologist_history = (
             supabase.table("clubready_bookings")
-            .select("*")
+            .select(BOOKING_HISTORY)
             .eq("flexologist_uid", user_data["user_id"])
             .execute()
         )
@@ -1001,9 +1139,11 @@ def get_notes(token, booking_id):
             )
         notes = (
             supabase.table("booking_notes")
-            .select("*")
+            .select(BOOKING_NOTES)
             .eq("booking_id", booking_id)
             .eq("flexologist_uid", user_data["user_id"])
+            # Assistant notes of /get_questions jobs show once they succeed
+            .or_("task_status.is.null,task_status.eq.success")
             .execute()
         )
         if notes.data:
@@ -1026,31 +1166,13 @@ def get_ai_logic(token):
                 401,
             )
         user_id = user_data["user_id"]
-        get_flexologist_data = (
-            supabase.table("users").select("*").eq("id", user_id).execute()
-        )
-        if not get_flexologist_data.data:
+        flexologist_name = get_flexologist_name(supabase, user_id)
+        if not flexologist_name:
             return (
                 jsonify({"message": "User not found", "status": "error"}),
                 404,
             )
 
-        check_accounts = get_flexologist_data.data[0]["other_clubready_accounts"]
-
-        flexologist_name = get_flexologist_data.data[0]["full_name"]
-
-        print(check_accounts, "check account")
-        print(flexologist_name, "flex name")
-
-        if check_accounts:
-            for account in json.loads(check_accounts):
-                if account["active"]:
-                    flexologist_name = account["full_name"]
-                    break
-
-        print(flexologist_name, "flex name again")
-        flexologist_name = flexologist_name.lower()
-
         current_date = datetime.now()
 
         end_date = (current_date - timedelta(days=1)).replace(
@@ -1061,7 +1183,7 @@ def get_ai_logic(token):
         )
         rpa_notes = (
             supabase.table("robot_process_automation_notes_records")
-            .select("*")
+            .select(RPA_NOTES_SCORES)
             .eq("flexologist_name", flexologist_name)
             .eq("first_timer", "NO")
             .gte("appointment_date", start_date)
@@ -1072,20 +1194,6 @@ def get_ai_logic(token):
 
         total_quality_notes_percentage_array = []
 
-        opportunities = [
-            "Needs Analysis: Deep Emotional Reason(Why)",
-            "Needs Analysis: Physiscal Need",
-            "Session Note: Problem Presented",
-            "Session Note: What was worked On",
-            "Session Note: Tension Level & Frequency",
-            "Session Note: Prescribed Action",
-            "Session Note: Homework",
-            "Quality: No Future Bookings",
-            "Quality: Missing Homework",
-            "Quality: Missing Waiver",
-            "Quality: Other",
-        ]
-
         opportunity_texts = {
             "Needs Analysis: Deep Emotional Reason(Why)": "Missing the client's deep emotional motivation (the WHY) behind their wellness goals.",
             "Needs Analysis: Physiscal Need": "Missing summary of the client's physical needs in the needs analysis.",
@@ -1100,7 +1208,7 @@ def get_ai_logic(token):
             "Quality: Other": "Other quality issues identified in the notes.",
         }
 
-        opportunities_count = {}
+        opportunities_count = LEGACY_NOTE_OPPORTUNITIES.counter()
 
         for note in rpa_notes:
             if note["first_timer"] == "YES":
@@ -1113,13 +1221,19 @@ def get_ai_logic(token):
                     percentage = 0
                 else:
                     percentage = (int(note["note_score"]) * 100) / 4
-            for opportunity in opportunities:
-                if opportunity in note["note_oppurtunities"]:
-                    opportunities_count[opportunity] = (
-                        opportunities_count.get(opportunity, 0) + 1
-                    )
+            mask = LEGACY_NOTE_OPPORTUNITIES.mask(note["note_oppurtunities"])
+            if mask:
+                LEGACY_NOTE_OPPORTUNITIES.count(opportunities_count, mask)
             total_quality_notes_percentage_array.append(percentage)
 
+        opportunities_count = {
+            opp: count
+            for opp, count in LEGACY_NOTE_OPPORTUNITIES.counts_by_name(
+                opportunities_count
+            ).items()
+            if count
+        }
+
         top_opportunities = sorted(
             opportunities_count.items(), key=lambda x: x[1], reverse=True
         )[:3]
@@ -1171,42 +1285,18 @@ def get_ai_information(token):
                 401,
             )
         user_id = user_data["user_id"]
-        flexologist_name_data = (
-            supabase.table("clubready_bookings")
-            .select("flexologist_name, users(admin_id)")
-            .eq("user_id", user_id)
-            .limit(1)
-            .execute()
-        )
+        principal = current_principal()
+        flexologist_name = get_flexologist_name(supabase, user_id)
 
-        if not flexologist_name_data.data:
+        if not principal or not flexologist_name:
             return (
                 jsonify({"message": "User not found", "status": "error"}),
                 404,
             )
 
-        flexologist_name = (
-            flexologist_name_data.data[0].get("flexologist_name")
-            if flexologist_name_data.data
-            else None
-        )
-        admin_id = (
-            flexologist_name_data.data[0]["users"]["admin_id"]
-            if flexologist_name_data.data
-            else None
-        )
-        config_result = (
-            supabase.table("robot_process_automation_config")
-            .select("id")
-            .eq("admin_id", admin_id)
-            .single()
-            .execute()
-        )
-
-        if not config_result.data:
+        config_id = principal["rpa_config_id"]
+        if not config_id:
             return jsonify({"error": "No RPA config found", "status": "error"}), 400
-
-        config_id = config_result.data["id"]
         current_date = datetime.now()
 
         end_date = (current_date - timedelta(days=1)).replace(
@@ -1216,36 +1306,25 @@ def get_ai_information(token):
             hour=0, minute=0, second=0, microsecond=0
         )
 
-        # Build query dynamically
-        rpa_notes = []
-        offset = 0
-        limit = 1000
-
-        while True:
-            # Start building the query
-            query = (
-                supabase.table("robot_process_automation_notes_records")
-                .select(
-                    "flexologist_name, location, first_timer, note_score, "
-                    "appointment_date, note_oppurtunities"
-                )
-                .eq("config_id", config_id)
+        # Aggregate the notes one column store batch at a time
+        rpa_notes = NoteRecords.batches(
+            iter_rows(
+                supabase,
+                "robot_process_automation_notes_records",
+                "flexologist_name, location, first_timer, note_score, "
+                "appointment_date, note_oppurtunities",
+                lambda query: query.eq("config_id", config_id)
                 .neq("status", "No Show")
                 .eq("flexologist_name", flexologist_name)
                 .gte("appointment_date", start_date)
-                .lt("appointment_date", end_date)
+                .lt("appointment_date", end_date),
             )
+        )
 
-            # Execute with pagination
-            data = query.range(offset, offset + limit - 1).execute().data
-            rpa_notes.extend(data)
-
-            if len(data) < limit:
-                break
-            offset += limit
+        (audit,) = aggregate(rpa_notes, RpaAuditAggregator(FIRST_VISIT_OPPORTUNITIES))
 
         # Early return if no notes
-        if not rpa_notes:
+        if not audit.total_notes:
             return (
                 jsonify(
                     {
@@ -1262,226 +1341,7 @@ def get_ai_information(token):
                 200,
             )
 
-        # Use defaultdict for cleaner counting
-        from collections import defaultdict
-
-        locations_with_notes_count = defaultdict(int)
-        flexologist_with_notes_count = defaultdict(int)
-        locations_with_opportunity_count = defaultdict(int)
-        flexologist_with_opportunity_count = defaultdict(int)
-        flexologist_notes_percentage_obj = defaultdict(
-            lambda: {"percentage": 0, "total": 0}
-        )
-        location_notes_percentage_obj = defaultdict(
-            lambda: {"percentage": 0, "total": 0}
-        )
-
-        # Opportunity mapping for backward compatibility
-        opportunity_mapping = {
-            "Session Note: Problem Presented": "Problem Presented",
-            "Session Note: What was worked On": "Current Session Activity",
-            "Session Note: Tension Level & Frequency": "Current Session Activity",
-            "Session Note: Prescribed Action": "Next Session Focus",
-            "Session Note: Homework": "Homework",
-        }
-
-        # Define opportunities based on filter_metric
-
-        opportunities = [
-            "Confirmation Call",
-            "Grip Sock Notice",
-            "Arrive Early",
-            "Location",
-            "Prepaid",
-            "Keynote",
-            "Stated Goal",
-            "Emotional Why",
-            "Prior Solutions",
-            "Routine Captured",
-            "Physical/Medical Issue",
-            "Plan Recommendation",
-            "Problem Presented",
-            "Current Session Activity",
-            "Next Session Focus",
-            "Homework",
-        ]
-
-        opportunities_count = {opp: 0 for opp in opportunities}
-        notes_with_opportunities = []
-        total_quality_notes_percentage_array = []
-
-        # Single pass through all notes
-        for note in rpa_notes:
-            location_key = note["location"]
-            flexologist_key = note["flexologist_name"].lower()
-
-            # Count by location and flexologist
-            locations_with_notes_count[location_key] += 1
-            flexologist_with_notes_count[flexologist_key] += 1
-
-            # Calculate quality percentage
-            if note["first_timer"] == "YES":
-                max_score = 18
-            else:
-                max_score = 4
-
-            if note["note_score"] == "N/A":
-                percentage = 0
-            else:
-                percentage = (int(note["note_score"]) * 100) / max_score
-
-            total_quality_notes_percentage_array.append(percentage)
-            flexologist_notes_percentage_obj[note["flexologist_name"]][
-                "percentage"
-            ] += percentage
-            flexologist_notes_percentage_obj[note["flexologist_name"]]["total"] += 1
-            location_notes_percentage_obj[location_key]["percentage"] += percentage
-            location_notes_percentage_obj[location_key]["total"] += 1
-
-            # Process opportunities
-            note_opps = note["note_oppurtunities"]
-            has_opportunities = note_opps and note_opps not in ["N/A", "[]", "", []]
-
-            if has_opportunities:
-                notes_with_opportunities.append(note)
-                locations_with_opportunity_count[location_key] += 1
-                flexologist_with_opportunity_count[flexologist_key] += 1
-
-                # Parse and count opportunities
-                try:
-                    lowered_opps = [
-                        item.lower()
-                        for item in json.loads(note_opps)
-                        if isinstance(item, str)
-                    ]
-
-                    for opportunity in opportunities:
-                        opp_lower = opportunity.lower()
-                        # Check new opportunity name
-                        if opp_lower in lowered_opps:
-                            opportunities_count[opportunity] += 1
-                        else:
-                            # Check old opportunity names
-                            old_names = [
-                                old.lower()
-                                for old, new in opportunity_mapping.items()
-                                if new.lower() == opp_lower
-                            ]
-                            if any(old_name in lowered_opps for old_name in old_names):
-                                opportunities_count[opportunity] += 1
-                except (json.JSONDecodeError, TypeError):
-                    continue
-
-        # Calculate percentages
-        total_notes = len(rpa_notes)
-
-        # Opportunity percentages
-        for opportunity in opportunities:
-            opportunities_count[opportunity] = round(
-                (opportunities_count[opportunity] / total_notes) * 100, 2
-            )
-
-        # Location opportunity percentages
-        opportunities_count_with_location = {}
-        for location_key in locations_with_notes_count:
-            if location_key in locations_with_opportunity_count:
-                opportunities_count_with_location[location_key] = round(
-                    (
-                        locations_with_opportunity_count[location_key]
-                        / locations_with_notes_count[location_key]
-                    )
-                    * 100,
-                    2,
-                )
-            else:
-                opportunities_count_with_location[location_key] = 0
-
-        # Flexologist opportunity percentages
-        for flexologist_key in flexologist_with_notes_count:
-            if flexologist_key in flexologist_with_opportunity_count:
-                flexologist_with_opportunity_count[flexologist_key] = round(
-                    (
-                        flexologist_with_opportunity_count[flexologist_key]
-                        / flexologist_with_notes_count[flexologist_key]
-                    )
-                    * 100,
-                    2,
-                )
-            else:
-                flexologist_with_opportunity_count[flexologist_key] = 0
-
-        # Sort results
-        sorted_opportunities = sorted(
-            opportunities_count.items(), key=lambda item: item[1], reverse=True
-        )
-
-        sorted_location_notes = sorted(
-            location_notes_percentage_obj.items(),
-            key=lambda item: (
-                item[1]["percentage"] / item[1]["total"] if item[1]["total"] > 0 else 0
-            ),
-            reverse=True,
-        )
-
-        sorted_flexologist_notes = sorted(
-            flexologist_notes_percentage_obj.items(),
-            key=lambda item: (
-                item[1]["percentage"] / item[1]["total"] if item[1]["total"] > 0 else 0
-            ),
-            reverse=True,
-        )
-
-        # Calculate total quality percentage
-        total_quality_notes_percentage = (
-            sum(total_quality_notes_percentage_array)
-            / len(total_quality_notes_percentage_array)
-            if total_quality_notes_percentage_array
-            else 0
-        )
-
-        return (
-            jsonify(
-                {
-                    "status": "success",
-                    "note_opportunities": [
-                        {"opportunity": opp, "percentage": pct}
-                        for opp, pct in sorted_opportunities
-                    ],
-                    "total_quality_notes": total_notes,
-                    "total_quality_notes_percentage": round(
-                        total_quality_notes_percentage
-                    ),
-                    "total_notes": total_notes,
-                    "total_notes_with_opportunities": len(notes_with_opportunities),
-                    "total_notes_with_opportunities_percentage": round(
-                        (len(notes_with_opportunities) / total_notes) * 100, 2
-                    ),
-                    "location": [
-                        {
-                            "location": loc,
-                            "percentage": (
-                                round(data["percentage"] / data["total"], 2)
-                                if data["total"] > 0
-                                else 0
-                            ),
-                        }
-                        for loc, data in sorted_location_notes
-                    ],
-                    "flexologist": [
-                        {
-                            "flexologist": flex,
-                            "percentage": (
-                                round(data["percentage"] / data["total"], 2)
-                                if data["total"] > 0
-                                else 0
-                            ),
-                        }
-                        for flex, data in sorted_flexologist_notes
-                    ],
-                }
-            ),
-            200,
-        )
+        return jsonify({"status": "success", **audit.summary()}), 200
 
     except Exception as e:
         logging.error(f"Error in GET /api/process/get_ai_information: {str(e)}")
@@ -1499,54 +1359,65 @@ def get_questions(token, booking_id):
         if role_id not in {3, 8}:
             return jsonify({"message": "Unauthorized", "status": "error"}), 401
 
-        # Ensure booking exists first
-        booking_resp = (
-            supabase.table("clubready_bookings")
-            .select("*")
-            .eq("user_id", user_id)
-            .eq("booking_id", booking_id)
-            .execute()
-        )
-        if not booking_resp.data:
+        inputs = get_questions_inputs(user_id, booking_id)
+        if not inputs:
             return jsonify({"message": "Booking not found", "status": "error"}), 404
-
-        active = booking_resp.data[0].get("active_member")
-
-        # Fetch notes only after booking validation
-        notes_resp = (
-            supabase.table("booking_notes")
-            .select("note")
-            .eq("booking_id", booking_id)
-            .eq("type", "user")
-            .execute()
-        )
-
-        notestr = (
-            ". ".join(note["note"] for note in notes_resp.data if note.get("note"))
-            + "."
-        )
-
-        questions = scrutinize_notes(notes_resp, active)
-        formatted_notes = format_notes(notestr)
-
-        qs = questions.get("questions", [])
-
-        if "no questions" in qs:
-            qs = []
+        active, notes_resp, notestr = inputs
 
         timestamp = get_client_datetime().strftime("%Y-%m-%d %H:%M:%S")
 
         note_data = {
             "flexologist_uid": user_id,
-            "note": json.dumps(qs),
             "time": timestamp,
             "voice": "assistant",
             "type": "assistant",
             "booking_id": booking_id,
-            "formatted_notes": json.dumps(formatted_notes),
             "created_at": timestamp,
         }
 
+        if request.args.get("async", "false").lower() == "true":
+            # The note is written now and completed by the job, the client
+            # follows it on the status or events endpoint
+            task_id = str(uuid.uuid4())
+            note_data.update(
+                {
+                    "task_id": task_id,
+                    "task_status": "generating",
+                    "task_started_at": datetime.now(timezone.utc).isoformat(),
+                }
+            )
+            insert_resp = supabase.table("booking_notes").insert(note_data).execute()
+            if not insert_resp.data:
+                return (
+                    jsonify({"message": "Notes addition failed", "status": "error"}),
+                    400,
+                )
+
+            job_executor.submit(
+                background_get_questions,
+                task_id,
+                insert_resp.data[0]["id"],
+                notes_resp,
+                notestr,
+                active,
+            )
+
+            return (
+                jsonify(
+                    {
+                        "message": "Questions generation in progress",
+                        "status": "success",
+                        "task_id": task_id,
+                    }
+                ),
+                202,
+            )
+
+        qs, formatted_notes = generate_questions(notes_resp, notestr, active)
+        note_data.update(
+            {"note": json.dumps(qs), "formatted_notes": json.dumps(formatted_notes)}
+        )
+
         insert_resp = supabase.table("booking_notes").insert(note_data).execute()
 
         if insert_resp.data:
@@ -1568,6 +1439,148 @@ def get_questions(token, booking_id):
         return jsonify({"error": "Internal server error", "status": "error"}), 500
 
 
+@routes.route("/get_questions/<booking_id>/status/<task_id>", methods=["GET"])
+@require_bearer_token
+def get_questions_status(token, booking_id, task_id):
+    try:
+        user_data = decode_jwt_token(token)
+        if user_data["role_id"] not in [3, 8]:
+            return jsonify({"message": "Unauthorized", "status": "error"}), 401
+
+        note = get_questions_task(user_data["user_id"], booking_id, task_id)
+        if not note:
+            return jsonify({"message": "Task not found", "status": "error"}), 404
+
+        return jsonify(questions_task_payload(note)), 200
+
+    except Exception as e:
+        logging.error(f"Error in GET /get_questions/status: {str(e)}")
+        return jsonify({"error": "Internal server error", "status": "error"}), 500
+
+
+@routes.route("/get_questions/<booking_id>/events/<task_id>", methods=["GET"])
+@require_bearer_token
+def get_questions_events(token, booking_id, task_id):
+    """Server-Sent Events of a /get_questions job, ending with its result.
+
+    The stream holds a worker thread while it polls the note, so it closes
+    after QUESTIONS_EVENTS_TIMEOUT and the client falls back to the status
+    endpoint.
+    """
+    try:
+        user_data = decode_jwt_token(token)
+        if user_data["role_id"] not in [3, 8]:
+            return jsonify({"message": "Unauthorized", "status": "error"}), 401
+
+        user_id = user_data["user_id"]
+        if not get_questions_task(user_id, booking_id, task_id):
+            return jsonify({"message": "Task not found", "status": "error"}), 404
+
+        def events():
+            deadline = time.monotonic() + QUESTIONS_EVENTS_TIMEOUT
+            while True:
+                payload = questions_task_payload(
+                    get_questions_task(user_id, booking_id, task_id)
+                )
+                done = payload["task_status"] != "generating"
+                if done or time.monotonic() > deadline:
+                    yield sse_event("result", payload)
+                    return
+                yield sse_event("status", payload)
+                time.sleep(QUESTIONS_EVENTS_INTERVAL)
+
+        return Response(
+            stream_with_context(events()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    except Exception as e:
+        logging.error(f"Error in GET /get_questions/events: {str(e)}")
+        return jsonify({"error": "Internal server error", "status": "error"}), 500
+
+
+@routes.route("/get_questions/<booking_id>/stream", methods=["GET"])
+@require_bearer_token
+def stream_questions(token, booking_id):
+    """/get_questions as Server-Sent Events.
+
+    Each formatted note section is sent as a `section` event as soon as the
+    model has written it, the questions follow in a `questions` event, and
+    a `result` event carries the /get_questions response once the note is
+    saved.
+    """
+    try:
+        user_data = decode_jwt_token(token)
+        if user_data["role_id"] not in [3, 8]:
+            return jsonify({"message": "Unauthorized", "status": "error"}), 401
+
+        user_id = user_data["user_id"]
+        inputs = get_questions_inputs(user_id, booking_id)
+        if not inputs:
+            return jsonify({"message": "Booking not found", "status": "error"}), 404
+        active, notes_resp, notestr = inputs
+
+        timestamp = get_client_datetime().strftime("%Y-%m-%d %H:%M:%S")
+        # Scrutinized while the formatting streams
+        questions = llm_executor.submit(scrutinize_notes, notes_resp, active)
+
+        def events():
+            formatted_notes = dict(FORMAT_FALLBACK)
+            for kind, key, value in stream_format_notes(notestr):
+                if kind == "section":
+                    yield sse_event("section", {"key": key, "value": value})
+                else:
+                    formatted_notes = key
+
+            try:
+                qs = clean_questions(questions.result(timeout=LLM_DEADLINE))
+            except Exception as e:
+                logging.error(f"Scrutinizing the notes of {booking_id} failed: {e}")
+                qs = clean_questions(SCRUTINIZE_FALLBACK)
+            yield sse_event("questions", {"questions": qs})
+
+            insert_resp = (
+                supabase.table("booking_notes")
+                .insert(
+                    {
+                        "flexologist_uid": user_id,
+                        "note": json.dumps(qs),
+                        "time": timestamp,
+                        "voice": "assistant",
+                        "type": "assistant",
+                        "booking_id": booking_id,
+                        "formatted_notes": json.dumps(formatted_notes),
+                        "created_at": timestamp,
+                    }
+                )
+                .execute()
+            )
+            if not insert_resp.data:
+                yield sse_event(
+                    "result", {"message": "Notes addition failed", "status": "error"}
+                )
+                return
+            yield sse_event(
+                "result",
+                {
+                    "questions": {"questions": qs},
+                    "formatted_notes": formatted_notes,
+                    "status": "success",
+                },
+            )
+
+        return Response(
+            stream_with_context(events()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    except Exception as e:
+        logging.error(f"Error in GET /get_questions/stream: {str(e)}")
+        return jsonify({"error": "Internal server error", "status": "error"}), 500
+
+
 # @routes.route("/submit_notes", methods=["POST"])
 # @require_bearer_token
 # def submit_notes_route(token):
@@ -1654,25 +1667,27 @@ def submit_notes_route(token):
         if not notes or notes.strip() == "":
             return jsonify({"error": "Notes are required", "status": "error"}), 400
 
-        user_details = (
-            supabase.table("users").select("*").eq("id", user_data["user_id"]).execute()
-        )
-
-        if not user_details.data:
-            return jsonify({"error": "User not found", "status": "error"}), 404
+        account = get_active_account(supabase, user_data["user_id"])
+        if not account:
+            return jsonify({"error": "No account found", "status": "error"}), 404
 
-        check_if_submitted_prior = (
-            supabase.table("clubready_bookings")
-            .select("submitted")
-            .eq("period", period)
-            .eq("client_name", client_name)
-            .eq("location", location)
-            .eq("user_id", user_data["user_id"])
-            .eq("created_at", client_date)
-            .execute()
+        client_bookings = get_client_bookings(
+            user_data["user_id"], client_name, client_date
+        )
+        booking = next(
+            (
+                booking
+                for booking in client_bookings
+                if booking["period"] == period and booking["location"] == location
+            ),
+            None,
         )
+        if not booking:
+            return jsonify({"error": "Booking not found", "status": "error"}), 404
+        booking_ids = {booking["period"]: booking["id"] for booking in client_bookings}
+        booking_ids[period] = booking["id"]
 
-        if check_if_submitted_prior.data[0]["submitted"] and not supplementary:
+        if booking["submitted"] and not supplementary:
             return (
                 jsonify(
                     {
@@ -1683,29 +1698,8 @@ def submit_notes_route(token):
                 403,
             )
 
-        other_accounts = (
-            json.loads(user_details.data[0]["other_clubready_accounts"])
-            if user_details.data[0]["other_clubready_accounts"]
-            else None
-        )
-
-        username = None
-        password = None
-
-        # First, try to find an active account in other_accounts
-        if other_accounts:
-            for account in other_accounts:
-                if account.get("active") == True:
-                    username = account["username"]
-                    password = account["password"]
-                    break
-
-        # If no active account found, use main account credentials
-        if not username or not password:
-            username = user_details.data[0]["clubready_username"]
-            password = user_details.data[0]["clubready_password"]
-
-        # Final check - if still no credentials, return error
+        username = account["username"]
+        password = account["password"]
         if not username or not password:
             return jsonify({"error": "No account found", "status": "error"}), 404
 
@@ -1722,10 +1716,11 @@ def submit_notes_route(token):
                 location,
                 client_name,
                 coaching,
-                client_date,
+                booking_ids,
                 client_tz,
                 supplementary,
                 group_booking,
+                get_repository() if use_direct_db() else None,
             ),
         )
         thread.start()
@@ -1768,23 +1763,23 @@ def log_off_booking_route(token):
         client_datetime = get_client_datetime()
         client_date = client_datetime.strftime("%Y-%m-%d")
 
-        user_details = (
-            supabase.table("users").select("*").eq("id", user_data["user_id"]).execute()
-        )
-        if not user_details.data:
-            return jsonify({"error": "User not found", "status": "error"}), 404
+        account = get_active_account(supabase, user_data["user_id"])
+        if not account:
+            return jsonify({"error": "No account found", "status": "error"}), 404
 
-        check_if_logged_prior = (
-            supabase.table("clubready_bookings")
-            .select("logged_off")
-            .eq("period", period)
-            .eq("client_name", client_name)
-            .eq("user_id", user_data["user_id"])
-            .eq("created_at", client_date)
-            .execute()
+        client_bookings = get_client_bookings(
+            user_data["user_id"], client_name, client_date
         )
+        booking = next(
+            (booking for booking in client_bookings if booking["period"] == period),
+            None,
+        )
+        if not booking:
+            return jsonify({"error": "Booking not found", "status": "error"}), 404
+        booking_ids = {booking["period"]: booking["id"] for booking in client_bookings}
+        booking_ids[period] = booking["id"]
 
-        if check_if_logged_prior.data[0]["logged_off"]:
+        if booking["logged_off"]:
             return (
                 jsonify(
                     {
@@ -1795,25 +1790,8 @@ def log_off_booking_route(token):
                 403,
             )
 
-        other_accounts = (
-            json.loads(user_details.data[0]["other_clubready_accounts"])
-            if user_details.data[0]["other_clubready_accounts"]
-            else None
-        )
-
-        username = None
-        password = None
-
-        if not other_accounts:
-            username = user_details.data[0]["clubready_username"]
-            password = user_details.data[0]["clubready_password"]
-        else:
-            for account in other_accounts:
-                if account["active"] == True:
-                    username = account["username"]
-                    password = account["password"]
-                    break
-
+        username = account["username"]
+        password = account["password"]
         if not username or not password:
             return jsonify({"error": "No account found", "status": "error"}), 404
 
@@ -1828,8 +1806,9 @@ def log_off_booking_route(token):
                 period,
                 location,
                 client_name,
-                client_date,
+                booking_ids,
                 client_tz,
+                get_repository() if use_direct_db() else None,
             ),
         )
         thread.start()
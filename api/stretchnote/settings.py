@@ -1,8 +1,14 @@
 from flask import Blueprint, request, jsonify
 from ..utils.utils import decode_jwt_token, reverse_hash_credentials, clubready_login
 from ..utils.middleware import require_bearer_token
+from ..database.accounts import (
+    get_account,
+    get_other_accounts,
+    record_clubready_account,
+    record_primary_account,
+    remove_clubready_account,
+)
 import logging
-import json
 import uuid
 
 routes = Blueprint("note_settings", __name__)
@@ -21,16 +27,13 @@ def get_clubready_details(token):
             return jsonify({"message": "User not found", "status": "error"}), 404
 
         if account_id:
-            other_accounts = (
-                json.loads(user.data[0]["other_clubready_accounts"])
-                if user.data[0]["other_clubready_accounts"]
-                else None
+            account = get_account(
+                supabase, user_data["user_id"], account_id, "username, password"
             )
-            for account in other_accounts:
-                if account["id"] == account_id:
-                    clubready_username = account["username"]
-                    clubready_password = account["password"]
-                    break
+            if not account:
+                return jsonify({"message": "Account not found", "status": "error"}), 404
+            clubready_username = account["username"]
+            clubready_password = account["password"]
         else:
             clubready_username = user.data[0]["clubready_username"]
             clubready_password = user.data[0]["clubready_password"]
@@ -90,12 +93,9 @@ def update_clubready_details(token):
 
         account_id = data.get("account_id", None)
         if account_id:
-            other_accounts = (
-                json.loads(user.data[0]["other_clubready_accounts"])
-                if user.data[0]["other_clubready_accounts"]
-                else None
-            )
-            if not other_accounts:
+            if not get_account(
+                supabase, user_data["user_id"], account_id, "account_id"
+            ):
                 return (
                     jsonify(
                         {
@@ -105,20 +105,16 @@ def update_clubready_details(token):
                     ),
                     404,
                 )
-            for account in other_accounts:
-                if account["id"] == account_id:
-                    account["username"] = data["username"]
-                    account["password"] = validate_clubready["hashed_password"]
-                    account["location_id"] = validate_clubready["location_id"]
-                    account["user_id"] = validate_clubready["user_id"]
-                    account["full_name"] = validate_clubready["full_name"]
-                    break
-            other_accounts = json.dumps(other_accounts)
-            supabase.table("users").update(
-                {
-                    "other_clubready_accounts": other_accounts,
-                }
-            ).eq("id", user_data["user_id"]).execute()
+            record_clubready_account(
+                supabase,
+                account_id,
+                user_data["user_id"],
+                username=data["username"],
+                password=validate_clubready["hashed_password"],
+                location_id=validate_clubready["location_id"],
+                clubready_user_id=validate_clubready["user_id"],
+                full_name=validate_clubready["full_name"],
+            )
         else:
             clubready_username = data["username"]
             clubready_password = validate_clubready["hashed_password"]
@@ -126,6 +122,16 @@ def update_clubready_details(token):
             user_id = validate_clubready["user_id"]
             full_name = validate_clubready["full_name"]
 
+            record_primary_account(
+                supabase,
+                user_id,
+                user_data["user_id"],
+                username=clubready_username,
+                password=clubready_password,
+                location_id=location,
+                clubready_user_id=user_id,
+                full_name=full_name,
+            )
             supabase.table("users").update(
                 {
                     "clubready_username": clubready_username,
@@ -174,12 +180,9 @@ def update_profile_name(token):
 
         account_id = data.get("account_id", None)
         if account_id:
-            other_accounts = (
-                json.loads(user.data[0]["other_clubready_accounts"])
-                if user.data[0]["other_clubready_accounts"]
-                else None
-            )
-            if not other_accounts:
+            if not get_account(
+                supabase, user_data["user_id"], account_id, "account_id"
+            ):
                 return (
                     jsonify(
                         {
@@ -189,19 +192,21 @@ def update_profile_name(token):
                     ),
                     404,
                 )
-            for account in other_accounts:
-                if account["id"] == account_id:
-                    account["full_name"] = data["profile_name"]
-                    break
-            other_accounts = json.dumps(other_accounts)
-            supabase.table("users").update(
-                {
-                    "other_clubready_accounts": other_accounts,
-                }
-            ).eq("id", user_data["user_id"]).execute()
+            record_clubready_account(
+                supabase,
+                account_id,
+                user_data["user_id"],
+                full_name=data["profile_name"],
+            )
         else:
             full_name = data["profile_name"]
 
+            record_clubready_account(
+                supabase,
+                user.data[0]["clubready_user_id"],
+                user_data["user_id"],
+                full_name=full_name,
+            )
             supabase.table("users").update(
                 {
                     "full_name": full_name,
@@ -260,19 +265,17 @@ def add_clubready_account(token):
                 400,
             )
 
-        if check_user.data[0]["other_clubready_accounts"]:
-            other_accounts = json.loads(check_user.data[0]["other_clubready_accounts"])
-            for account in other_accounts:
-                if account["username"].lower() == data["username"].lower():
-                    return (
-                        jsonify(
-                            {
-                                "message": "Clubready username already exists",
-                                "status": "error",
-                            }
-                        ),
-                        400,
-                    )
+        for account in get_other_accounts(supabase, user_data["user_id"], "username"):
+            if account["username"].lower() == data["username"].lower():
+                return (
+                    jsonify(
+                        {
+                            "message": "Clubready username already exists",
+                            "status": "error",
+                        }
+                    ),
+                    400,
+                )
 
         validate_clubready = clubready_login(data)
         if not validate_clubready["status"]:
@@ -281,36 +284,18 @@ def add_clubready_account(token):
                 400,
             )
 
-        data_to_add = {
-            "id": str(uuid.uuid4()),
-            "username": data["username"],
-            "password": validate_clubready["hashed_password"],
-            "location_id": validate_clubready["location_id"],
-            "user_id": validate_clubready["user_id"],
-            "full_name": validate_clubready["full_name"],
-            "active": False,
-        }
-
-        get_accounts = (
-            supabase.table("users")
-            .select("other_clubready_accounts")
-            .eq("id", user_data["user_id"])
-            .execute()
+        record_clubready_account(
+            supabase,
+            str(uuid.uuid4()),
+            user_data["user_id"],
+            username=data["username"],
+            password=validate_clubready["hashed_password"],
+            location_id=validate_clubready["location_id"],
+            clubready_user_id=validate_clubready["user_id"],
+            full_name=validate_clubready["full_name"],
+            is_primary=False,
+            is_active=False,
         )
-        if get_accounts.data[0]["other_clubready_accounts"]:
-            other_accounts = json.loads(
-                get_accounts.data[0]["other_clubready_accounts"]
-            )
-        else:
-            other_accounts = []
-        other_accounts.append(data_to_add)
-        other_accounts = json.dumps(other_accounts)
-
-        supabase.table("users").update(
-            {
-                "other_clubready_accounts": other_accounts,
-            }
-        ).eq("id", user_data["user_id"]).execute()
 
         logging.info(
             f"Clubready account added successfully for user {user_data['email']}"
@@ -338,29 +323,28 @@ def get_clubready_accounts(token):
         )
         if not check_user.data:
             return jsonify({"message": "User not found", "status": "error"}), 404
-        other_accounts = (
-            json.loads(check_user.data[0]["other_clubready_accounts"])
-            if check_user.data[0]["other_clubready_accounts"]
-            else []
-        )
-        if len(other_accounts) > 0:
-            other_accounts = [
-                {
-                    "id": account["id"],
-                    "name": account["full_name"],
-                    "active": account["active"],
-                    "username": account["username"],
-                    "location_id": account["location_id"],
-                    "user_id": account["user_id"],
-                }
-                for account in other_accounts
-            ]
+        other_accounts = [
+            {
+                "id": account["account_id"],
+                "name": account["full_name"],
+                "active": account["is_active"],
+                "username": account["username"],
+                "location_id": account["location_id"],
+                "user_id": account["clubready_user_id"],
+            }
+            for account in get_other_accounts(
+                supabase,
+                user_data["user_id"],
+                "account_id, full_name, is_active, username, location_id, "
+                "clubready_user_id",
+            )
+        ]
         other_accounts.insert(
             0,
             {
                 "id": None,
                 "name": check_user.data[0]["full_name"],
-                "active": True,
+                "active": not any(account["active"] for account in other_accounts),
                 "username": check_user.data[0]["clubready_username"],
                 "location_id": check_user.data[0]["clubready_location_id"],
                 "user_id": check_user.data[0]["clubready_user_id"],
@@ -392,20 +376,7 @@ def delete_clubready_account(token):
         if not check_user.data:
             return jsonify({"message": "User not found", "status": "error"}), 404
 
-        other_accounts = (
-            json.loads(check_user.data[0]["other_clubready_accounts"])
-            if check_user.data[0]["other_clubready_accounts"]
-            else None
-        )
-        if other_accounts:
-            for account in other_accounts:
-                if account["id"] == data["account_id"]:
-                    other_accounts.remove(account)
-                    break
-            other_accounts = json.dumps(other_accounts)
-            supabase.table("users").update(
-                {"other_clubready_accounts": other_accounts}
-            ).eq("id", user_data["user_id"]).execute()
+        remove_clubready_account(supabase, user_data["user_id"], data["account_id"])
         return (
             jsonify(
                 {
@@ -1,4 +1,6 @@
 from datetime import datetime, timedelta
+from .opportunities import NOTE_OPPORTUNITIES
+from .note_records import NO_OPPORTUNITIES
 
 
 def get_start_and_end_date(duration, start_date_str=None, end_date_str=None):
@@ -55,3 +57,229 @@ def get_start_and_end_date(duration, start_date_str=None, end_date_str=None):
         )
 
     return start_date, end_date
+
+
+def aggregate(batches, *aggregators):
+    """Run each aggregator over every `NoteRecords` batch and return them."""
+    for records in batches:
+        for aggregator in aggregators:
+            aggregator.update(records)
+    return aggregators
+
+
+def _average(total, count):
+    return total / count if count > 0 else 0
+
+
+def _add_counts(totals, names, *columns):
+    """Add one batch's per-name columns to the running `totals` by name.
+
+    Each batch interns its own names, so they are matched by name; `totals`
+    keeps the order in which the names were first seen.
+    """
+    for name, *counts in zip(names, *columns):
+        current = totals.get(name)
+        if current is None:
+            totals[name] = list(counts)
+        else:
+            for index, count in enumerate(counts):
+                current[index] += count
+
+
+class GroupTotalsAggregator:
+    """`[total, count]` of RPA notes by location or flexologist name.
+
+    Totals are note counts, or the sum of the notes' quality percentages when
+    `first_visit_max` is given; names are grouped by `key` when given.
+    """
+
+    def __init__(self, column, first_visit_max=None, key=None):
+        self.column = column
+        self.first_visit_max = first_visit_max
+        self.key = key
+        self.total_notes = 0
+        self.totals = {}
+
+    def update(self, records):
+        self.total_notes += len(records)
+        values = None
+        if self.first_visit_max is not None:
+            values = records.quality_percentages(self.first_visit_max)
+        totals = records.group_totals(self.column, values, self.key)
+        _add_counts(self.totals, list(totals), *zip(*totals.values()))
+
+
+class RpaAuditAggregator:
+    """Note quality and opportunity summary of RPA notes."""
+
+    def __init__(self, opportunities):
+        self.total_notes = 0
+        self.total_notes_with_opportunities = 0
+        self.total_percentage = 0
+        self.opportunities = opportunities
+        self.opportunities_count = NOTE_OPPORTUNITIES.counter()
+        # [percentage sum, note count] by name, across every update
+        self.location_notes = {}
+        self.flexologist_notes = {}
+
+    def update(self, records):
+        location_sums = [0] * len(records.locations)
+        location_counts = [0] * len(records.locations)
+        flexologist_sums = [0] * len(records.flexologists)
+        flexologist_counts = [0] * len(records.flexologists)
+        opportunities_count = self.opportunities_count
+
+        for location_id, flexologist_id, percentage, mask in zip(
+            records.location_ids,
+            records.flexologist_ids,
+            records.quality_percentages(18),
+            records.opportunity_masks,
+        ):
+            self.total_percentage += percentage
+            location_sums[location_id] += percentage
+            location_counts[location_id] += 1
+            flexologist_sums[flexologist_id] += percentage
+            flexologist_counts[flexologist_id] += 1
+
+            if mask == NO_OPPORTUNITIES:
+                continue
+            self.total_notes_with_opportunities += 1
+            if mask:
+                NOTE_OPPORTUNITIES.count(opportunities_count, mask)
+
+        self.total_notes += len(records)
+        _add_counts(
+            self.location_notes, records.locations.names, location_sums, location_counts
+        )
+        _add_counts(
+            self.flexologist_notes,
+            records.flexologists.names,
+            flexologist_sums,
+            flexologist_counts,
+        )
+
+    def summary(self):
+        total_notes = self.total_notes
+        opportunities_count = NOTE_OPPORTUNITIES.counts_by_name(
+            self.opportunities_count
+        )
+        sorted_opportunities = sorted(
+            (
+                (opp, round((opportunities_count[opp] / total_notes) * 100, 2))
+                for opp in self.opportunities
+            ),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+        def by_average(notes):
+            return sorted(
+                ((name, *counts) for name, counts in notes.items()),
+                key=lambda item: _average(item[1], item[2]),
+                reverse=True,
+            )
+
+        return {
+            "note_opportunities": [
+                {"opportunity": opp, "percentage": pct}
+                for opp, pct in sorted_opportunities
+            ],
+            "total_quality_notes": total_notes,
+            "total_quality_notes_percentage": round(
+                self.total_percentage / total_notes
+            ),
+            "total_notes": total_notes,
+            "total_notes_with_opportunities": self.total_notes_with_opportunities,
+            "total_notes_with_opportunities_percentage": round(
+                (self.total_notes_with_opportunities / total_notes) * 100, 2
+            ),
+            "location": [
+                {"location": loc, "percentage": round(_average(total, count), 2)}
+                for loc, total, count in by_average(self.location_notes)
+            ],
+            "flexologist": [
+                {"flexologist": flex, "percentage": round(_average(total, count), 2)}
+                for flex, total, count in by_average(self.flexologist_notes)
+            ],
+        }
+
+
+class OpportunityBreakdownAggregator:
+    """Share of notes flagged with one opportunity, per location and flexologist."""
+
+    def __init__(self, opportunity):
+        self.bit = NOTE_OPPORTUNITIES.bit(opportunity)
+        self.total_notes = 0
+        # [notes, notes with opportunities, notes with this one] by name
+        self.location = {}
+        self.flexologist = {}
+
+    @staticmethod
+    def _results(label, rows):
+        results = []
+        for key, total_count, opportunity_count, particular_count in rows:
+            if not opportunity_count:
+                continue
+            results.append(
+                {
+                    label: key,
+                    "percentage": round(
+                        (particular_count / opportunity_count) * 100, 2
+                    ),
+                    "particular_count": particular_count,
+                    "total_count": total_count,
+                    "percentage_note_quality": (
+                        round((particular_count / total_count) * 100, 2)
+                        if total_count > 0
+                        else 0
+                    ),
+                }
+            )
+        results.sort(key=lambda x: x["percentage"], reverse=True)
+        return results
+
+    def update(self, records):
+        location_counts = [[0, 0, 0] for _ in range(len(records.locations))]
+        flexologist_counts = [[0, 0, 0] for _ in range(len(records.flexologists))]
+
+        for location_id, flexologist_id, mask in zip(
+            records.location_ids, records.flexologist_ids, records.opportunity_masks
+        ):
+            location = location_counts[location_id]
+            flexologist = flexologist_counts[flexologist_id]
+            location[0] += 1
+            flexologist[0] += 1
+            if mask == NO_OPPORTUNITIES:
+                continue
+            location[1] += 1
+            flexologist[1] += 1
+            if mask & self.bit:
+                location[2] += 1
+                flexologist[2] += 1
+
+        self.total_notes += len(records)
+        _add_counts(self.location, records.locations.names, *zip(*location_counts))
+        _add_counts(
+            self.flexologist, records.flexologists.names, *zip(*flexologist_counts)
+        )
+
+    def _flexologist_groups(self):
+        # Flexologists are grouped case-insensitively, except for the total
+        # which belongs to the first spelling seen of each name
+        groups = {}
+        for name, counts in self.flexologist.items():
+            group = groups.get(name.lower())
+            if group is None:
+                groups[name.lower()] = list(counts)
+            else:
+                group[1] += counts[1]
+                group[2] += counts[2]
+        return [(name, *counts) for name, counts in groups.items()]
+
+    def location_results(self):
+        return self._results(
+            "location", [(name, *counts) for name, counts in self.location.items()]
+        )
+
+    def flexologist_results(self):
+        return self._results("flexologist", self._flexologist_groups())
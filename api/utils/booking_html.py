@@ -0,0 +1,154 @@
+from html.parser import HTMLParser
+import re
+import threading
+
+BOOKING_FIELDS = [
+    "client_name",
+    "booking_id",
+    "workout_type",
+    "flexologist_name",
+    "phone",
+    "booking_time",
+]
+# A booking missing any of these is sent to the LLM extractor
+REQUIRED_FIELDS = ["client_name", "booking_id", "booking_time"]
+
+# Elements of the scheduling.clubready.com booking panel holding a field
+# directly, as (attribute, value) -> field
+FIELD_ELEMENTS = {
+    ("id", "client-name"): "client_name",
+    ("id", "selected-phone-button"): "phone",
+    ("class", "booking-title"): "workout_type",
+    ("class", "time-value"): "booking_time",
+}
+# Labels whose next text is the Flexologist, by preference
+FLEXOLOGIST_LABELS = ["instructor", "added by"]
+BOOKING_NUMBER = re.compile(r"Booking\s*#\s*(\d+)")
+
+VOID_ELEMENTS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+}
+
+
+def clean_text(text):
+    return " ".join(text.split())
+
+
+class BookingPanelParser(HTMLParser):
+    """Collects the text of the booking panel's field elements, and every
+    text node in document order for the labelled fields."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.fields = {}
+        self.texts = []
+        # Open elements as (tag, field or None)
+        self._open = []
+
+    def _field(self, attrs):
+        for name, value in attrs:
+            if name == "id" and ("id", value) in FIELD_ELEMENTS:
+                return FIELD_ELEMENTS[("id", value)]
+            if name == "class" and value:
+                for css_class in value.split():
+                    if ("class", css_class) in FIELD_ELEMENTS:
+                        return FIELD_ELEMENTS[("class", css_class)]
+        return None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_ELEMENTS:
+            return
+        field = self._field(attrs)
+        # The first element of a field wins
+        if field in self.fields:
+            field = None
+        elif field:
+            self.fields[field] = ""
+        self._open.append((tag, field))
+
+    def handle_endtag(self, tag):
+        for index in range(len(self._open) - 1, -1, -1):
+            if self._open[index][0] == tag:
+                del self._open[index:]
+                return
+
+    def handle_data(self, data):
+        text = clean_text(data)
+        if not text:
+            return
+        self.texts.append(text)
+        for _, field in self._open:
+            if field:
+                self.fields[field] = clean_text(f"{self.fields[field]} {text}")
+
+
+def labelled_text(texts, label):
+    """The text after `label`, either in the same node or the next one."""
+    for index, text in enumerate(texts):
+        name, _, value = text.partition(":")
+        if name.strip().lower() != label:
+            continue
+        if value.strip():
+            return value.strip()
+        if index + 1 < len(texts):
+            return texts[index + 1]
+    return None
+
+
+def parse_booking_html(html):
+    """The booking fields of a booking panel, "N/A" for the ones not found."""
+    parser = BookingPanelParser()
+    parser.feed(html)
+    parser.close()
+
+    data = {field: parser.fields.get(field) or "N/A" for field in BOOKING_FIELDS}
+    match = BOOKING_NUMBER.search(" ".join(parser.texts))
+    if match:
+        data["booking_id"] = match.group(1)
+    for label in FLEXOLOGIST_LABELS:
+        name = labelled_text(parser.texts, label)
+        if name:
+            data["flexologist_name"] = name
+            break
+    return data
+
+
+def missing_fields(data):
+    return [field for field in REQUIRED_FIELDS if data.get(field) in (None, "N/A")]
+
+
+class ExtractionStats:
+    """How many bookings were parsed, and how many needed the LLM."""
+
+    def __init__(self):
+        self.parsed = 0
+        self.fallback = 0
+        self._lock = threading.Lock()
+
+    def count(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            total = self.parsed + self.fallback
+            return {
+                "parsed": self.parsed,
+                "fallback": self.fallback,
+                "fallback_rate": round(self.fallback / total, 3) if total else 0,
+            }
+
+
+extraction_stats = ExtractionStats()
@@ -0,0 +1,138 @@
+from collections import OrderedDict
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SQLiteCache:
+    """LRU cache of JSON values persisted in an SQLite file.
+
+    The file is shared by the gunicorn workers. Entries expire `ttl` seconds
+    after they are written, and the least recently read ones are evicted
+    beyond `max_entries`. Hits and misses are counted per worker. A broken
+    cache file is logged and treated as a miss, it never fails the caller.
+    """
+
+    def __init__(self, path, ttl, max_entries):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_cache_used_at ON cache (used_at)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        value = None
+        try:
+            conn = self._connection()
+            with conn:
+                row = conn.execute(
+                    "SELECT value FROM cache WHERE key = ? AND created_at > ?",
+                    (key, time.time() - self.ttl),
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE cache SET used_at = ? WHERE key = ?", (time.time(), key)
+                    )
+                    value = json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            logging.error(f"Cache read from {self.path} failed: {str(e)}")
+        self._count(value is not None)
+        return value
+
+    def set(self, key, value):
+        now = time.time()
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, created_at, used_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now),
+                )
+                conn.execute(
+                    "DELETE FROM cache WHERE created_at <= ?", (now - self.ttl,)
+                )
+                conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                    "ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logging.error(f"Cache write to {self.path} failed: {str(e)}")
+
+    def stats(self):
+        try:
+            entries = (
+                self._connection().execute("SELECT count(*) FROM cache").fetchone()[0]
+            )
+        except sqlite3.Error:
+            entries = None
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+                "entries": entries,
+            }
@@ -3,6 +3,23 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Local state files shared by the workers of a host, kept out of the source
+# tree; INSTANCE_DIR or the file's own variable moves them elsewhere
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+INSTANCE_DIR = os.getenv("INSTANCE_DIR", os.path.join(ROOT_DIR, "instance"))
+
+
+def instance_path(env_var, filename):
+    """The path of a state file, `env_var` if set, else `filename` in INSTANCE_DIR."""
+    path = os.getenv(env_var) or os.path.join(INSTANCE_DIR, filename)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return path
+
+
+EMPLOYEE_ROSTER_PATH = instance_path("EMPLOYEE_ROSTER_PATH", "employee_roster.json")
+LLM_CACHE_PATH = instance_path("LLM_CACHE_PATH", "llm_cache.sqlite3")
+OPENAI_GATEWAY_PATH = instance_path("OPENAI_GATEWAY_PATH", "openai_gateway.sqlite3")
+
 
 class Config:
     # This is where i load my env files
@@ -10,3 +27,25 @@ class Config:
     SUPABASE_URL = os.environ.get("SUPABASE_URL")
     SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL")
+
+    # Connection pool of the SQLAlchemy engine, sized per gunicorn worker
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # PostgREST connection pool of the supabase client, per gunicorn worker
+    HTTP_HTTP2 = os.getenv("HTTP_HTTP2", "True").lower() == "true"
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+    HTTP_WRITE_TIMEOUT = float(os.getenv("HTTP_WRITE_TIMEOUT", "30"))
+    # How long a request waits for a free connection when the pool is full
+    HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "10"))
+    # Endpoints served by the direct Postgres repository instead of PostgREST
+    DIRECT_DB_ROUTES = {
+        route.strip()
+        for route in os.getenv("DIRECT_DB_ROUTES", "").split(",")
+        if route.strip()
+    }
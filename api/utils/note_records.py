@@ -0,0 +1,149 @@
+from array import array
+from .opportunities import NOTE_OPPORTUNITIES
+
+# Sentinels stored in place of "N/A" scores and notes without opportunities
+NO_SCORE = -1
+NO_OPPORTUNITIES = -1
+# Notes loaded into one NoteRecords batch, one PostgREST page
+BATCH_SIZE = 1000
+
+
+class Interner:
+    """Assigns a small integer id to every distinct name, in order of appearance."""
+
+    __slots__ = ("ids", "names")
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name):
+        key = self.ids.get(name)
+        if key is None:
+            key = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return key
+
+    def group(self, key=None):
+        """Map every id to the id of its group under `key` (e.g. str.lower).
+
+        Returns `(group_of, group_names)`; group ids follow the order in which
+        each group was first seen.
+        """
+        if key is None:
+            return list(range(len(self.names))), list(self.names)
+
+        groups = {}
+        group_of = [groups.setdefault(key(name), len(groups)) for name in self.names]
+        return group_of, list(groups)
+
+
+class NoteRecords:
+    """Column store of RPA note records for the analytics aggregators.
+
+    Instead of one PostgREST dict per note, each column lives in a typed
+    array: location and flexologist names are interned to ids, note scores
+    are int8 with `NO_SCORE` for "N/A", first timer is a byte and the
+    opportunity list is reduced to its `NOTE_OPPORTUNITIES` bitmask, with
+    `NO_OPPORTUNITIES` for notes that have none. Columns that were not
+    selected are stored as their empty value.
+    """
+
+    __slots__ = (
+        "locations",
+        "flexologists",
+        "location_ids",
+        "flexologist_ids",
+        "scores",
+        "first_timers",
+        "opportunity_masks",
+    )
+
+    def __init__(self):
+        self.locations = Interner()
+        self.flexologists = Interner()
+        self.location_ids = array("I")
+        self.flexologist_ids = array("I")
+        self.scores = array("b")
+        self.first_timers = bytearray()
+        self.opportunity_masks = array("l")
+
+    @classmethod
+    def from_rows(cls, rows):
+        records = cls()
+        records.extend(rows)
+        return records
+
+    @classmethod
+    def batches(cls, rows, batch_size=BATCH_SIZE):
+        """Yield the rows as stores of up to `batch_size` notes each, so only
+        one batch is held in memory at a time."""
+        records = cls()
+        for row in rows:
+            records.append(row)
+            if len(records) >= batch_size:
+                yield records
+                records = cls()
+        if len(records):
+            yield records
+
+    def __len__(self):
+        return len(self.location_ids)
+
+    def append(self, note):
+        self.location_ids.append(self.locations.intern(note.get("location")))
+        self.flexologist_ids.append(
+            self.flexologists.intern(note.get("flexologist_name"))
+        )
+
+        note_score = note.get("note_score")
+        self.scores.append(NO_SCORE if note_score in (None, "N/A") else int(note_score))
+        self.first_timers.append(note.get("first_timer") == "YES")
+
+        note_opps = note.get("note_oppurtunities")
+        if not note_opps or note_opps in ["N/A", "[]", "", []]:
+            self.opportunity_masks.append(NO_OPPORTUNITIES)
+        else:
+            # Unparsable lists still count as notes with opportunities
+            self.opportunity_masks.append(NOTE_OPPORTUNITIES.mask(note_opps) or 0)
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def quality_percentages(self, first_visit_max):
+        """Yield each note's score as a percentage of its visit's max score."""
+        for score, first_timer in zip(self.scores, self.first_timers):
+            if score == NO_SCORE:
+                yield 0
+            else:
+                yield (score * 100) / (first_visit_max if first_timer else 4)
+
+    def group_totals(self, column, values=None, key=None):
+        """Sum `values` (one per note, 1 by default) per location or flexologist.
+
+        `column` is "location" or "flexologist_name"; names are grouped by
+        `key` when given. Returns `{name: [total, count]}` in order of first
+        appearance.
+        """
+        if column == "location":
+            interner, ids = self.locations, self.location_ids
+        else:
+            interner, ids = self.flexologists, self.flexologist_ids
+
+        group_of, group_names = interner.group(key)
+        totals = [[0, 0] for _ in group_names]
+        if values is None:
+            for note_id in ids:
+                totals[group_of[note_id]][1] += 1
+            for group in totals:
+                group[0] = group[1]
+        else:
+            for note_id, value in zip(ids, values):
+                group = totals[group_of[note_id]]
+                group[0] += value
+                group[1] += 1
+        return dict(zip(group_names, totals))
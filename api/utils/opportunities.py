@@ -0,0 +1,121 @@
+from functools import lru_cache
+import json
+
+# Opportunity mapping for backward compatibility
+OPPORTUNITY_MAPPING = {
+    "Session Note: Problem Presented": "Problem Presented",
+    "Session Note: What was worked On": "Current Session Activity",
+    "Session Note: Tension Level & Frequency": "Current Session Activity",
+    "Session Note: Prescribed Action": "Next Session Focus",
+    "Session Note: Homework": "Homework",
+}
+
+SUBSEQUENT_VISIT_OPPORTUNITIES = [
+    "Problem Presented",
+    "Current Session Activity",
+    "Next Session Focus",
+    "Homework",
+]
+
+FIRST_VISIT_OPPORTUNITIES = [
+    "Confirmation Call",
+    "Grip Sock Notice",
+    "Arrive Early",
+    "Location",
+    "Prepaid",
+    "Keynote",
+    "Stated Goal",
+    "Emotional Why",
+    "Prior Solutions",
+    "Routine Captured",
+    "Physical/Medical Issue",
+    "Plan Recommendation",
+] + SUBSEQUENT_VISIT_OPPORTUNITIES
+
+# Opportunity names used by the notes scored before the current rubric
+LEGACY_OPPORTUNITIES = [
+    "Needs Analysis: Deep Emotional Reason(Why)",
+    "Needs Analysis: Physiscal Need",
+    "Session Note: Problem Presented",
+    "Session Note: What was worked On",
+    "Session Note: Tension Level & Frequency",
+    "Session Note: Prescribed Action",
+    "Session Note: Homework",
+    "Quality: No Future Bookings",
+    "Quality: Missing Homework",
+    "Quality: Missing Waiver",
+    "Quality: Other",
+]
+
+PARSE_CACHE_SIZE = 4096
+
+
+class OpportunityTaxonomy:
+    """Maps note opportunity lists to integer bitmasks.
+
+    Every opportunity gets one bit and every accepted spelling (canonical
+    name or legacy alias, compared lowercased) resolves to that bit, so a
+    note's opportunities can be counted with integer operations. Masks are
+    cached per raw `note_oppurtunities` string since the same lists repeat
+    across many notes.
+    """
+
+    def __init__(self, opportunities, aliases=None):
+        self.opportunities = list(opportunities)
+        self.bits = {opp: 1 << index for index, opp in enumerate(self.opportunities)}
+        self.lookup = {opp.lower(): bit for opp, bit in self.bits.items()}
+        for old, new in (aliases or {}).items():
+            if new in self.bits:
+                self.lookup[old.lower()] = (
+                    self.lookup.get(old.lower(), 0) | self.bits[new]
+                )
+        self._parse = lru_cache(maxsize=PARSE_CACHE_SIZE)(self._parse_mask)
+
+    def bit(self, name):
+        """Return the bit for an opportunity name or alias, 0 if unknown."""
+        return self.lookup.get(name.lower(), 0) if name else 0
+
+    def mask_of(self, names):
+        mask = 0
+        for name in names:
+            if isinstance(name, str):
+                mask |= self.lookup.get(name.lower(), 0)
+        return mask
+
+    def _parse_mask(self, note_opps):
+        try:
+            names = json.loads(note_opps)
+        except (json.JSONDecodeError, TypeError):
+            return None
+        if not isinstance(names, list):
+            return None
+        return self.mask_of(names)
+
+    def mask(self, note_opps):
+        """Return the bitmask of a `note_oppurtunities` value, None if unparsable."""
+        if isinstance(note_opps, list):
+            return self.mask_of(note_opps)
+        if not isinstance(note_opps, str):
+            return None
+        return self._parse(note_opps)
+
+    def names(self, mask):
+        return [opp for opp, bit in self.bits.items() if mask & bit]
+
+    def counter(self):
+        return [0] * len(self.opportunities)
+
+    @staticmethod
+    def count(counts, mask):
+        """Add one to `counts[i]` for every bit `i` set in `mask`."""
+        while mask:
+            lowest = mask & -mask
+            counts[lowest.bit_length() - 1] += 1
+            mask ^= lowest
+
+    def counts_by_name(self, counts):
+        return dict(zip(self.opportunities, counts))
+
+
+NOTE_OPPORTUNITIES = OpportunityTaxonomy(FIRST_VISIT_OPPORTUNITIES, OPPORTUNITY_MAPPING)
+LEGACY_NOTE_OPPORTUNITIES = OpportunityTaxonomy(LEGACY_OPPORTUNITIES)
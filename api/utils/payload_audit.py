@@ -0,0 +1,41 @@
+from flask import has_request_context, request
+from urllib.parse import unquote
+import logging
+import os
+from ..database.columns import WIDE_TABLES
+
+PAYLOAD_AUDIT = os.getenv("PAYLOAD_AUDIT", "False").lower() == "true"
+
+
+def log_payload(response):
+    """httpx response hook logging the size of every PostgREST read."""
+    req = response.request
+    if req.method != "GET":
+        return
+
+    response.read()
+    table = req.url.path.rstrip("/").rsplit("/", 1)[-1]
+    select = unquote(req.url.params.get("select", "*"))
+    endpoint = request.endpoint if has_request_context() else None
+
+    logging.info(
+        f"PostgREST {table} select={select} {len(response.content)} bytes "
+        f"(endpoint {endpoint})"
+    )
+    columns = [column.strip() for column in select.split(",")]
+    if table in WIDE_TABLES and "*" in columns:
+        logging.warning(
+            f"Wide select on {table} from {endpoint}, use a set from "
+            "api/database/columns.py"
+        )
+
+
+def init_payload_audit(app):
+    """Log PostgREST payload sizes in debug mode or when PAYLOAD_AUDIT is set."""
+    if not (app.debug or PAYLOAD_AUDIT):
+        return
+
+    session = app.config["SUPABASE"].postgrest.session
+    hooks = session.event_hooks
+    hooks["response"] = [*hooks["response"], log_payload]
+    session.event_hooks = hooks
@@ -0,0 +1,93 @@
+from flask import current_app, g, request
+import os
+from .cache import TTLCache
+from .utils import decode_jwt_token
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+
+# The user, their admin's business flags and RPA config in one request
+PRINCIPAL_COLUMNS = (
+    "id, full_name, email, role_id, status, admin_id, "
+    "admin:users!admin_id("
+    "businesses(id, username, note_taking_active, robot_process_automation_active), "
+    "robot_process_automation_config(id)"
+    ")"
+)
+
+
+_principals = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+
+
+def _first(rows):
+    if isinstance(rows, list):
+        return rows[0] if rows else None
+    return rows
+
+
+def fetch_principal(supabase, user_id):
+    result = (
+        supabase.table("users")
+        .select(PRINCIPAL_COLUMNS)
+        .eq("id", user_id)
+        .limit(1)
+        .execute()
+    )
+    if not result.data:
+        return None
+
+    user = result.data[0]
+    admin = user.pop("admin", None) or {}
+    config = _first(admin.get("robot_process_automation_config"))
+    user["business"] = _first(admin.get("businesses"))
+    user["rpa_config_id"] = config["id"] if config else None
+    return user
+
+
+def load_token():
+    """Decode the bearer token once per request and keep the claims in `g`."""
+    g.token = None
+    g.token_data = None
+
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return
+
+    token = auth_header.split(" ")[1]
+    if token:
+        g.token_data = decode_jwt_token(token)
+        g.token = token
+
+
+def current_principal():
+    """Return the authenticated user, or None if the token is missing or invalid.
+
+    The principal is the user's id, name, email, role_id, status and
+    admin_id plus their admin's `business` and `rpa_config_id`. It is
+    fetched on first use and cached in `g` and for a few seconds across
+    requests.
+    """
+    if "principal" in g:
+        return g.principal
+
+    principal = None
+    token_data = g.get("token_data")
+    if token_data:
+        user_id = token_data["user_id"]
+        principal = _principals.get(user_id)
+        if principal is None:
+            principal = fetch_principal(current_app.config["SUPABASE"], user_id)
+            if principal is not None:
+                _principals.set(user_id, principal)
+
+    g.principal = principal
+    return principal
+
+
+def invalidate_principal(*user_ids):
+    for user_id in user_ids:
+        _principals.pop(user_id)
+
+
+def init_principal(app):
+    app.before_request(load_token)
@@ -0,0 +1,129 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+PAGE_SIZE = 1000
+QUERY_WORKERS = int(os.getenv("SUPABASE_QUERY_WORKERS", "4"))
+
+
+def run_queries(queries, max_workers=QUERY_WORKERS):
+    """Run independent queries concurrently and return their results by name.
+
+    `queries` maps a name to a zero-argument callable. The first exception
+    raised by any of them is re-raised once every query has finished.
+    """
+    if not queries:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(queries))) as executor:
+        futures = {name: executor.submit(query) for name, query in queries.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def iter_pages(
+    supabase,
+    table,
+    columns,
+    apply_filters=None,
+    page_size=PAGE_SIZE,
+    max_workers=QUERY_WORKERS,
+    keyset=None,
+    order="id",
+):
+    """Yield the pages of a PostgREST read in order.
+
+    By default the first page is requested together with an exact count and
+    the remaining ranges are fetched concurrently, keeping at most
+    `max_workers` pages in flight. Pass `keyset="id"` to walk the table by
+    that column instead, which gives a stable ordering at the cost of
+    fetching the pages one after another.
+
+    The offset ranges are separate requests, so they are ordered on the
+    unique `order` column; without an order Postgres may return a row in
+    two ranges and skip another.
+
+    `apply_filters` receives a fresh select builder and returns it with the
+    filters applied; builders are never shared between threads.
+    """
+
+    def build_query(count=None):
+        query = supabase.table(table).select(columns, count=count)
+        return apply_filters(query) if apply_filters else query
+
+    def ranged_query(offset, size, count=None):
+        query = build_query(count)
+        if order:
+            query = query.order(order)
+        return query.range(offset, offset + size - 1)
+
+    if keyset:
+        if keyset not in [column.strip() for column in columns.split(",")]:
+            columns = f"{columns}, {keyset}"
+
+        last_key = None
+        while True:
+            query = build_query().order(keyset)
+            if last_key is not None:
+                query = query.gt(keyset, last_key)
+            data = query.limit(page_size).execute().data or []
+            if data:
+                yield data
+            if len(data) < page_size:
+                return
+            last_key = data[-1][keyset]
+
+    first_page = ranged_query(0, page_size, "exact").execute()
+    data = first_page.data or []
+    total = first_page.count
+    fetched = len(data)
+    if data:
+        yield data
+
+    if total is None:
+        # No count returned, fall back to walking the pages one by one
+        while len(data) == page_size:
+            data = ranged_query(fetched, page_size).execute().data or []
+            fetched += len(data)
+            if data:
+                yield data
+        return
+
+    if total <= fetched:
+        return
+
+    # PostgREST may cap a page below the requested size (db max-rows)
+    step = fetched if 0 < fetched < page_size else page_size
+
+    def fetch_page(offset):
+        return ranged_query(offset, step).execute().data or []
+
+    offsets = iter(range(fetched, total, step))
+    workers = max(1, min(max_workers, -(-(total - fetched) // step)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for offset in offsets:
+            pending.append(executor.submit(fetch_page, offset))
+            if len(pending) >= workers:
+                break
+
+        while pending:
+            page = pending.popleft().result()
+            offset = next(offsets, None)
+            if offset is not None:
+                pending.append(executor.submit(fetch_page, offset))
+            if page:
+                yield page
+
+
+def iter_rows(supabase, table, columns, apply_filters=None, **options):
+    """Stream the rows of a PostgREST read, see `iter_pages` for the options."""
+    for page in iter_pages(supabase, table, columns, apply_filters, **options):
+        yield from page
+
+
+def fetch_all_rows(supabase, table, columns, apply_filters=None, **options):
+    """Fetch every row matching a query, see `iter_pages` for the options."""
+    rows = []
+    for page in iter_pages(supabase, table, columns, apply_filters, **options):
+        rows.extend(page)
+    return rows
@@ -0,0 +1,88 @@
+import httpx
+import logging
+import threading
+
+# Every pooled request is counted, and logged every this many
+STATS_LOG_INTERVAL = 1000
+
+
+class TransportStats:
+    """Counts requests against the connections and TLS handshakes they cost.
+
+    Fed by the httpcore trace extension, so a request that reuses a pooled
+    connection never reaches the connect events.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self._lock = threading.Lock()
+
+    def trace(self, event_name, info):
+        with self._lock:
+            if event_name == "connection.connect_tcp.complete":
+                self.connections += 1
+            elif event_name == "connection.start_tls.complete":
+                self.tls_handshakes += 1
+
+    def count_request(self, request):
+        request.extensions["trace"] = self.trace
+        with self._lock:
+            self.requests += 1
+            log = self.requests % STATS_LOG_INTERVAL == 0
+        if log:
+            logging.info(f"PostgREST transport {self.snapshot()}")
+
+    def snapshot(self):
+        with self._lock:
+            reused = max(self.requests - self.connections, 0)
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "tls_handshakes": self.tls_handshakes,
+                "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0,
+            }
+
+
+transport_stats = TransportStats()
+
+
+def build_session(base_url, headers, config, stats=transport_stats):
+    """A pooled HTTP/2 client for PostgREST, sized by the app config.
+
+    httpx clients are safe to share between threads, so the request
+    handlers and the background jobs of a worker all draw from this pool.
+    """
+    return httpx.Client(
+        base_url=base_url,
+        headers=headers,
+        http2=config["HTTP_HTTP2"],
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=config["HTTP_MAX_CONNECTIONS"],
+            max_keepalive_connections=config["HTTP_MAX_KEEPALIVE"],
+            keepalive_expiry=config["HTTP_KEEPALIVE_EXPIRY"],
+        ),
+        timeout=httpx.Timeout(
+            connect=config["HTTP_CONNECT_TIMEOUT"],
+            read=config["HTTP_READ_TIMEOUT"],
+            write=config["HTTP_WRITE_TIMEOUT"],
+            pool=config["HTTP_POOL_TIMEOUT"],
+        ),
+        event_hooks={"request": [stats.count_request], "response": []},
+    )
+
+
+def init_transport(app):
+    """Swap the PostgREST session of the supabase client for the pooled one.
+
+    Runs before any blueprint or background thread takes the client, and
+    before init_payload_audit adds its hook to the session.
+    """
+    postgrest = app.config["SUPABASE"].postgrest
+    session = postgrest.session
+    postgrest.session = build_session(
+        str(session.base_url), session.headers, app.config
+    )
+    session.close()
@@ -20,6 +20,7 @@ from ..database.database import (
 import base64
 from ..ai.aianalysis import extract_booking_data_from_html
 import jwt
+from flask import g, has_request_context
 import logging
 import time
 from io import BytesIO
@@ -3330,6 +3331,9 @@ def generate_verification_code(length=6):
 
 
 def decode_jwt_token(token):
+    # Reuse the claims already decoded for this request by the principal loader
+    if has_request_context() and token and g.get("token") == token:
+        return g.token_data
     try:
         return jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
     except jwt.ExpiredSignatureError:
@@ -0,0 +1,45 @@
+from alembic import context
+from dotenv import load_dotenv
+from logging.config import fileConfig
+from sqlalchemy import create_engine, pool
+import os
+
+load_dotenv()
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# The tables are owned by Supabase, these migrations only add what the
+# application needs on top of them (indexes), so there is no autogenerate
+# metadata to compare against.
+target_metadata = None
+
+
+def get_url():
+    return config.get_main_option("sqlalchemy.url") or os.environ.get("DATABASE_URL")
+
+
+def run_migrations_offline():
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    engine = create_engine(get_url(), poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
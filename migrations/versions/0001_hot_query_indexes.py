@@ -0,0 +1,122 @@
+"""Indexes for the hot query patterns
+
+Revision ID: 0001_hot_query_indexes
+Revises:
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_hot_query_indexes"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+NOT_NO_SHOW = sa.text("status <> 'No Show'")
+
+# (name, table, columns, options) for every index, in creation order. The
+# comment above each one names the queries it serves.
+INDEXES = [
+    # Booking lookups by user, day and ClubReady account in get_bookings
+    (
+        "ix_clubready_bookings_user_created_account",
+        "clubready_bookings",
+        ["user_id", "created_at", "account_id"],
+        {},
+    ),
+    # Note submission updates and client visit lookups, and the submitted
+    # client history on its leading column
+    (
+        "ix_clubready_bookings_client_period_created",
+        "clubready_bookings",
+        ["client_name", "period", "created_at"],
+        {},
+    ),
+    # Account to location map on the admin users list, index only
+    (
+        "ix_clubready_bookings_account_id",
+        "clubready_bookings",
+        ["account_id"],
+        {"postgresql_include": ["location"]},
+    ),
+    # Flexologist visit history
+    (
+        "ix_clubready_bookings_flexologist_uid",
+        "clubready_bookings",
+        ["flexologist_uid"],
+        {},
+    ),
+    # RPA history and the analytics date range of a config
+    (
+        "ix_rpa_notes_config_appointment",
+        "robot_process_automation_notes_records",
+        ["config_id", "appointment_date"],
+        {"postgresql_include": ["status", "first_timer"]},
+    ),
+    # Location drill downs, which always leave out the no shows
+    (
+        "ix_rpa_notes_config_location_appointment",
+        "robot_process_automation_notes_records",
+        ["config_id", "location", "appointment_date"],
+        {"postgresql_where": NOT_NO_SHOW},
+    ),
+    # Flexologist drill downs and the flexologist AI insights
+    (
+        "ix_rpa_notes_flexologist_appointment",
+        "robot_process_automation_notes_records",
+        ["flexologist_name", "appointment_date"],
+        {"postgresql_include": ["config_id", "first_timer", "status"]},
+    ),
+    # Dashboard monthly counts
+    (
+        "ix_rpa_notes_config_created",
+        "robot_process_automation_notes_records",
+        ["config_id", "created_at"],
+        {},
+    ),
+    # RPA unlogged bookings history
+    (
+        "ix_rpa_unlogged_config_appointment",
+        "robot_process_automation_unlogged_booking_records",
+        ["config_id", "appointment_date"],
+        {},
+    ),
+    # Notes of a booking, and its user notes for the AI questions
+    (
+        "ix_booking_notes_booking_type",
+        "booking_notes",
+        ["booking_id", "type"],
+        {},
+    ),
+    # Notification list of a user
+    (
+        "ix_notifications_user_id",
+        "notifications",
+        ["user_id"],
+        {},
+    ),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY keeps the tables writable while the indexes
+    # build, and cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                **options,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table, if_exists=True, postgresql_concurrently=True
+            )
@@ -0,0 +1,51 @@
+"""Account to location lookup for the ClubReady accounts
+
+Revision ID: 0002_clubready_accounts
+Revises: 0001_hot_query_indexes
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_clubready_accounts"
+down_revision = "0001_hot_query_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "clubready_accounts",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("account_id", sa.String(64), nullable=False),
+        sa.Column("location", sa.String(64), nullable=True),
+        sa.Column("full_name", sa.String(64), nullable=True),
+        sa.Column(
+            "last_seen", sa.DateTime, nullable=True, server_default=sa.func.now()
+        ),
+        # Keyed per user, since users can share a ClubReady account. The
+        # key also serves the lookups of a user's accounts.
+        sa.PrimaryKeyConstraint("user_id", "account_id"),
+    )
+
+    # Seed every account of a user from its latest booking, after that the
+    # booking sync and the ClubReady logins keep the table current
+    op.execute(
+        """
+        INSERT INTO clubready_accounts (
+            account_id, user_id, location, full_name, last_seen
+        )
+        SELECT DISTINCT ON (user_id, account_id)
+            account_id, user_id, lower(location), lower(flexologist_name),
+            created_at
+        FROM clubready_bookings
+        WHERE account_id IS NOT NULL AND user_id IS NOT NULL
+        ORDER BY user_id, account_id, created_at DESC, id DESC
+        ON CONFLICT (user_id, account_id) DO NOTHING
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("clubready_accounts")
@@ -0,0 +1,117 @@
+"""Move other_clubready_accounts into clubready_accounts
+
+Revision ID: 0003_clubready_account_credentials
+Revises: 0002_clubready_accounts
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_clubready_account_credentials"
+down_revision = "0002_clubready_accounts"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column("username", sa.String(64), nullable=True),
+    # Hashed like users.clubready_password, see reverse_hash_credentials
+    sa.Column("password", sa.String(120), nullable=True),
+    sa.Column("location_id", sa.String(64), nullable=True),
+    sa.Column("clubready_user_id", sa.String(64), nullable=True),
+    sa.Column("is_primary", sa.Boolean, nullable=False, server_default=sa.false()),
+    sa.Column("is_active", sa.Boolean, nullable=False, server_default=sa.false()),
+]
+
+# other_clubready_accounts as a jsonb array, empty for NULL, '' and 'null'
+ACCOUNTS_JSON = """
+    CASE
+        WHEN jsonb_typeof(NULLIF(u.other_clubready_accounts, '')::jsonb) = 'array'
+        THEN u.other_clubready_accounts::jsonb
+        ELSE '[]'::jsonb
+    END
+"""
+
+
+def upgrade():
+    for column in COLUMNS:
+        op.add_column("clubready_accounts", column)
+
+    # One primary account per user, and the active account lookup
+    op.create_index(
+        "ix_clubready_accounts_user_primary",
+        "clubready_accounts",
+        ["user_id"],
+        unique=True,
+        postgresql_where=sa.text("is_primary"),
+    )
+    op.create_index(
+        "ix_clubready_accounts_user_active",
+        "clubready_accounts",
+        ["user_id"],
+        postgresql_where=sa.text("is_active"),
+    )
+
+    # The account of the user's own ClubReady login, keyed by its ClubReady
+    # user id like the bookings' account_id. It is the active one unless
+    # another account was switched to.
+    op.execute(
+        f"""
+        INSERT INTO clubready_accounts (
+            account_id, user_id, username, password, location_id,
+            clubready_user_id, full_name, is_primary, is_active
+        )
+        SELECT
+            u.clubready_user_id, u.id, u.clubready_username, u.clubready_password,
+            u.clubready_location_id, u.clubready_user_id, u.full_name, true,
+            NOT EXISTS (
+                SELECT 1
+                FROM jsonb_array_elements({ACCOUNTS_JSON}) AS account
+                WHERE (account ->> 'active')::boolean
+            )
+        FROM users AS u
+        WHERE u.clubready_user_id IS NOT NULL
+        ON CONFLICT (user_id, account_id) DO UPDATE SET
+            username = EXCLUDED.username,
+            password = EXCLUDED.password,
+            location_id = EXCLUDED.location_id,
+            clubready_user_id = EXCLUDED.clubready_user_id,
+            full_name = EXCLUDED.full_name,
+            is_primary = EXCLUDED.is_primary,
+            is_active = EXCLUDED.is_active
+        """
+    )
+    # The other accounts, keyed by the id they have in the JSON
+    op.execute(
+        f"""
+        INSERT INTO clubready_accounts (
+            account_id, user_id, username, password, location_id,
+            clubready_user_id, full_name, is_primary, is_active
+        )
+        SELECT
+            account ->> 'id', u.id, account ->> 'username', account ->> 'password',
+            account ->> 'location_id', account ->> 'user_id',
+            account ->> 'full_name', false,
+            COALESCE((account ->> 'active')::boolean, false)
+        FROM users AS u,
+            jsonb_array_elements({ACCOUNTS_JSON}) AS account
+        WHERE account ->> 'id' IS NOT NULL
+        ON CONFLICT (user_id, account_id) DO UPDATE SET
+            username = EXCLUDED.username,
+            password = EXCLUDED.password,
+            location_id = EXCLUDED.location_id,
+            clubready_user_id = EXCLUDED.clubready_user_id,
+            full_name = EXCLUDED.full_name,
+            is_primary = EXCLUDED.is_primary,
+            is_active = EXCLUDED.is_active
+        """
+    )
+
+
+def downgrade():
+    op.drop_index("ix_clubready_accounts_user_active", table_name="clubready_accounts")
+    op.drop_index(
+        "ix_clubready_accounts_user_primary", table_name="clubready_accounts"
+    )
+    for column in reversed(COLUMNS):
+        op.drop_column("clubready_accounts", column.name)
@@ -0,0 +1,50 @@
+"""Task status of the assistant notes written in the background
+
+Revision ID: 0004_booking_note_tasks
+Revises: 0003_clubready_account_credentials
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_booking_note_tasks"
+down_revision = "0003_clubready_account_credentials"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("booking_notes", sa.Column("task_id", sa.String(64), nullable=True))
+    op.add_column(
+        "booking_notes", sa.Column("task_status", sa.String(64), nullable=True)
+    )
+    # In UTC, unlike created_at which is in the client's timezone, so a job
+    # whose worker died can be expired
+    op.add_column(
+        "booking_notes",
+        sa.Column("task_started_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    # Status lookups of /get_questions jobs, only their rows have a task_id
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_booking_notes_task_id",
+            "booking_notes",
+            ["task_id"],
+            if_not_exists=True,
+            postgresql_concurrently=True,
+            postgresql_where=sa.text("task_id IS NOT NULL"),
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_booking_notes_task_id",
+            table_name="booking_notes",
+            if_exists=True,
+            postgresql_concurrently=True,
+        )
+    op.drop_column("booking_notes", "task_started_at")
+    op.drop_column("booking_notes", "task_status")
+    op.drop_column("booking_notes", "task_id")
@@ -0,0 +1,115 @@
+"""Compare the pooled PostgREST transport with a connection per request.
+
+Runs against a local stub of PostgREST, never the Supabase API:
+
+    python -m scripts.benchmark_postgrest --requests 2000 --threads 8
+
+The stub answers every GET with a small JSON list after `--latency` ms.
+Both clients send the same requests from `--threads` threads, like the
+request handlers and background jobs of a worker, and the script prints
+the latency percentiles and how many connections each one opened. The
+stub speaks plain HTTP/1.1, so this measures the keep-alive pooling only;
+HTTP/2 is negotiated over TLS against Supabase.
+"""
+
+from api.utils.config import Config
+from api.utils.transport import TransportStats, build_session
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import httpx
+import json
+import statistics
+import sys
+import threading
+import time
+
+BODY = json.dumps([{"id": i, "client_name": f"client {i}"} for i in range(20)])
+
+
+class StubPostgREST(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        body = BODY.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(latency):
+    StubPostgREST.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPostgREST)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/rest/v1"
+
+
+def config():
+    return {
+        name: getattr(Config, name) for name in dir(Config) if name.startswith("HTTP_")
+    }
+
+
+def run(send, requests, threads):
+    def timed(i):
+        started = time.perf_counter()
+        send(i)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(threads) as pool:
+        return sorted(pool.map(timed, range(requests)))
+
+
+def report(name, timings, stats):
+    ms = [timing * 1000 for timing in timings]
+    p95 = ms[int(len(ms) * 0.95) - 1]
+    snapshot = stats.snapshot()
+    print(
+        f"{name:<8} p50 {statistics.median(ms):7.2f} ms  p95 {p95:7.2f} ms  "
+        f"{snapshot['connections']} connections for {snapshot['requests']} requests"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=2, help="stub latency, ms")
+    args = parser.parse_args()
+
+    server, base_url = start_stub(args.latency / 1000)
+    params = {"select": "id,client_name", "user_id": "eq.7"}
+
+    # What every call paid without keep-alive: a new connection each time
+    fresh_stats = TransportStats()
+
+    def fresh(i):
+        with httpx.Client(
+            base_url=base_url,
+            event_hooks={"request": [fresh_stats.count_request], "response": []},
+        ) as client:
+            client.get("/clubready_bookings", params=params).raise_for_status()
+
+    pooled_stats = TransportStats()
+    session = build_session(base_url, {}, config(), stats=pooled_stats)
+
+    def pooled(i):
+        session.get("/clubready_bookings", params=params).raise_for_status()
+
+    report("fresh", run(fresh, args.requests, args.threads), fresh_stats)
+    report("pooled", run(pooled, args.requests, args.threads), pooled_stats)
+
+    session.close()
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+"""Score the RPA notes records that have no note score yet.
+
+    python -m scripts.score_rpa_notes --mode batch --wait
+    python -m scripts.score_rpa_notes --mode concurrent --limit 500
+
+Records are scored on the notes submitted for their booking through
+StretchNote, and on the key note for first visits. Records without
+submitted notes are left alone. `--mode batch` sends them as OpenAI Batch
+API jobs, half the price and within 24 hours. `--mode concurrent` sends
+them through the rate limited gateway, for small runs.
+
+Progress is kept per record in a local SQLite file, so a run that crashed
+or was stopped picks up where it left off when started again: open batches
+are polled instead of resubmitted, and scored records that were not
+written yet are written. The scores are written back in bulk updates.
+"""
+
+from api.ai.gateway import client, gateway
+from api.ai.scoring import scoring_request, scoring_result
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy import create_engine, text
+import argparse
+import io
+import json
+import os
+import sqlite3
+import sys
+import time
+
+DEFAULT_PROGRESS_PATH = "rpa_scoring.sqlite3"
+# OpenAI accepts up to 50000 requests per batch
+BATCH_SIZE = 5000
+WRITE_CHUNK = 500
+POLL_INTERVAL = 60
+
+SELECT_RECORDS = """
+    WITH submitted AS (
+        SELECT DISTINCT ON (booking_id) booking_id, submitted_notes
+        FROM clubready_bookings
+        WHERE submitted_notes IS NOT NULL AND submitted_notes <> ''
+        ORDER BY booking_id, created_at DESC
+    )
+    SELECT r.id, r.first_timer, r.key_note, s.submitted_notes AS notes
+    FROM robot_process_automation_notes_records AS r
+    JOIN submitted AS s ON s.booking_id = r.booking_id
+    WHERE r.status <> 'No Show'
+        AND (:rescore OR r.note_score IS NULL OR r.note_score = 'N/A')
+        AND (CAST(:config_id AS integer) IS NULL OR r.config_id = :config_id)
+        AND r.id > :after
+    ORDER BY r.id
+    LIMIT :limit
+"""
+
+WRITE_SCORES = """
+    UPDATE robot_process_automation_notes_records AS r
+    SET note_score = v.note_score,
+        note_oppurtunities = v.note_oppurtunities,
+        note_summary = v.note_summary
+    FROM (
+        SELECT unnest(CAST(:ids AS integer[])) AS id,
+            unnest(CAST(:scores AS text[])) AS note_score,
+            unnest(CAST(:opportunities AS text[])) AS note_oppurtunities,
+            unnest(CAST(:summaries AS text[])) AS note_summary
+    ) AS v
+    WHERE r.id = v.id
+"""
+
+
+class ScoringProgress:
+    """Per record state of the backfill: pending, submitted, scored, written
+    or failed, with the batch a record was sent in and its result."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS records (
+                id INTEGER PRIMARY KEY, first_timer TEXT, request TEXT NOT NULL,
+                status TEXT NOT NULL, batch_id TEXT, result TEXT, error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS ix_records_status ON records (status);
+            CREATE TABLE IF NOT EXISTS batches (
+                batch_id TEXT PRIMARY KEY, status TEXT NOT NULL
+            );
+            """
+        )
+
+    def last_id(self):
+        return self.conn.execute("SELECT max(id) FROM records").fetchone()[0] or 0
+
+    def add(self, records):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO records (id, first_timer, request, status) "
+                "VALUES (?, ?, ?, 'pending')",
+                [
+                    (
+                        record["id"],
+                        record["first_timer"],
+                        json.dumps(scoring_request(record)),
+                    )
+                    for record in records
+                ],
+            )
+
+    def records(self, status, limit=None):
+        query = "SELECT id, first_timer, request FROM records WHERE status = ?"
+        query += " ORDER BY id" + (f" LIMIT {int(limit)}" if limit else "")
+        return self.conn.execute(query, (status,)).fetchall()
+
+    def set_status(self, ids, status, batch_id=None):
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE records SET status = ?, batch_id = ? WHERE id = ?",
+                [(status, batch_id, record_id) for record_id in ids],
+            )
+
+    def set_result(self, record_id, result=None, error=None):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE records SET status = ?, result = ?, error = ? WHERE id = ?",
+                (
+                    "failed" if error else "scored",
+                    json.dumps(result) if result else None,
+                    error,
+                    record_id,
+                ),
+            )
+
+    def scored(self):
+        return [
+            (record_id, json.loads(result))
+            for record_id, result in self.conn.execute(
+                "SELECT id, result FROM records WHERE status = 'scored' ORDER BY id"
+            )
+        ]
+
+    def open_batches(self):
+        return [
+            row[0]
+            for row in self.conn.execute(
+                "SELECT batch_id FROM batches WHERE status = 'open'"
+            )
+        ]
+
+    def set_batch(self, batch_id, status):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO batches (batch_id, status) VALUES (?, ?)",
+                (batch_id, status),
+            )
+
+    def counts(self):
+        return dict(
+            self.conn.execute("SELECT status, count(*) FROM records GROUP BY status")
+        )
+
+
+def select_records(engine, progress, args):
+    """Queue the records needing a score after the last one already queued."""
+    with engine.connect() as conn:
+        records = (
+            conn.execute(
+                text(SELECT_RECORDS),
+                {
+                    "rescore": args.rescore,
+                    "config_id": args.config_id,
+                    "after": progress.last_id(),
+                    "limit": args.limit,
+                },
+            )
+            .mappings()
+            .all()
+        )
+    progress.add(records)
+    print(f"Queued {len(records)} records")
+
+
+def submit_batches(progress):
+    while True:
+        pending = progress.records("pending", limit=BATCH_SIZE)
+        if not pending:
+            return
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": str(record_id),
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": json.loads(request),
+                }
+            )
+            for record_id, _, request in pending
+        ]
+        batch_file = client.files.create(
+            file=("rpa_scoring.jsonl", io.BytesIO("\n".join(lines).encode())),
+            purpose="batch",
+        )
+        batch = client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        # The batch is recorded before its records, a crash in between
+        # leaves them pending and they are sent again
+        progress.set_batch(batch.id, "open")
+        progress.set_status([row[0] for row in pending], "submitted", batch.id)
+        print(f"Submitted batch {batch.id} of {len(pending)} records")
+
+
+def collect_batches(progress):
+    """Store the results of the finished batches, return how many are open."""
+    first_timers = {
+        record_id: first_timer
+        for record_id, first_timer, _ in progress.records("submitted")
+    }
+    still_open = 0
+    for batch_id in progress.open_batches():
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in ("failed", "expired", "cancelled"):
+            # Whatever was not answered goes out again in a new batch
+            ids = [
+                row[0]
+                for row in progress.conn.execute(
+                    "SELECT id FROM records WHERE batch_id = ? "
+                    "AND status = 'submitted'",
+                    (batch_id,),
+                )
+            ]
+            progress.set_status(ids, "pending")
+        elif batch.status != "completed":
+            still_open += 1
+            continue
+
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in client.files.content(file_id).text.splitlines():
+                store_batch_line(progress, first_timers, json.loads(line))
+        progress.set_batch(batch_id, batch.status)
+        print(f"Batch {batch_id} {batch.status}")
+    return still_open
+
+
+def store_batch_line(progress, first_timers, line):
+    record_id = int(line["custom_id"])
+    response = line.get("response") or {}
+    if response.get("status_code") != 200:
+        error = line.get("error") or response.get("body")
+        progress.set_result(record_id, error=json.dumps(error))
+        return
+    content = response["body"]["choices"][0]["message"]["content"]
+    try:
+        progress.set_result(
+            record_id, scoring_result(first_timers.get(record_id), content)
+        )
+    except ValueError as e:
+        progress.set_result(record_id, error=f"Unparsable answer: {str(e)}")
+
+
+def score_concurrently(progress, workers):
+    def score(record_id, first_timer, request):
+        response = gateway.chat_completion(**json.loads(request))
+        return scoring_result(first_timer, response.choices[0].message.content)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(score, *row): row[0] for row in progress.records("pending")
+        }
+        for future in as_completed(futures):
+            try:
+                progress.set_result(futures[future], future.result())
+            except Exception as e:
+                progress.set_result(futures[future], error=str(e))
+
+
+def write_scores(engine, progress):
+    scored = progress.scored()
+    for start in range(0, len(scored), WRITE_CHUNK):
+        chunk = scored[start : start + WRITE_CHUNK]
+        with engine.begin() as conn:
+            conn.execute(
+                text(WRITE_SCORES),
+                {
+                    "ids": [record_id for record_id, _ in chunk],
+                    "scores": [result["note_score"] for _, result in chunk],
+                    "opportunities": [
+                        result["note_oppurtunities"] for _, result in chunk
+                    ],
+                    "summaries": [result["note_summary"] for _, result in chunk],
+                },
+            )
+        progress.set_status([record_id for record_id, _ in chunk], "written")
+    print(f"Wrote {len(scored)} scores")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["batch", "concurrent"], default="batch")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--progress", default=DEFAULT_PROGRESS_PATH)
+    parser.add_argument("--config-id", type=int, help="only this RPA config")
+    parser.add_argument("--limit", type=int, default=50000, help="records per run")
+    parser.add_argument(
+        "--rescore",
+        action="store_true",
+        help="also score the scored records, with a new --progress file",
+    )
+    parser.add_argument(
+        "--retry-failed", action="store_true", help="queue the failed records again"
+    )
+    parser.add_argument("--workers", type=int, default=8, help="concurrent mode")
+    parser.add_argument(
+        "--wait", action="store_true", help="poll until the batches are done"
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    progress = ScoringProgress(args.progress)
+
+    if args.retry_failed:
+        failed = progress.records("failed")
+        progress.set_status([row[0] for row in failed], "pending")
+    select_records(engine, progress, args)
+    if args.mode == "concurrent":
+        score_concurrently(progress, args.workers)
+    else:
+        submit_batches(progress)
+        while collect_batches(progress) and args.wait:
+            time.sleep(POLL_INTERVAL)
+    write_scores(engine, progress)
+
+    print(", ".join(f"{count} {status}" for status, count in progress.counts().items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import json
+
+from api.utils.analytics import (
+    aggregate,
+    GroupTotalsAggregator,
+    OpportunityBreakdownAggregator,
+    RpaAuditAggregator,
+)
+from api.utils.note_records import NoteRecords
+from api.utils.opportunities import FIRST_VISIT_OPPORTUNITIES
+
+ROWS = [
+    {
+        "location": ["Downtown", "Uptown", "Midtown"][index % 3],
+        "flexologist_name": ["Ana", "ana", "Ben", "Cara"][index % 4],
+        "first_timer": "YES" if index % 5 == 0 else "NO",
+        "note_score": "N/A" if index % 7 == 0 else str(index % 4),
+        "note_oppurtunities": (
+            "[]"
+            if index % 6 == 0
+            else json.dumps(FIRST_VISIT_OPPORTUNITIES[index % 3 : index % 3 + 2])
+        ),
+    }
+    for index in range(60)
+]
+
+
+def run(aggregator, *batches):
+    for batch in batches:
+        aggregator.update(NoteRecords.from_rows(batch))
+    return aggregator
+
+
+def test_rpa_audit_batches_match_one_batch():
+    whole = run(RpaAuditAggregator(FIRST_VISIT_OPPORTUNITIES), ROWS)
+    split = run(RpaAuditAggregator(FIRST_VISIT_OPPORTUNITIES), ROWS[:25], ROWS[25:])
+
+    assert split.summary() == whole.summary()
+
+
+def test_opportunity_breakdown_batches_match_one_batch():
+    opportunity = FIRST_VISIT_OPPORTUNITIES[1]
+    whole = run(OpportunityBreakdownAggregator(opportunity), ROWS)
+    split = run(OpportunityBreakdownAggregator(opportunity), ROWS[:25], ROWS[25:])
+
+    assert split.location_results() == whole.location_results()
+    assert split.flexologist_results() == whole.flexologist_results()
+
+
+def test_group_totals_batches_match_one_store():
+    records = NoteRecords.from_rows(ROWS)
+    counts, averages = aggregate(
+        NoteRecords.batches(ROWS, batch_size=7),
+        GroupTotalsAggregator("location"),
+        GroupTotalsAggregator("flexologist_name", 16, str.lower),
+    )
+
+    assert counts.total_notes == len(ROWS)
+    assert counts.totals == records.group_totals("location")
+    assert averages.totals == records.group_totals(
+        "flexologist_name", records.quality_percentages(16), str.lower
+    )